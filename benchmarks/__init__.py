@@ -0,0 +1 @@
+""" Contains the benchmarks, run them from the repository root with python -m benchmarks.<name>. """
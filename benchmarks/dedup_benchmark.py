@@ -0,0 +1,78 @@
+"""Compares the vertex welding with the former quadratic de-duplication."""
+import sys
+import time
+
+import numpy as np
+import weld
+from interfaces.mesh_data import MeshData
+
+
+def legacy_deduplicate(data):
+    """The former O(n²) de-duplication of importer/stl_import.py, kept as reference.
+
+    :param data: The data dictionary to de-duplicate.
+    """
+    vertices = np.reshape(data["vertices"], (-1, 3))
+    vertex_amount = len(vertices)
+    vertex_filter = np.ones(vertex_amount, dtype=bool)
+    connectivity = np.array(data["connectivity"])
+    for i in range(vertex_amount):
+        if not vertex_filter[i]:
+            continue
+        indices = np.where((vertices == vertices[i]).all(axis=1))[0][1:]
+        for index in indices:
+            vertex_filter[index] = False
+            connectivity[index] = i
+
+    duplicate_amount = 0
+    for i in range(vertex_amount):
+        if not vertex_filter[i]:
+            connectivity[connectivity > i - duplicate_amount] -= 1
+            duplicate_amount += 1
+    data["vertices"] = vertices[vertex_filter].flatten().tolist()
+    data["connectivity"] = connectivity.tolist()
+
+
+def create_data(triangle_amount: int, seed: int = 0) -> MeshData:
+    """Creates a triangle soup where every vertex is shared by about six triangles.
+
+    :param triangle_amount: The amount of triangles.
+    :param seed: The random seed.
+    :return: The mesh data.
+    """
+    rng = np.random.default_rng(seed)
+    points = rng.random((max(triangle_amount // 2, 3), 3)).astype(np.float32)
+    vertices = points[rng.integers(0, len(points), triangle_amount * 3)]
+    return MeshData(3, 1, vertices, np.arange(triangle_amount * 3))
+
+
+def measure(function, data: MeshData, legacy: bool = False) -> float:
+    """Measures the runtime of the given de-duplication function.
+
+    :param function: The de-duplication function.
+    :param data: The mesh data, it is copied before each run.
+    :param legacy: Passes the data dictionary instead of the mesh data.
+    :return: The runtime in seconds.
+    """
+    data = data.to_dict() if legacy else MeshData(3, 1, data.vertices.copy(), data.connectivity.copy())
+    start = time.perf_counter()
+    function(data)
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    """Runs the benchmark for the given triangle amounts and prints one line per size.
+
+    :param sizes: The triangle amounts.
+    """
+    print("triangles  legacy [s]  weld [s]  speedup")
+    for size in sizes:
+        data = create_data(size)
+        welded = measure(weld.weld_mesh, data)
+        # The legacy implementation is only measured where it finishes in reasonable time
+        legacy = measure(legacy_deduplicate, data, True) if size <= 20000 else float("nan")
+        print("%9d  %10.3f  %8.3f  %7.1f" % (size, legacy, welded, legacy / welded))
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 5000, 20000, 1000000])
@@ -0,0 +1,191 @@
+"""Times every stage of the STL to ARES conversion on synthetic meshes and compares the results with baselines."""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+import cache
+import normalize
+from benchmarks import synthetic
+from exporter.ares_export import Export
+from importer import stl_import
+from interfaces.mesh_data import MeshData
+
+default_baseline_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+# Triangle amounts of the synthetic meshes, the large meshes take minutes and gigabytes to generate and are opt-in
+default_sizes = [1000, 10000, 100000]
+large_sizes = [1000000, 10000000]
+
+# Differences below these values are measurement noise and never count as regression
+minimum_seconds = 0.01
+minimum_peak_mb = 1.0
+
+
+def get_mesh_path(directory: str, kind: str, triangle_amount: int, duplicate_ratio: float) -> str:
+    """Returns the path of the synthetic mesh, which is generated if it does not exist yet.
+
+    :param directory: The directory holding the generated meshes.
+    :param kind: "binary" or "ascii".
+    :param triangle_amount: The amount of triangles.
+    :param duplicate_ratio: The share of duplicate vertices between 0 and 1.
+    :return: The path to the STL file.
+    """
+    path = os.path.join(directory, "%s-%d-%g.stl" % (kind, triangle_amount, duplicate_ratio))
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        triangles = synthetic.create_triangles(triangle_amount, duplicate_ratio)
+        write = synthetic.write_binary_stl if kind == "binary" else synthetic.write_ascii_stl
+        # Writing to a temporary file keeps interrupted runs from leaving truncated meshes behind
+        write(path + ".tmp", triangles)
+        os.replace(path + ".tmp", path)
+    return path
+
+
+def run_stages(file_path: str, output_path: str, stage, options: str):
+    """Runs the conversion stages of the given file, each wrapped by the given measurement.
+
+    :param file_path: The path to the STL file.
+    :param output_path: The output location without the file extension.
+    :param stage: Function called with the stage name and a function running the stage.
+    :param options: Options string passed to the importer.
+    """
+    importer = stl_import.Import()
+    # Forget the probe, so is_binary reads the file again
+    stl_import.stl_probes.pop(file_path, None)
+    binary = stage("is_binary", lambda: importer.is_binary(file_path))
+    with redirect_stdout(io.StringIO()):
+        stage("analyze", lambda: importer.analyze(file_path))
+
+    data = MeshData(3, 1, [], [])
+    if binary:
+        stage("extract_binary", lambda: importer.extract_binary(data, file_path))
+    else:
+        stage("extract_ascii", lambda: importer.extract_ascii(data, file_path))
+    importer.create_connectivity(data, data.vertex_amount)
+    if stl_import.parse_options(options, stl_import.stl_options)["smooth"]:
+        stage("deduplicate", lambda: importer.deduplicate(data))
+    stage("normalize_data", lambda: normalize.normalize_data(data))
+    stage("export", lambda: Export().export(data, output_path))
+
+
+def measure_file(file_path: str, output_path: str, repeat: int, options: str) -> dict:
+    """Measures the runtime and the peak memory of every stage of the given file.
+
+    The runtime is the best of the repeated runs without tracing, the peak memory is traced in a separate run.
+
+    :param file_path: The path to the STL file.
+    :param output_path: The output location without the file extension.
+    :param repeat: The amount of timed runs.
+    :param options: Options string passed to the importer.
+    :return: Dictionary mapping the stage names to their seconds and peak memory in MB.
+    """
+    results = {}
+
+    def timed(name, function):
+        start = time.perf_counter()
+        value = function()
+        seconds = time.perf_counter() - start
+        result = results.setdefault(name, {"seconds": seconds})
+        result["seconds"] = min(result["seconds"], seconds)
+        return value
+
+    def traced(name, function):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        value = function()
+        results[name]["peak_mb"] = (tracemalloc.get_traced_memory()[1] - baseline) / 1048576
+        return value
+
+    for _ in range(repeat):
+        run_stages(file_path, output_path, timed, options)
+    tracemalloc.start()
+    try:
+        run_stages(file_path, output_path, traced, options)
+    finally:
+        tracemalloc.stop()
+    return results
+
+
+def compare(results: dict, baselines: dict, threshold: float) -> list:
+    """Compares the results with the baselines.
+
+    :param results: The measured results per case and stage.
+    :param baselines: The stored results per case and stage.
+    :param threshold: Allowed relative increase, e.g. 0.25 for 25 percent.
+    :return: The descriptions of all regressions.
+    """
+    regressions = []
+    for case, stages in results.items():
+        for name, result in stages.items():
+            baseline = baselines.get(case, {}).get(name)
+            if baseline is None:
+                continue
+            for key, minimum in (("seconds", minimum_seconds), ("peak_mb", minimum_peak_mb)):
+                if key not in baseline:
+                    continue
+                limit = max(baseline[key] * (1 + threshold), baseline[key] + minimum)
+                if result[key] > limit:
+                    regressions.append("%s %s: %s %.3f > %.3f (baseline %.3f)"
+                                       % (case, name, key, result[key], limit, baseline[key]))
+    return regressions
+
+
+def main(arguments) -> int:
+    """Runs the benchmark suite.
+
+    :param arguments: The command line arguments.
+    :return: The exit code, 1 if a regression was found.
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.stage_benchmark", description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=default_sizes,
+                        help="triangle amounts of the synthetic meshes")
+    parser.add_argument("--large", action="store_true", help="adds the meshes with 1M and 10M triangles")
+    parser.add_argument("--kinds", nargs="+", choices=["binary", "ascii"], default=["binary", "ascii"])
+    parser.add_argument("--duplicate-ratio", type=float, default=0.8, help="share of duplicate vertices")
+    parser.add_argument("--options", default="1", help="options string passed to the importer, 1 = smooth shading")
+    parser.add_argument("--repeat", type=int, default=3, help="amount of timed runs, the best one counts")
+    parser.add_argument("--directory", default=os.path.join(tempfile.gettempdir(), "file-converter-benchmarks"),
+                        help="directory of the generated meshes, which are reused by later runs")
+    parser.add_argument("--baselines", default=default_baseline_path, help="path to the baselines file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--update-baselines", action="store_true", help="stores the results as new baselines")
+    args = parser.parse_args(arguments)
+
+    # The persistent cache would turn the ascii parsing into a lookup
+    cache.cache_directory = ""
+
+    results = {}
+    print("case                   stage            seconds   peak MB")
+    sizes = args.sizes + [size for size in large_sizes if size not in args.sizes] if args.large else args.sizes
+    for kind in args.kinds:
+        for size in sizes:
+            path = get_mesh_path(args.directory, kind, size, args.duplicate_ratio)
+            case = "%s-%d-%g" % (kind, size, args.duplicate_ratio)
+            results[case] = measure_file(path, os.path.join(args.directory, "output"), args.repeat, args.options)
+            for name, result in results[case].items():
+                print("%-22s %-15s %8.3f  %8.1f" % (case, name, result["seconds"], result["peak_mb"]))
+
+    baselines = {}
+    if os.path.exists(args.baselines):
+        with open(args.baselines, "r") as file:
+            baselines = json.load(file)
+    regressions = compare(results, baselines, args.threshold)
+    for regression in regressions:
+        print("Regression: " + regression)
+
+    if args.update_baselines:
+        baselines.update(results)
+        with open(args.baselines, "w") as file:
+            json.dump(baselines, file, indent=2, sort_keys=True)
+        print("Baselines stored in " + args.baselines)
+    return 1 if regressions and not args.update_baselines else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,59 @@
+"""Generates synthetic binary and ascii STL files for the benchmarks."""
+import numpy as np
+
+from importer.stl_import import STL_TRIANGLE_DTYPE
+
+# Amount of triangles generated and written at once
+generate_chunk_triangles = 1 << 18
+
+ascii_facet = "facet normal %e %e %e\n outer loop\n  vertex %e %e %e\n  vertex %e %e %e\n  vertex %e %e %e\n" \
+              " endloop\nendfacet\n"
+
+
+def create_triangles(triangle_amount: int, duplicate_ratio: float, seed: int = 0) -> np.ndarray:
+    """Creates a triangle soup where the given share of the vertices are duplicates of other vertices.
+
+    :param triangle_amount: The amount of triangles.
+    :param duplicate_ratio: The share of duplicate vertices between 0 and 1.
+    :return: The triangle records with the STL triangle dtype.
+    """
+    rng = np.random.default_rng(seed)
+    vertex_amount = triangle_amount * 3
+    unique_amount = min(max(int(round(vertex_amount * (1 - duplicate_ratio))), 1), vertex_amount)
+    points = rng.random((unique_amount, 3), dtype=np.float32)
+    # Every point is used once, the remaining corners reuse random points
+    indices = np.concatenate([np.arange(unique_amount), rng.integers(0, unique_amount, vertex_amount - unique_amount)])
+    rng.shuffle(indices)
+    triangles = np.zeros(triangle_amount, dtype=STL_TRIANGLE_DTYPE)
+    triangles["vertices"] = points[indices].reshape(-1, 3, 3)
+    edges = np.cross(triangles["vertices"][:, 1] - triangles["vertices"][:, 0],
+                     triangles["vertices"][:, 2] - triangles["vertices"][:, 0])
+    triangles["normal"] = edges / np.maximum(np.linalg.norm(edges, axis=1, keepdims=True), 1e-12)
+    return triangles
+
+
+def write_binary_stl(file_path: str, triangles: np.ndarray) -> None:
+    """Writes the triangles as binary STL file.
+
+    :param file_path: The path to the file.
+    :param triangles: The triangle records with the STL triangle dtype.
+    """
+    with open(file_path, "wb") as file:
+        file.write(b"synthetic benchmark mesh".ljust(80, b" "))
+        file.write(np.uint32(len(triangles)).tobytes())
+        triangles.tofile(file)
+
+
+def write_ascii_stl(file_path: str, triangles: np.ndarray) -> None:
+    """Writes the triangles as ascii STL file.
+
+    :param file_path: The path to the file.
+    :param triangles: The triangle records with the STL triangle dtype.
+    """
+    with open(file_path, "w") as file:
+        file.write("solid synthetic\n")
+        for start in range(0, len(triangles), generate_chunk_triangles):
+            chunk = triangles[start:start + generate_chunk_triangles]
+            values = np.concatenate([chunk["normal"], chunk["vertices"].reshape(-1, 9)], axis=1)
+            file.write((ascii_facet * len(chunk)) % tuple(values.ravel().tolist()))
+        file.write("endsolid synthetic\n")
@@ -0,0 +1,225 @@
+"""Persistent cache for intermediate results shared by separate converter runs."""
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+import numpy as np
+
+# The cache is disabled unless the environment variable is set to a directory
+cache_directory = os.environ.get("FILE_CONVERTER_CACHE_DIR", "")
+
+# Maximum size of the cached arrays in MB, the least recently used arrays are evicted
+array_cache_size = int(os.environ.get("FILE_CONVERTER_ARRAY_CACHE_SIZE", "1024"))
+
+# Maximum size of the output cache in MB, 0 disables the output cache
+output_cache_size = int(os.environ.get("FILE_CONVERTER_OUTPUT_CACHE_SIZE", "0"))
+
+# Amount of bytes hashed at once
+hash_chunk_size = 1 << 20
+
+
+def get_file_key(file_path: str) -> str:
+    """Returns a key identifying the current state of the given file by its path, size and modification time.
+
+    :param file_path: The path to the file.
+    :return: The key as hex string.
+    """
+    stat = os.stat(file_path)
+    identity = "%s|%d|%d" % (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    return hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+
+def get_array_path(file_path: str, name: str) -> str:
+    """Returns the path of the cached array with the given name for the given file.
+
+    :param file_path: The path to the source file.
+    :param name: The name of the array.
+    :return: The path to the .npy file.
+    """
+    return os.path.join(cache_directory, "%s-%s.npy" % (get_file_key(file_path), name))
+
+
+def load_array(file_path: str, name: str) -> Optional[np.ndarray]:
+    """Memory-maps the cached array with the given name for the given file.
+
+    :param file_path: The path to the source file.
+    :param name: The name of the array.
+    :return: The read-only array or None if it is not cached.
+    """
+    if not cache_directory:
+        return None
+    try:
+        path = get_array_path(file_path, name)
+        array = np.load(path, mmap_mode="r")
+        # The modification time of an array is its last use for the eviction
+        os.utime(path)
+        return array
+    except (OSError, ValueError):
+        return None
+
+
+def store_array(file_path: str, name: str, array: np.ndarray) -> None:
+    """Stores the array with the given name for the given file, failures only disable the cache entry.
+
+    :param file_path: The path to the source file.
+    :param name: The name of the array.
+    :param array: The array to store.
+    """
+    if not cache_directory:
+        return
+    try:
+        os.makedirs(cache_directory, exist_ok=True)
+        path = get_array_path(file_path, name)
+        with tempfile.NamedTemporaryFile(dir=cache_directory, suffix=".tmp", delete=False) as file:
+            np.save(file, array)
+        # Replacing is atomic, concurrent readers never see a partially written file
+        os.replace(file.name, path)
+        evict_arrays()
+    except OSError:
+        pass
+
+
+def evict_arrays() -> None:
+    """Removes the least recently used cached arrays until they fit into their maximum size."""
+    entries = []
+    for entry in os.scandir(cache_directory):
+        if entry.name.endswith(".npy"):
+            try:
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+            except OSError:
+                continue
+    remove_least_recent(entries, array_cache_size, os.remove)
+
+
+def hash_file(file_path: str) -> str:
+    """Hashes the content of the given file in chunks.
+
+    :param file_path: The path to the file.
+    :return: The SHA-256 hash as hex string.
+    """
+    digest = hashlib.sha256()
+    buffer = bytearray(hash_chunk_size)
+    view = memoryview(buffer)
+    with open(file_path, "rb", buffering=0) as file:
+        while True:
+            size = file.readinto(buffer)
+            if not size:
+                return digest.hexdigest()
+            digest.update(view[:size])
+
+
+def get_output_key(file_path: str, file_format: str, options: str, version: str) -> str:
+    """Returns the output cache key of a conversion.
+
+    :param file_path: The path to the input file.
+    :param file_format: The file format of the input file.
+    :param options: The options string.
+    :param version: The version of the converter and the exporter.
+    :return: The key as hex string.
+    """
+    identity = "\0".join((hash_file(file_path), file_format, options, version))
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+def get_output_directory() -> str:
+    """Returns the directory containing the output cache entries.
+
+    :return: The directory path.
+    """
+    return os.path.join(cache_directory, "outputs")
+
+
+def load_output(key: str, file_output: str) -> list:
+    """Places the cached output files of the given key at the output location.
+
+    The files are hard linked if possible and copied otherwise, their suffixes are appended to the output location.
+
+    :param key: The output cache key.
+    :param file_output: The location of the output files.
+    :return: The paths of the placed files or an empty list if the entry was not found.
+    """
+    if not cache_directory or not output_cache_size:
+        return []
+    entry = os.path.join(get_output_directory(), key)
+    placed = []
+    try:
+        for suffix in sorted(os.listdir(entry)):
+            target = file_output + suffix
+            if os.path.lexists(target):
+                os.remove(target)
+            try:
+                os.link(os.path.join(entry, suffix), target)
+            except OSError:
+                shutil.copyfile(os.path.join(entry, suffix), target)
+            placed.append(target)
+        # The modification time of an entry is its last use for the eviction
+        os.utime(entry)
+        return placed
+    except OSError:
+        # The entry does not exist or was evicted by another process meanwhile
+        return []
+
+
+def store_output(key: str, file_output: str, written_files: list) -> None:
+    """Stores the written output files for the given key and evicts the least recently used entries.
+
+    :param key: The output cache key.
+    :param file_output: The location of the output files.
+    :param written_files: The paths of the written files, each starting with the output location.
+    """
+    if not cache_directory or not output_cache_size:
+        return
+    directory = get_output_directory()
+    try:
+        os.makedirs(directory, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=directory, suffix=".tmp")
+        for path in written_files:
+            shutil.copyfile(path, os.path.join(staging, path[len(file_output):]))
+        try:
+            # Renaming is atomic, so concurrent readers only see complete entries
+            os.rename(staging, os.path.join(directory, key))
+        except OSError:
+            # Another process stored the same entry meanwhile
+            shutil.rmtree(staging, ignore_errors=True)
+        evict_outputs()
+    except OSError:
+        pass
+
+
+def evict_outputs() -> None:
+    """Removes the least recently used output cache entries until the cache fits into its maximum size."""
+    directory = get_output_directory()
+    entries = []
+    for name in os.listdir(directory):
+        # Entries which are still being stored are skipped
+        if name.endswith(".tmp"):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            size = sum(entry.stat().st_size for entry in os.scandir(path))
+            entries.append((os.stat(path).st_mtime, size, path))
+        except OSError:
+            continue
+    remove_least_recent(entries, output_cache_size, shutil.rmtree)
+
+
+def remove_least_recent(entries: list, maximum_size: int, remove) -> None:
+    """Removes the least recently used entries until the remaining entries fit into the maximum size.
+
+    :param entries: The entries as tuples of their last use, their size in bytes and their path.
+    :param maximum_size: The maximum size in MB.
+    :param remove: Function removing the entry at the given path.
+    """
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= maximum_size * 1048576:
+            break
+        try:
+            remove(path)
+        except OSError:
+            # The entry was removed by another process meanwhile
+            pass
+        total -= size
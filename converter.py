@@ -1,33 +1,51 @@
 """Analyzes or converts the desired file."""
+import io
+import json
 import os
+import signal
+import socketserver
 import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import redirect_stdout
+import cache
+import instrumentation
+import lod
 import normalize
-# noinspection PyUnresolvedReferences
-from importer import *
-# noinspection PyUnresolvedReferences
-from exporter import *
-
-import_scripts = []
-export_scripts = []
+import optimize
+import registry
+import split
+from interfaces.mesh_data import as_mesh_data
+from options import Option, parse_options, print_options
 
 desired_output_format = "ares"
 
+# Part of the output cache key, increase it whenever the conversion result changes
+converter_version = "6"
 
-def main():
-    """Creates the import and export classes and executes the desired action on the given file."""
-    create_io_classes()
-    decode_arguments(sys.argv)
+# Options of the optional pipeline stages, printed between the import and the export options
+pipeline_options = [
+    Option("optimize_vertex_cache", "Optimize vertex cache", bool, False),
+    Option("lod_1", "LOD 1 triangle ratio", float, 0.0),
+    Option("lod_2", "LOD 2 triangle ratio", float, 0.0),
+    Option("split_16bit", "Split into meshes with 16 bit vertex IDs", bool, False)
+]
+
+# Keys of the level of detail ratio options, the levels are written to <output>_lod<level>
+lod_levels = ["lod_1", "lod_2"]
 
+# Memory budget of the batch mode in MB, the default is half of the physical memory
+batch_memory_budget = int(os.environ.get("FILE_CONVERTER_MEMORY_BUDGET", "0")) or \
+    os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 2 // 1048576
 
-# noinspection PyUnresolvedReferences
-def create_io_classes():
-    """Fetches all available import and export modules and creates the required instances."""
-    global import_scripts, export_scripts
-    for m in sys.modules:
-        if "importer." in m:
-            import_scripts.append(sys.modules[m].Import())
-        if "exporter." in m:
-            export_scripts.append(sys.modules[m].Export())
+# Files with an estimated extraction memory above this threshold in MB are converted in chunks if supported
+streaming_threshold = int(os.environ.get("FILE_CONVERTER_STREAMING_THRESHOLD", "0")) or batch_memory_budget
+
+
+def main():
+    """Executes the desired action on the given file, the import and export classes are created on demand."""
+    decode_arguments(sys.argv)
 
 
 def decode_arguments(args):
@@ -44,6 +62,12 @@ def decode_arguments(args):
         analyze_file(args[2], args[3])
     elif arg_one == 2:
         extract_file(args[2], args[3], args[4], args[5])
+    elif arg_one == 3:
+        batch_convert(args[2], int(args[3]) if len(args) > 3 else batch_memory_budget,
+                      int(args[4]) if len(args) > 4 else os.cpu_count())
+    elif arg_one == 4:
+        serve(args[2] if len(args) > 2 and args[2] != "-" else None,
+              int(args[3]) if len(args) > 3 else os.cpu_count())
     else:
         print("Invalid parameter")
         exit()
@@ -63,15 +87,18 @@ def validate_arg_amount(args: list):
             return
         elif arg_one == 2 and args_length >= 5:
             return
+        elif arg_one == 3 and 3 <= args_length <= 5:
+            return
+        elif arg_one == 4 and args_length <= 4:
+            return
     print("Invalid parameter amount")
     exit()
 
 
 def print_supported_formats():
     """Outputs all supported file formats to console."""
-    for element in import_scripts:
-        for file_format in element.supported_formats():
-            print(file_format)
+    for file_format in registry.get_formats():
+        print(file_format)
 
 
 def analyze_file(file_path, file_format):
@@ -80,7 +107,11 @@ def analyze_file(file_path, file_format):
     :param file_path: The path to the file.
     :param file_format: The file format of the file.
     """
-    get_correct_io_class(file_format).analyze(file_path)
+    with instrumentation.run("analyze", file_path):
+        get_correct_io_class(file_format).analyze(file_path)
+        # The pipeline and export options follow the import options
+        print_options(pipeline_options)
+        print_options(get_correct_io_class(desired_output_format, False).option_definitions())
 
 
 def extract_file(file_path, file_format, file_output, options):
@@ -91,12 +122,278 @@ def extract_file(file_path, file_format, file_output, options):
     :param file_output: The location of the output file.
     :param options: The options string.
     """
-    data = get_correct_io_class(file_format).extract(file_path, options)
-    normalize.normalize_data(data)
-    get_correct_io_class(desired_output_format, False).export(data, file_output)
+    with instrumentation.run("extract", file_path):
+        convert_file(file_path, file_format, file_output, options)
     print("Export successful")
 
 
+def convert_file(file_path, file_format, file_output, options):
+    """Imports, normalizes and exports the file with the given file format without any console output on success.
+
+    If the output cache is enabled, a previous conversion of an identical file with the same options is reused.
+
+    :param file_path: The path to the file.
+    :param file_format: The file format of the file.
+    :param file_output: The location of the output file.
+    :param options: The options string.
+    :return: The paths of the written files.
+    """
+    importer = get_correct_io_class(file_format)
+    exporter = get_correct_io_class(desired_output_format, False)
+    pipeline, export_options = split_options(importer, options)
+    exporter.configure(export_options)
+    key = None
+    # Frame sequences are not cached, as the key only covers a single file
+    if cache.cache_directory and cache.output_cache_size and os.path.isfile(file_path):
+        with instrumentation.stage("output cache") as counts:
+            key = cache.get_output_key(file_path, file_format, options,
+                                       "%s/%s" % (converter_version, exporter.version()))
+            cached_files = cache.load_output(key, file_output)
+            counts["hit"] = bool(cached_files)
+        if cached_files:
+            return cached_files
+
+    written_files = [file_output + "." + desired_output_format]
+    stream = None
+    if importer.always_stream(file_path) or importer.estimate_memory(file_path) > streaming_threshold * 1048576:
+        with instrumentation.stage("import stream") as counts:
+            stream = importer.extract_stream(file_path, options)
+    if stream is not None:
+        counts.update(vertices=stream.vertex_amount, faces=stream.face_amount)
+        if any(pipeline[option.key] for option in pipeline_options):
+            print("#The pipeline stages are skipped for streamed conversions")
+        normalize.normalize_stream(stream)
+        # The chunks are read, normalized and written during the export
+        with instrumentation.stage("export stream") as counts:
+            exporter.export_stream(stream, file_output)
+            counts["bytes"] = sum(os.path.getsize(path) for path in written_files)
+    else:
+        with instrumentation.stage("import") as counts:
+            data = as_mesh_data(importer.extract(file_path, options))
+            counts.update(vertices=data.vertex_amount, faces=data.face_amount, blocks=len(data.blocks))
+        with instrumentation.stage("normalize") as counts:
+            normalize.normalize_data(data)
+            counts["vertices"] = data.vertex_amount
+        if data.frames > 1 and any(pipeline[option.key] for option in pipeline_options):
+            print("#The pipeline stages are skipped for meshes with several frames")
+            pipeline = parse_options("", pipeline_options)
+        outputs = [(file_output, data)]
+        for level, lod_key in enumerate(lod_levels, 1):
+            if pipeline[lod_key] > 0:
+                with instrumentation.stage("lod %d" % level) as counts:
+                    lod_data = lod.create_lod(data, pipeline[lod_key])
+                    counts.update(vertices=lod_data.vertex_amount, faces=lod_data.face_amount)
+                print("#LOD %d faces: %d" % (level, lod_data.face_amount))
+                outputs.append(("%s_lod%d" % (file_output, level), lod_data))
+        if pipeline["split_16bit"]:
+            # The first split mesh keeps the output name, the others are written to <output>_part<index>
+            with instrumentation.stage("split") as counts:
+                split_outputs = []
+                split_amount = 0
+                for output, mesh in outputs:
+                    parts = split.split_mesh(mesh)
+                    if len(parts) > 1:
+                        split_amount += len(parts)
+                    split_outputs.extend((output if index == 0 else "%s_part%d" % (output, index), part)
+                                         for index, part in enumerate(parts))
+                outputs = split_outputs
+                counts["meshes"] = split_amount
+            # Only the meshes created by splitting are counted, the LODs and unsplit meshes are not
+            if split_amount:
+                print("#Split meshes: %d" % split_amount)
+
+        written_files = []
+        for output, mesh in outputs:
+            if pipeline["optimize_vertex_cache"]:
+                with instrumentation.stage("optimize vertex cache") as counts:
+                    counts["acmr_before"], counts["acmr_after"] = optimize.optimize_vertex_cache(mesh)
+                print("#ACMR before optimization: %.3f, after: %.3f" % (counts["acmr_before"], counts["acmr_after"]))
+            written_files.append(output + "." + desired_output_format)
+            with instrumentation.stage("export") as counts:
+                exporter.export(mesh, output)
+                counts["bytes"] = os.path.getsize(written_files[-1])
+    if key is not None:
+        cache.store_output(key, file_output, written_files)
+    return written_files
+
+
+def split_options(importer, options):
+    """Parses the pipeline options following the import options and returns the remaining export options.
+
+    :param importer: The import instance.
+    :param options: The options string.
+    :return: The parsed pipeline options and the options string of the exporter.
+    """
+    lines = options.splitlines()[len(importer.option_definitions()):]
+    return parse_options("\n".join(lines), pipeline_options), "\n".join(lines[len(pipeline_options):])
+
+
+def batch_convert(manifest_path, memory_budget, workers):
+    """Converts all jobs of the manifest in parallel and outputs one JSON status line per finished job.
+
+    Every manifest line is a JSON object with the keys input, format, output and options. Jobs are only started while
+    the sum of their estimated memory stays within the budget, a job exceeding the budget on its own runs alone.
+
+    :param manifest_path: The path to the manifest file.
+    :param memory_budget: The memory budget in MB.
+    :param workers: The maximum amount of parallel jobs.
+    """
+    pending = []
+    with open(manifest_path, "r") as manifest:
+        for index, line in enumerate(manifest):
+            if line.strip():
+                job = decode_job(index, line)
+                if job["status"] is None:
+                    pending.append(job)
+                else:
+                    print(json.dumps(job), flush=True)
+
+    budget = memory_budget * 1048576
+    running = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            reserved = sum(job["memory"] for job in running.values())
+            for job in list(pending):
+                if len(running) < workers and (not running or reserved + job["memory"] <= budget):
+                    pending.remove(job)
+                    running[executor.submit(run_job, job)] = job
+                    reserved += job["memory"]
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                del running[future]
+                print(json.dumps(future.result()), flush=True)
+
+
+def decode_job(index, line):
+    """Decodes a manifest line and estimates the memory of the job.
+
+    :param index: The line index in the manifest.
+    :param line: The manifest line.
+    :return: The job dictionary, its status is None if the job is valid.
+    """
+    job = {"index": index, "action": "extract", "status": None}
+    try:
+        entry = json.loads(line)
+        job.update(input=entry["input"], format=entry["format"], output=entry["output"],
+                   options=entry.get("options", ""))
+        importer = registry.get_plugin(job["format"])
+        if importer is None:
+            job.update(status="failed", message="File format not supported")
+            return job
+        job["memory"] = importer.estimate_memory(job["input"])
+    except (ValueError, KeyError, TypeError, OSError) as error:
+        job.update(status="failed", message="Invalid job: %r" % error)
+    return job
+
+
+def serve(socket_path, workers):
+    """Serves line-delimited JSON requests with the plugins loaded once until the input is closed.
+
+    Every request is a JSON object with an id, the action (formats, analyze or extract) and the keys input, format,
+    output and options required by the action. Every response contains the id, the status and the console output of
+    the action as message. Without a socket path the requests are read from stdin and answered on stdout.
+
+    :param socket_path: The path of the Unix socket to listen on or None.
+    :param workers: The amount of worker processes.
+    """
+    # The forked workers inherit the loaded plugins
+    registry.load_plugins()
+    # Only the daemon process handles the interrupt and shuts the workers down
+    with ProcessPoolExecutor(max_workers=workers, initializer=signal.signal,
+                             initargs=(signal.SIGINT, signal.SIG_IGN)) as executor:
+        if socket_path is None:
+            serve_stream(sys.stdin, sys.stdout, executor)
+            return
+
+        class RequestHandler(socketserver.StreamRequestHandler):
+            """Serves the requests of a single connection."""
+            def handle(self):
+                serve_stream(io.TextIOWrapper(self.rfile, encoding="utf-8"),
+                             io.TextIOWrapper(self.wfile, encoding="utf-8"), executor)
+
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        with socketserver.ThreadingUnixStreamServer(socket_path, RequestHandler) as server:
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+        os.remove(socket_path)
+
+
+def serve_stream(reader, writer, executor):
+    """Runs the requests read from the text stream in the worker pool and writes the responses in completion order.
+
+    :param reader: The text stream containing one JSON request per line.
+    :param writer: The text stream the JSON responses are written to.
+    :param executor: The worker pool.
+    """
+    lock = threading.Lock()
+    responded = []
+
+    def respond(response):
+        with lock:
+            writer.write(json.dumps(response) + "\n")
+            writer.flush()
+
+    def respond_job(future, job, event):
+        try:
+            respond(future.result())
+        except Exception as error:
+            respond({"id": job.get("id"), "status": "failed", "message": "Worker failed: %r" % error})
+        finally:
+            event.set()
+
+    for line in reader:
+        if not line.strip():
+            continue
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError("Request is not an object")
+        except ValueError as error:
+            respond({"id": None, "status": "failed", "message": "Invalid request: %s" % error})
+            continue
+        # The callbacks run after the futures are done, so the responses are awaited instead of the futures
+        event = threading.Event()
+        responded.append(event)
+        future = executor.submit(run_job, job)
+        future.add_done_callback(lambda done, request=job, e=event: respond_job(done, request, e))
+    for event in responded:
+        event.wait()
+
+
+def run_job(job):
+    """Runs the action of a single batch job or daemon request, usually inside a worker process.
+
+    :param job: The job dictionary.
+    :return: The job dictionary with status, console output and runtime.
+    """
+    output = io.StringIO()
+    start = time.perf_counter()
+    try:
+        with redirect_stdout(output):
+            action = job.get("action", "extract")
+            if action == "formats":
+                print_supported_formats()
+            elif action == "analyze":
+                analyze_file(job["input"], job["format"])
+            elif action == "extract":
+                extract_file(job["input"], job["format"], job["output"], job.get("options", ""))
+            else:
+                print("Invalid parameter")
+                exit()
+        job["status"] = "ok"
+    except SystemExit:
+        job["status"] = "failed"
+    except Exception as error:
+        job["status"] = "failed"
+        output.write("%s: %s" % (type(error).__name__, error))
+    job["message"] = output.getvalue().strip()
+    job["seconds"] = round(time.perf_counter() - start, 3)
+    return job
+
+
 def validate_file(file_path):
     """Checks if the given file exists.
 
@@ -123,11 +420,11 @@ def get_correct_io_class(file_format, importer: bool = True):
     :param importer: Importer desired, default true.
     :return: The import / export class if available.
     """
-    for element in import_scripts if importer else export_scripts:
-        if file_format in element.supported_formats():
-            return element
-    print("File format not supported")
-    exit()
+    element = registry.get_plugin(file_format, importer)
+    if element is None:
+        print("File format not supported")
+        exit()
+    return element
 
 
 if __name__ == "__main__":
@@ -1,8 +1,15 @@
 """Exports the given data as an ARES file."""
 from interfaces.export_interface import ExportInterface
+from interfaces.mesh_data import DataBlock, MeshData, MeshStream, as_mesh_data
+from options import Option, parse_options
 from typing import BinaryIO, Optional
 from enum import Enum, auto
+from contextlib import contextmanager
+import os
 import struct
+import zlib
+import normalize
+import numpy as np
 
 
 # ======================================================================================================================
@@ -15,6 +22,22 @@ import struct
 #
 # ======================================================================================================================
 
+# Export options printed after the import options, the compact format is written with format identifier 1
+ares_options = [
+    Option("compact", "Compact ARES format", bool, False),
+    Option("vertex_bits", "Vertex quantization bits between 10 and 16 (0 for FP16)", int, 14),
+    Option("maximum_error", "Maximum vertex error of the compact format", float, 0.001),
+    Option("compress", "Compress compact ARES sections", bool, True)
+]
+
+# Vertex encodings of the compact format
+VERTEX_ENCODING_FP32 = 0
+VERTEX_ENCODING_FP16 = 1
+VERTEX_ENCODING_QUANTIZED = 2
+
+# Connectivity encoding of the compact format, zigzag encoded deltas of consecutive vertex IDs as varints
+CONNECTIVITY_ENCODING_DELTA_VARINT = 1
+
 
 class Export(ExportInterface):
     """Export class that contains the ARES file export."""
@@ -27,6 +50,7 @@ class Export(ExportInterface):
         self.connectivity_precision = None
         self.frames = 0
         self.data_blocks = 0
+        self.options = parse_options("", ares_options)
 
     def supported_formats(self) -> list:
         """Returns the supported formats.
@@ -35,32 +59,85 @@ class Export(ExportInterface):
         """
         return ["ares"]
 
-    def export(self, data: dict, path: str) -> None:
+    def option_definitions(self) -> list:
+        """Returns the export option definitions.
+
+        :return: The option definitions.
+        """
+        return ares_options
+
+    def configure(self, options: str) -> None:
+        """Applies the export options to the following exports.
+
+        :param options: The option lines following the import options.
+        """
+        self.options = parse_options(options, ares_options)
+        self.format_identifier = 1 if self.options["compact"] else 0
+
+    def version(self) -> str:
+        """Returns the version of the written format.
+
+        :return: The version.
+        """
+        return "2"
+
+    def export(self, data: MeshData, path: str) -> None:
         """Exports the given data to the desired path.
 
-        :param data: The data to export.
+        :param data: The mesh data to export, data dictionaries are converted.
         :param path: The path to export to.
         """
+        data = as_mesh_data(data)
         self.get_mesh_information(data)
-        with open('%s.ares' % path, 'wb') as stream:
+        with open_replacing('%s.ares' % path) as stream:
             self.write_header(stream)
+            if self.format_identifier == 1:
+                vertices = data.vertices
+                minimum, maximum = (data.minimum, data.maximum) if data.minimum is not None else \
+                    normalize.get_bounds(vertices)
+                self.write_compact(stream, lambda: iter([vertices]), lambda: iter([data.connectivity]), minimum,
+                                   maximum, data.blocks)
+                return
             self.write_mesh(stream, data)
-            if "blocks" in data.keys():
-                for block in data["blocks"]:
-                    self.write_data_block(stream, block)
+            for block in data.blocks:
+                self.write_data_block(stream, block)
 
-    def get_mesh_information(self, data: dict) -> None:
-        """Fetches all relevant mesh information from the given data dictionary.
+    def export_stream(self, data: MeshStream, path: str) -> None:
+        """Exports the given mesh stream chunk by chunk to the desired path.
 
-        :param data: The data dictionary to fetch the information from.
+        :param data: The mesh stream to export.
+        :param path: The path to export to.
         """
-        self.vertex_amount = len(data["vertices"]) // 3
-        self.vertex_precision = BinaryType[data["vertex-precision"]] if "vertex-precision" in data else BinaryType.FP32
-        self.polygon = data["polygon"]
-        self.face_amount = len(data["connectivity"]) // self.polygon
+        self.vertex_amount = data.vertex_amount
+        self.vertex_precision = BinaryType[data.vertex_precision]
+        self.polygon = data.polygon
+        self.face_amount = data.face_amount
         self.connectivity_precision = get_smallest_uint(self.vertex_amount)
-        self.frames = data["frames"]
-        self.data_blocks = len(data["blocks"]) if "blocks" in data else 0
+        self.frames = data.frames
+        self.data_blocks = 0
+        with open_replacing('%s.ares' % path) as stream:
+            self.write_header(stream)
+            if self.format_identifier == 1:
+                self.write_compact(stream, data.vertex_chunks, data.connectivity_chunks, data.minimum, data.maximum,
+                                   [])
+                return
+            for chunk in data.vertex_chunks():
+                write_binary(stream, self.vertex_precision, chunk)
+            for chunk in data.connectivity_chunks():
+                write_binary(stream, self.connectivity_precision, chunk)
+
+    def get_mesh_information(self, data: MeshData) -> None:
+        """Fetches all relevant mesh information from the given mesh data.
+
+        :param data: The mesh data to fetch the information from.
+        """
+        self.vertex_amount = data.vertex_amount
+        self.vertex_precision = BinaryType[data.vertex_precision]
+        self.polygon = data.polygon
+        self.face_amount = data.face_amount
+        self.connectivity_precision = get_smallest_uint(self.vertex_amount)
+        self.frames = data.frames
+        self.data_blocks = len(data.blocks)
 
     def write_header(self, stream: BinaryIO) -> None:
         """Writes the ARES header information to the given binary stream.
@@ -74,27 +151,170 @@ class Export(ExportInterface):
         write_binary_single(stream, BinaryType.UINT16, self.frames)
         write_binary_single(stream, BinaryType.UINT8, self.data_blocks)
 
-    def write_mesh(self, stream: BinaryIO, data: dict) -> None:
+    def write_mesh(self, stream: BinaryIO, data: MeshData) -> None:
         """Writes the mesh information to the given binary stream.
 
         :param stream: The binary stream.
-        :param data: The data dictionary containing the mesh information.
+        :param data: The mesh data containing the mesh information.
         """
-        write_binary(stream, self.vertex_precision, data["vertices"])
-        write_binary(stream, self.connectivity_precision, data["connectivity"])
+        write_binary(stream, self.vertex_precision, data.vertices.reshape(-1))
+        write_binary(stream, self.connectivity_precision, data.connectivity)
 
-    def write_data_block(self, stream: BinaryIO, block: dict) -> None:
+    def write_data_block(self, stream: BinaryIO, block: DataBlock) -> None:
         """Writes all data of the given block to the binary stream.
 
         :param stream: The binary stream.
-        :param block: The data block dictionary.
+        :param block: The data block.
+        """
+        write_binary(stream, self.write_block_header(stream, block), block.values)
+
+    def write_block_header(self, stream: BinaryIO, block: DataBlock) -> "BinaryType":
+        """Writes the header of the given block, which is the same for the plain and the compact format.
+
+        :param stream: The binary stream.
+        :param block: The data block.
+        :return: The binary type of the block values.
+        """
+        write_binary_single(stream, BinaryType.UINT8, len(block.name))
+        write_binary_string(stream, block.name)
+        write_binary_single(stream, BinaryType.UINT8, block.precision)
+        write_binary_single(stream, BinaryType.BOOL, (len(block.values) / self.vertex_amount) == 1)
+        return BinaryType.UINT8 if (block.precision == 12) else BinaryType(block.precision + 1)
+
+    def write_compact(self, stream: BinaryIO, vertex_chunks, connectivity_chunks, minimum, maximum,
+                      blocks: list) -> None:
+        """Writes the mesh and the data blocks in the compact format and reports the size reduction and the error.
+
+        Every section is prefixed with its stored size and compressed with zlib if enabled. The vertices are quantized
+        or stored as FP16 and written as FP32 again if the error exceeds the maximum vertex error.
+
+        :param stream: The binary stream positioned after the header.
+        :param vertex_chunks: Function returning a new generator of float32 arrays of shape (K, 3).
+        :param connectivity_chunks: Function returning a new generator of flat unsigned int arrays.
+        :param minimum: The minimum x, y and z values of all vertices.
+        :param maximum: The maximum x, y and z values of all vertices.
+        :param blocks: The data blocks.
+        """
+        compress = self.options["compress"]
+        write_binary_single(stream, BinaryType.UINT8, int(compress))
+        bits = self.options["vertex_bits"]
+        encoding = VERTEX_ENCODING_QUANTIZED if bits else VERTEX_ENCODING_FP16
+        vertices_start = stream.tell()
+        error = self.write_vertices(stream, vertex_chunks, minimum, maximum, encoding, min(max(bits, 10), 16), compress)
+        if error > self.options["maximum_error"]:
+            print("#Vertex error %g exceeds the maximum, vertices are stored as FP32" % error)
+            stream.seek(vertices_start)
+            stream.truncate()
+            error = self.write_vertices(stream, vertex_chunks, minimum, maximum, VERTEX_ENCODING_FP32, 0, compress)
+
+        write_binary_single(stream, BinaryType.UINT8, CONNECTIVITY_ENCODING_DELTA_VARINT)
+        with SectionWriter(stream, compress) as section:
+            previous = 0
+            # The encoding needs up to 80 bytes per value, so the chunks are split further
+            for chunk in split_chunks(connectivity_chunks(), write_chunk_size // 80):
+                chunk = chunk.astype(np.int64)
+                section.write(encode_varints(zigzag_deltas(chunk, previous)))
+                previous = int(chunk[-1])
+
+        for block in blocks:
+            binary_type = self.write_block_header(stream, block)
+            with SectionWriter(stream, compress) as section:
+                write_binary(section, binary_type, block.values)
+
+        print("#Compression ratio: %.2f" % (self.get_plain_size(blocks) / max(stream.tell(), 1)))
+        print("#Maximum vertex error: %g" % error)
+
+    def write_vertices(self, stream: BinaryIO, vertex_chunks, minimum, maximum, encoding: int, bits: int,
+                       compress: bool) -> float:
+        """Writes the vertex encoding header and the vertex section of the compact format.
+
+        Quantized vertices are stored as UINT16 values q, the positions are q * scale + offset per axis.
+
+        :param stream: The binary stream.
+        :param vertex_chunks: Function returning a new generator of float32 arrays of shape (K, 3).
+        :param minimum: The minimum x, y and z values of all vertices.
+        :param maximum: The maximum x, y and z values of all vertices.
+        :param encoding: The vertex encoding.
+        :param bits: The quantization bits, only used by the quantized encoding.
+        :param compress: Compresses the section with zlib.
+        :return: The maximum absolute difference of a stored coordinate.
+        """
+        offset = np.zeros(3, dtype=np.float32)
+        scale = np.ones(3, dtype=np.float32)
+        if encoding == VERTEX_ENCODING_QUANTIZED:
+            offset = np.asarray(minimum, dtype=np.float32)
+            scale = ((np.asarray(maximum, dtype=np.float32) - offset) / ((1 << bits) - 1)).astype(np.float32)
+        write_binary_single(stream, BinaryType.UINT8, encoding)
+        write_binary_single(stream, BinaryType.UINT8, bits)
+        write_binary(stream, BinaryType.FP32, offset)
+        write_binary(stream, BinaryType.FP32, scale)
+
+        error = 0.0
+        with SectionWriter(stream, compress) as section:
+            for chunk in split_chunks(vertex_chunks(), write_chunk_size // 12):
+                chunk = np.asarray(chunk, dtype=np.float32).reshape(-1, 3)
+                if encoding == VERTEX_ENCODING_QUANTIZED:
+                    # Axes without extent are stored as 0
+                    values = np.rint((chunk - offset) / np.where(scale > 0, scale, 1))
+                    values = np.clip(values, 0, (1 << bits) - 1).astype(np.uint16)
+                    restored = values * scale + offset
+                elif encoding == VERTEX_ENCODING_FP16:
+                    values = chunk.astype(np.float16)
+                    restored = values.astype(np.float32)
+                else:
+                    values = restored = chunk
+                error = max(error, float(np.amax(np.abs(restored - chunk))))
+                write_binary(section, BinaryType.UINT16 if encoding == VERTEX_ENCODING_QUANTIZED else
+                             BinaryType.FP16 if encoding == VERTEX_ENCODING_FP16 else BinaryType.FP32, values)
+        return error
+
+    def get_plain_size(self, blocks: list) -> int:
+        """Calculates the size of the same mesh in the plain ARES format.
+
+        :param blocks: The data blocks.
+        :return: The size in bytes.
         """
-        write_binary_single(stream, BinaryType.UINT8, len(block["name"]))
-        write_binary_string(stream, block["name"])
-        write_binary_single(stream, BinaryType.UINT8, block["precision"])
-        write_binary_single(stream, BinaryType.BOOL, (len(block["values"]) / self.vertex_amount) == 1)
-        binary_type = BinaryType.UINT8 if (block["precision"] == 12) else BinaryType((block["precision"]) + 1)
-        write_binary(stream, binary_type, block["values"])
+        size = 13 + self.vertex_amount * self.frames * 3 * numpy_dtype[self.vertex_precision].itemsize
+        size += self.face_amount * self.polygon * numpy_dtype[self.connectivity_precision].itemsize
+        for block in blocks:
+            size += 4 + len(block.name) + block.values.nbytes
+        return size
+
+
+class SectionWriter:
+    """Writes a section of the compact format prefixed with its stored size, optionally compressed with zlib."""
+    __slots__ = ("stream", "compressor", "start")
+
+    def __init__(self, stream: BinaryIO, compress: bool):
+        """Creates the section writer.
+
+        :param stream: The seekable binary stream.
+        :param compress: Compresses the section with zlib.
+        """
+        self.stream = stream
+        self.compressor = zlib.compressobj() if compress else None
+        self.start = 0
+
+    def __enter__(self) -> "SectionWriter":
+        self.start = self.stream.tell()
+        # The size is written when the section is complete
+        write_binary_single(self.stream, BinaryType.UINT64, 0)
+        return self
+
+    def write(self, data) -> None:
+        """Writes the given bytes-like object to the section.
+
+        :param data: The data.
+        """
+        self.stream.write(self.compressor.compress(data) if self.compressor is not None else data)
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if self.compressor is not None:
+            self.stream.write(self.compressor.flush())
+        end = self.stream.tell()
+        self.stream.seek(self.start)
+        write_binary_single(self.stream, BinaryType.UINT64, end - self.start - 8)
+        self.stream.seek(end)
 
 
 # ======================================================================================================================
@@ -139,21 +359,24 @@ format_string_single = {
     BinaryType.FP64: "<d"
 }
 
-format_string = {
-    BinaryType.BOOL: "<%s?",
-    BinaryType.UINT8: "<%sB",
-    BinaryType.UINT16: "<%sH",
-    BinaryType.UINT32: "<%sI",
-    BinaryType.UINT64: "<%sQ",
-    BinaryType.INT8: "<%sb",
-    BinaryType.INT16: "<%sh",
-    BinaryType.INT32: "<%si",
-    BinaryType.INT64: "<%sq",
-    BinaryType.FP16: "<%se",
-    BinaryType.FP32: "<%sf",
-    BinaryType.FP64: "<%sd"
+numpy_dtype = {
+    BinaryType.BOOL: np.dtype("?"),
+    BinaryType.UINT8: np.dtype("<u1"),
+    BinaryType.UINT16: np.dtype("<u2"),
+    BinaryType.UINT32: np.dtype("<u4"),
+    BinaryType.UINT64: np.dtype("<u8"),
+    BinaryType.INT8: np.dtype("<i1"),
+    BinaryType.INT16: np.dtype("<i2"),
+    BinaryType.INT32: np.dtype("<i4"),
+    BinaryType.INT64: np.dtype("<i8"),
+    BinaryType.FP16: np.dtype("<f2"),
+    BinaryType.FP32: np.dtype("<f4"),
+    BinaryType.FP64: np.dtype("<f8")
 }
 
+# Maximum amount of bytes converted and written at once
+write_chunk_size = 1 << 24
+
 
 # endregion
 
@@ -205,6 +428,27 @@ def get_smallest_int(value: int) -> Optional[BinaryType]:
     return None
 
 
+@contextmanager
+def open_replacing(path: str):
+    """Opens a temporary file next to the given path, which replaces the file at the path once it is written.
+
+    The former file is replaced instead of truncated, so hard links to it, e.g. output cache entries, keep their
+    content. The temporary file is removed if writing fails.
+
+    :param path: The path of the file to write.
+    :return: Context manager yielding the binary stream of the temporary file.
+    """
+    temporary_path = "%s.%d.tmp" % (path, os.getpid())
+    try:
+        with open(temporary_path, "wb") as stream:
+            yield stream
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+
 def write_binary_single(stream: BinaryIO, binary_type: BinaryType, value):
     """Writes a single value with the specified BinaryType to the binary stream.
 
@@ -215,14 +459,67 @@ def write_binary_single(stream: BinaryIO, binary_type: BinaryType, value):
     stream.write(struct.pack(format_string_single[binary_type], value))
 
 
-def write_binary(stream: BinaryIO, binary_type: BinaryType, values: list):
+def write_binary(stream: BinaryIO, binary_type: BinaryType, values):
     """Writes the values with the specified BinaryType to the binary stream.
 
+    The values are converted and written in chunks through the buffer protocol, arrays which already have the
+    desired dtype are written without any copy.
+
     :param stream: The binary stream to write the data to.
     :param binary_type: The desired BinaryType.
-    :param values: The data as a list of values.
+    :param values: The data as an array or a list of values.
+    """
+    dtype = numpy_dtype[binary_type]
+    # Lists are converted to the desired dtype directly, e.g. UINT64 values beyond the INT64 range stay exact
+    values = (values if isinstance(values, np.ndarray) else np.asarray(values, dtype=dtype)).reshape(-1)
+    step = max(write_chunk_size // dtype.itemsize, 1)
+    for start in range(0, len(values), step):
+        chunk = np.ascontiguousarray(values[start:start + step].astype(dtype, copy=False))
+        stream.write(memoryview(chunk).cast("B"))
+
+
+def split_chunks(chunks, size: int):
+    """Splits the given chunks into non-empty chunks of at most the given length.
+
+    :param chunks: Iterable of arrays.
+    :param size: The maximum length of a chunk.
+    :return: Generator of the split arrays.
+    """
+    for chunk in chunks:
+        for start in range(0, len(chunk), size):
+            yield chunk[start:start + size]
+
+
+def zigzag_deltas(values: np.ndarray, previous: int) -> np.ndarray:
+    """Calculates the differences of consecutive values, mapping signed differences to unsigned values.
+
+    The differences 0, -1, 1, -2, 2, ... become 0, 1, 2, 3, 4, ...
+
+    :param values: The values as int64 array.
+    :param previous: The value preceding the first value.
+    :return: The zigzag encoded differences as uint64 array.
+    """
+    deltas = np.diff(values, prepend=np.int64(previous))
+    return ((deltas << 1) ^ (deltas >> 63)).view(np.uint64)
+
+
+def encode_varints(values: np.ndarray) -> np.ndarray:
+    """Encodes the values as variable-length integers with 7 bits per byte, least significant group first.
+
+    The highest bit of a byte is set if another byte of the same value follows.
+
+    :param values: The values as uint64 array.
+    :return: The encoded bytes as uint8 array.
     """
-    stream.write(struct.pack(format_string[binary_type] % len(values), *values))
+    lengths = np.ones(len(values), dtype=np.int64)
+    remainder = values >> np.uint64(7)
+    while np.any(remainder):
+        lengths += remainder > 0
+        remainder >>= np.uint64(7)
+    byte_indices = np.arange(int(lengths.max(initial=1)))
+    groups = (values[:, None] >> (byte_indices * 7).astype(np.uint64)) & np.uint64(0x7F)
+    groups |= np.where(byte_indices < lengths[:, None] - 1, np.uint64(0x80), np.uint64(0))
+    return groups.astype(np.uint8)[byte_indices < lengths[:, None]]
 
 
 def write_binary_string(stream: BinaryIO, value: str):
@@ -0,0 +1,320 @@
+"""Imports or analyzes the given ARES file."""
+import os
+import zlib
+
+from exporter.ares_export import (VERTEX_ENCODING_FP16, VERTEX_ENCODING_QUANTIZED, BinaryType, get_smallest_uint,
+                                  numpy_dtype)
+from interfaces.import_interface import ImportInterface
+from interfaces.mesh_data import DataBlock, MeshData, MeshStream, get_connectivity_dtype, precision_dtypes
+import normalize
+import numpy as np
+
+
+# ======================================================================================================================
+#            _____  ______  _____      _____ __  __ _____   ____  _____ _______
+#      /\   |  __ \|  ____|/ ____|    |_   _|  \/  |  __ \ / __ \|  __ \__   __|
+#     /  \  | |__) | |__  | (___        | | | \  / | |__) | |  | | |__) | | |
+#    / /\ \ |  _  /|  __|  \___ \       | | | |\/| |  ___/| |  | |  _  /  | |
+#   / ____ \| | \ \| |____ ____) |     _| |_| |  | | |    | |__| | | \ \  | |
+#  /_/    \_\_|  \_\______|_____/     |_____|_|  |_|_|     \____/|_|  \_\ |_|
+#
+# ======================================================================================================================
+
+# Header written by Export.write_header
+ARES_HEADER_DTYPE = np.dtype([("format_identifier", "u1"), ("vertex_amount", "<u4"), ("polygon", "u1"),
+                              ("face_amount", "<u4"), ("frames", "<u2"), ("data_blocks", "u1")])
+
+# The plain format does not store the vertex precision, the precisions are tried in this order until the sections
+# fill the whole file
+plain_vertex_precisions = ["FP32", "FP16", "FP64"]
+
+# Amount of vertices per chunk of the streaming extraction
+stream_chunk_vertices = 1 << 22
+
+
+class Import(ImportInterface):
+    """Import class that contains the ARES file import."""
+
+    def supported_formats(self) -> list:
+        """Returns the supported formats.
+
+        :return: The supported formats.
+        """
+        return ["ares"]
+
+    def estimate_memory(self, file_path):
+        """Estimates the peak memory required to extract the file, the sections are memory-mapped.
+
+        :param file_path: The path to the desired file.
+        :return: The estimated memory in bytes.
+        """
+        header = self.read_header(file_path)
+        # The connectivity is converted to 32 bit and the vertices are copied by the normalization
+        return int(header["vertex_amount"]) * int(header["frames"]) * 12 + int(header["face_amount"]) * \
+            int(header["polygon"]) * 4
+
+    def analyze(self, file_path):
+        """Analyzes the file with the given file path from its header and outputs the mesh information.
+
+        :param file_path: The path to the desired file.
+        """
+        header = self.read_header(file_path)
+        print("#Format identifier: " + str(header["format_identifier"]))
+        print("#Vertices amount: " + str(header["vertex_amount"]))
+        print("#Faces amount: " + str(header["face_amount"]))
+        print("#Polygon: " + str(header["polygon"]))
+        print("#Frames: " + str(header["frames"]))
+        print("#Data blocks: " + str(header["data_blocks"]))
+
+    def extract(self, file_path, options):
+        """Extracts the data from the file.
+
+        The vertices and data blocks of the plain format are read-only views of the memory-mapped file.
+
+        :param file_path: The path to the desired file.
+        :param options: Options string reflecting the user decisions for the import process.
+        :return: The mesh data.
+        """
+        buffer = self.map_file(file_path)
+        header = buffer[:ARES_HEADER_DTYPE.itemsize].view(ARES_HEADER_DTYPE)[0]
+        if header["format_identifier"] == 0:
+            return self.parse_plain(buffer, header)
+        if header["format_identifier"] == 1:
+            return self.parse_compact(buffer, header)
+        raise ValueError("Unknown ARES format identifier %d" % header["format_identifier"])
+
+    def extract_stream(self, file_path, options):
+        """Extracts plain files without data blocks in chunks copied from the memory-mapped file.
+
+        :param file_path: The path to the desired file.
+        :param options: Options string reflecting the user decisions for the import process.
+        :return: The mesh stream or None if the file does not support streaming.
+        """
+        buffer = self.map_file(file_path)
+        header = buffer[:ARES_HEADER_DTYPE.itemsize].view(ARES_HEADER_DTYPE)[0]
+        if header["format_identifier"] != 0 or header["data_blocks"] != 0:
+            return None
+        vertex_precision, vertices, connectivity, _ = self.map_plain(buffer, header)
+        vertices = vertices.reshape(-1, 3)
+        connectivity_dtype = get_connectivity_dtype(len(vertices))
+
+        def vertex_chunks():
+            for start in range(0, len(vertices), stream_chunk_vertices):
+                yield np.array(vertices[start:start + stream_chunk_vertices], dtype=np.float32)
+
+        def connectivity_chunks():
+            for start in range(0, len(connectivity), stream_chunk_vertices):
+                yield connectivity[start:start + stream_chunk_vertices].astype(connectivity_dtype)
+
+        minimum = np.full(3, np.inf, dtype=np.float32)
+        maximum = np.full(3, -np.inf, dtype=np.float32)
+        for chunk in vertex_chunks():
+            if len(chunk):
+                chunk_minimum, chunk_maximum = normalize.get_bounds(chunk)
+                np.minimum(minimum, chunk_minimum, out=minimum)
+                np.maximum(maximum, chunk_maximum, out=maximum)
+        return MeshStream(int(header["polygon"]), int(header["frames"]), int(header["vertex_amount"]),
+                          int(header["face_amount"]), minimum, maximum, vertex_chunks, connectivity_chunks,
+                          vertex_precision)
+
+    @staticmethod
+    def read_header(file_path):
+        """Reads the header of the file.
+
+        :param file_path: The path to the file.
+        :return: The header record with the fields of ARES_HEADER_DTYPE.
+        """
+        header = np.fromfile(file_path, dtype=ARES_HEADER_DTYPE, count=1)
+        if len(header) == 0:
+            raise ValueError("File is too short for an ARES header")
+        return header[0]
+
+    @staticmethod
+    def map_file(file_path):
+        """Maps the whole file as read-only byte array.
+
+        :param file_path: The path to the file.
+        :return: The memory-mapped uint8 array.
+        """
+        if os.path.getsize(file_path) < ARES_HEADER_DTYPE.itemsize:
+            raise ValueError("File is too short for an ARES header")
+        return np.memmap(file_path, dtype=np.uint8, mode="r")
+
+    @staticmethod
+    def parse_plain(buffer, header):
+        """Creates the mesh data from the sections of the plain format.
+
+        :param buffer: The memory-mapped file.
+        :param header: The header record.
+        :return: The mesh data.
+        """
+        vertex_precision, vertices, connectivity, blocks = Import.map_plain(buffer, header)
+        return MeshData(int(header["polygon"]), int(header["frames"]), vertices.reshape(-1, 3), connectivity,
+                        vertex_precision, blocks)
+
+    @staticmethod
+    def map_plain(buffer, header):
+        """Maps the sections of the plain format with the first vertex precision whose sections fill the file.
+
+        :param buffer: The memory-mapped file.
+        :param header: The header record.
+        :return: The vertex precision name, the flat vertices, the connectivity and the data blocks.
+        """
+        for vertex_precision in plain_vertex_precisions:
+            sections = Import.map_plain_sections(buffer, header, vertex_precision)
+            if sections is not None:
+                return (vertex_precision,) + sections
+        raise ValueError("The ARES sections do not match the file size")
+
+    @staticmethod
+    def map_plain_sections(buffer, header, vertex_precision):
+        """Maps the sections of the plain format assuming the given vertex precision.
+
+        Data blocks that are not per-vertex are expected to hold one value per face, except for the last data block,
+        which fills the rest of the file.
+
+        :param buffer: The memory-mapped file.
+        :param header: The header record.
+        :param vertex_precision: The precision name of the vertex positions.
+        :return: The flat vertices, the connectivity and the data blocks or None if the sections do not fill the file.
+        """
+        vertex_amount = int(header["vertex_amount"])
+        face_amount = int(header["face_amount"])
+        polygon = int(header["polygon"])
+        frames = int(header["frames"])
+        vertex_dtype = numpy_dtype[BinaryType[vertex_precision]]
+        connectivity_dtype = numpy_dtype[get_smallest_uint(vertex_amount)]
+
+        offset = ARES_HEADER_DTYPE.itemsize
+        vertices, offset = read_section(buffer, offset, vertex_dtype, vertex_amount * frames * 3)
+        connectivity, offset = read_section(buffer, offset, connectivity_dtype, face_amount * polygon)
+        if connectivity is None:
+            return None
+
+        blocks = []
+        block_amount = int(header["data_blocks"])
+        for index in range(block_amount):
+            if offset >= len(buffer) or offset + int(buffer[offset]) + 3 > len(buffer):
+                return None
+            name_length = int(buffer[offset])
+            name = bytes(buffer[offset + 1:offset + 1 + name_length]).decode("ascii", errors="replace")
+            offset += name_length + 1
+            precision = int(buffer[offset])
+            per_vertex = bool(buffer[offset + 1])
+            offset += 2
+            if precision >= len(precision_dtypes):
+                return None
+            dtype = precision_dtypes[precision]
+            amount = vertex_amount if per_vertex else face_amount
+            if not per_vertex and index == block_amount - 1:
+                amount = (len(buffer) - offset) // dtype.itemsize
+            values, offset = read_section(buffer, offset, dtype, amount)
+            if values is None:
+                return None
+            blocks.append(DataBlock(name, precision, values))
+
+        if offset != len(buffer):
+            return None
+        return vertices, connectivity, blocks
+
+    @staticmethod
+    def parse_compact(buffer, header):
+        """Creates the mesh data from the sections of the compact format, which are decoded into new arrays.
+
+        :param buffer: The memory-mapped file.
+        :param header: The header record.
+        :return: The mesh data.
+        """
+        vertex_amount = int(header["vertex_amount"])
+        frames = int(header["frames"])
+        offset = ARES_HEADER_DTYPE.itemsize
+        compressed = bool(buffer[offset])
+        encoding = int(buffer[offset + 1])
+        offset += 3
+        transform, offset = read_section(buffer, offset, np.dtype("<f4"), 6)
+        section, offset = read_compact_section(buffer, offset, compressed)
+        if encoding == VERTEX_ENCODING_QUANTIZED:
+            vertices = section.view("<u2").reshape(-1, 3) * transform[3:] + transform[:3]
+        elif encoding == VERTEX_ENCODING_FP16:
+            vertices = section.view("<f2").reshape(-1, 3)
+        else:
+            vertices = section.view("<f4").reshape(-1, 3)
+
+        # The byte after the vertex section holds the connectivity encoding, which only has the delta varint value
+        section, offset = read_compact_section(buffer, offset + 1, compressed)
+        connectivity = decode_zigzag_deltas(decode_varints(section))
+
+        blocks = []
+        for _ in range(int(header["data_blocks"])):
+            name_length = int(buffer[offset])
+            name = bytes(buffer[offset + 1:offset + 1 + name_length]).decode("ascii", errors="replace")
+            offset += name_length + 1
+            precision = int(buffer[offset])
+            section, offset = read_compact_section(buffer, offset + 2, compressed)
+            blocks.append(DataBlock(name, precision, section.view(precision_dtypes[precision])))
+
+        if len(vertices) != vertex_amount * frames or offset != len(buffer):
+            raise ValueError("The ARES sections do not match the header")
+        return MeshData(int(header["polygon"]), frames, vertices, connectivity, "FP32", blocks)
+
+
+def read_section(buffer, offset, dtype, amount):
+    """Returns a view of the given amount of values at the offset.
+
+    :param buffer: The memory-mapped file.
+    :param offset: The byte offset of the first value.
+    :param dtype: The dtype of the values.
+    :param amount: The amount of values.
+    :return: The read-only view or None if the file is too short, and the offset after the values.
+    """
+    end = offset + amount * dtype.itemsize
+    if end > len(buffer):
+        return None, end
+    return buffer[offset:end].view(dtype), end
+
+
+def read_compact_section(buffer, offset, compressed):
+    """Reads a section of the compact format prefixed with its stored size.
+
+    :param buffer: The memory-mapped file.
+    :param offset: The byte offset of the size.
+    :param compressed: Decompresses the section with zlib.
+    :return: The section as uint8 array and the offset after the section.
+    """
+    size, offset = read_section(buffer, offset, np.dtype("<u8"), 1)
+    if size is None or offset + int(size[0]) > len(buffer):
+        raise ValueError("The ARES sections do not match the file size")
+    end = offset + int(size[0])
+    section = buffer[offset:end]
+    if compressed:
+        section = np.frombuffer(zlib.decompress(section), dtype=np.uint8)
+    return section, end
+
+
+def decode_varints(data):
+    """Decodes the variable-length integers written by encode_varints of the ARES exporter.
+
+    :param data: The encoded bytes as uint8 array.
+    :return: The values as uint64 array.
+    """
+    data = np.asarray(data, dtype=np.uint8)
+    last = data < 0x80
+    value_index = np.cumsum(last) - last
+    starts = np.flatnonzero(np.concatenate([[True], last[:-1]]))
+    positions = np.arange(len(data)) - starts[value_index]
+    values = np.zeros(int(np.count_nonzero(last)), dtype=np.uint64)
+    groups = (data & 0x7F).astype(np.uint64)
+    for position in range(int(positions.max(initial=0)) + 1):
+        selection = positions == position
+        values[value_index[selection]] |= groups[selection] << np.uint64(position * 7)
+    return values
+
+
+def decode_zigzag_deltas(values):
+    """Restores the values from their zigzag encoded differences.
+
+    :param values: The zigzag encoded differences as uint64 array.
+    :return: The values as int64 array.
+    """
+    deltas = (values >> np.uint64(1)).view(np.int64) ^ -(values & np.uint64(1)).view(np.int64)
+    return np.cumsum(deltas)
@@ -0,0 +1,322 @@
+"""Imports or analyzes the given Wavefront OBJ file."""
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import instrumentation
+import normals
+import parsing
+from interfaces.import_interface import ImportInterface
+from interfaces.mesh_data import MeshData
+from options import Option, parse_options, print_options
+import numpy as np
+
+
+# ======================================================================================================================
+#     ____  ____       _     _____ __  __ _____   ____  _____ _______
+#    / __ \|  _ \     | |   |_   _|  \/  |  __ \ / __ \|  __ \__   __|
+#   | |  | | |_) |    | |     | | | \  / | |__) | |  | | |__) | | |
+#   | |  | |  _ < _   | |     | | | |\/| |  ___/| |  | |  _  /  | |
+#   | |__| | |_) | |__| |    _| |_| |  | | |    | |__| | | \ \  | |
+#    \____/|____/ \____/    |_____|_|  |_|_|     \____/|_|  \_\ |_|
+#
+# ======================================================================================================================
+
+# Fallback patterns for vertex lines with more than three values and faces mixing index forms
+OBJ_VERTEX_PATTERN = re.compile(rb"\nv[ \t]+([^ \t\r\n]+[ \t]+[^ \t\r\n]+[ \t]+[^ \t\r\n]+)")
+OBJ_ATTRIBUTE_INDEX_PATTERN = re.compile(rb"/[^ \t\r\n]*")
+# The keywords are replaced with blanks so whole runs of lines are parsed at once, slashes separate the vertex,
+# texture coordinate and normal indices of the v/vt/vn, v//vn and v/vt index forms
+VERTEX_KEYWORD_TABLE = bytes.maketrans(b"v", b" ")
+FACE_KEYWORD_TABLE = bytes.maketrans(b"f/", b"  ")
+
+# Line types of the classification
+LINE_OTHER, LINE_VERTEX, LINE_FACE = 0, 1, 2
+
+# Runs of vertex or face lines are copied one by one up to this amount, else the lines are gathered with a byte mask
+line_run_limit = 4096
+
+obj_options = [
+    Option("smooth", "Enable smooth shading", bool, False),
+    Option("crease_angle", "Smooth shading crease angle in degrees (0 for none)", float, 0.0)
+]
+
+
+class Import(ImportInterface):
+    """Import class that contains the Wavefront OBJ file import.
+
+    Only the vertex positions and the vertex indices of the faces are imported, polygons are fan-triangulated.
+    """
+
+    def supported_formats(self) -> list:
+        """Returns the supported formats.
+
+        :return: The supported formats.
+        """
+        return ["obj"]
+
+    def option_definitions(self) -> list:
+        """Returns the option definitions.
+
+        :return: The option definitions in the order of the option lines.
+        """
+        return obj_options
+
+    def analyze(self, file_path):
+        """Counts the vertex and face lines of the file in a single pass and outputs them with the options.
+
+        :param file_path: The path to the desired file.
+        """
+        line_amounts = np.zeros(3, dtype=np.int64)
+        with instrumentation.stage("count") as counts:
+            for buffer in parsing.read_buffers(file_path, 0, os.path.getsize(file_path)):
+                line_amounts += np.bincount(self.classify_lines(buffer)[1], minlength=3)
+            counts.update(vertices=int(line_amounts[LINE_VERTEX]), faces=int(line_amounts[LINE_FACE]))
+        print("#Vertices amount: " + str(line_amounts[LINE_VERTEX]))
+        print("#Faces amount: " + str(line_amounts[LINE_FACE]))
+        print_options(obj_options)
+
+    def extract(self, file_path, options):
+        """Extracts the data from the file.
+
+        :param file_path: The path to the desired file.
+        :param options: Options string reflecting the user decisions for the import process.
+        :return: The mesh data.
+        """
+        values = parse_options(options, obj_options)
+        size = os.path.getsize(file_path)
+        if parsing.parse_workers > 1 and size > parsing.parallel_parse_size:
+            vertices, triangles = self.parse_parallel(file_path, parsing.parse_workers)
+        else:
+            vertices, triangles, _ = self.parse_range(file_path, 0, size)
+        if len(triangles) and (triangles.min() < 0 or triangles.max() >= len(vertices)):
+            raise ValueError("Invalid face index in OBJ file")
+        data = MeshData(3, 1, vertices, triangles)
+        if values["smooth"]:
+            with instrumentation.stage("normals") as counts:
+                normals.add_vertex_normals(data, values["crease_angle"])
+                counts["vertices"] = data.vertex_amount
+        return data
+
+    @staticmethod
+    def parse_parallel(file_path, workers):
+        """Parses byte ranges of the file split at line breaks by several worker processes.
+
+        :param file_path: The path to the file.
+        :param workers: The amount of worker processes.
+        :return: The vertices as float32 array of shape (N, 3) and the triangles as int64 array of shape (T, 3).
+        """
+        ranges = Import.split_ranges(file_path, workers)
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as executor:
+            results = list(executor.map(Import.parse_range, [file_path] * len(ranges), *zip(*ranges)))
+
+        # Negative indices were resolved within their range and are shifted by the vertices of the preceding ranges
+        vertex_offset = 0
+        for vertices, triangles, relative in results:
+            triangles[relative] += vertex_offset
+            vertex_offset += len(vertices)
+        return np.concatenate([np.zeros((0, 3), dtype=np.float32)] + [result[0] for result in results]), \
+            np.concatenate([np.zeros((0, 3), dtype=np.int64)] + [result[1] for result in results])
+
+    @staticmethod
+    def split_ranges(file_path, amount):
+        """Splits the file into byte ranges of similar size starting at line breaks.
+
+        :param file_path: The path to the file.
+        :param amount: The desired amount of ranges.
+        :return: List of (start, end) tuples, every range after the first starts with a line break.
+        """
+        size = os.path.getsize(file_path)
+        bounds = [0]
+        with open(file_path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for i in range(1, amount):
+                position = data.find(b"\n", max(size * i // amount, bounds[-1] + 1))
+                if position < 0:
+                    break
+                bounds.append(position)
+        bounds.append(size)
+        return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if start < end]
+
+    @staticmethod
+    def parse_range(file_path, start, end):
+        """Parses the vertex and face lines of a byte range of the file, usually inside a worker process.
+
+        :param file_path: The path to the file.
+        :param start: The first byte of the range, which has to be the start of the file or a line break.
+        :param end: The end of the range, which has to be the end of the file or a line break.
+        :return: The vertices as float32 array of shape (N, 3), the zero-based triangles as int64 array of shape
+            (T, 3) and a boolean array marking the indices relative to the first vertex of the range.
+        """
+        vertex_chunks = [np.zeros((0, 3), dtype=np.float32)]
+        triangle_chunks = [np.zeros((0, 3), dtype=np.int64)]
+        relative_chunks = [np.zeros((0, 3), dtype=bool)]
+        vertex_amount = 0
+        for buffer in parsing.read_buffers(file_path, start, end):
+            vertices, triangles, relative = Import.parse_buffer(buffer, vertex_amount)
+            vertex_chunks.append(vertices)
+            triangle_chunks.append(triangles)
+            relative_chunks.append(relative)
+            vertex_amount += len(vertices)
+        return np.concatenate(vertex_chunks), np.concatenate(triangle_chunks), np.concatenate(relative_chunks)
+
+    @staticmethod
+    def classify_lines(buffer):
+        """Finds the lines of the buffer and determines their type from their keyword.
+
+        :param buffer: Bytes containing complete lines, each preceded by its line break.
+        :return: The positions of the line breaks starting the lines and the line types as uint8 array.
+        """
+        characters = np.frombuffer(buffer + b"\n\n", dtype=np.uint8)
+        line_starts = np.flatnonzero(characters[:len(buffer)] == 10)
+        keywords = characters[line_starts + 1]
+        separated = (characters[line_starts + 2] == 32) | (characters[line_starts + 2] == 9)
+        types = np.zeros(len(line_starts), dtype=np.uint8)
+        types[(keywords == ord("v")) & separated] = LINE_VERTEX
+        types[(keywords == ord("f")) & separated] = LINE_FACE
+        return line_starts, types
+
+    @staticmethod
+    def gather_lines(buffer, line_starts, selected):
+        """Concatenates the selected lines of the buffer.
+
+        :param buffer: Bytes containing complete lines, each preceded by its line break.
+        :param line_starts: The positions of the line breaks starting the lines.
+        :param selected: Boolean array marking the selected lines.
+        :return: The selected lines with their leading line breaks.
+        """
+        line_ends = np.append(line_starts[1:], len(buffer))
+        changes = np.diff(np.concatenate([[False], selected, [False]]).astype(np.int8))
+        run_starts = np.flatnonzero(changes == 1)
+        run_ends = np.flatnonzero(changes == -1) - 1
+        if len(run_starts) <= line_run_limit:
+            return b"".join(buffer[start:end] for start, end in zip(line_starts[run_starts].tolist(),
+                                                                   line_ends[run_ends].tolist()))
+        mask = np.repeat(selected, line_ends - line_starts)
+        return np.frombuffer(buffer, dtype=np.uint8)[mask].tobytes()
+
+    @staticmethod
+    def parse_buffer(buffer, vertex_offset):
+        """Parses the vertex and face lines of the given buffer.
+
+        :param buffer: Bytes containing complete lines, each preceded by its line break.
+        :param vertex_offset: The amount of vertices in the preceding buffers of the range.
+        :return: The vertices as float32 array of shape (K, 3), the zero-based triangles as int64 array of shape
+            (T, 3) and a boolean array marking the indices relative to the first vertex of the range.
+        """
+        line_starts, types = Import.classify_lines(buffer)
+        vertex_lines = types == LINE_VERTEX
+        face_lines = types == LINE_FACE
+        vertices = Import.parse_vertices(Import.gather_lines(buffer, line_starts, vertex_lines),
+                                         int(np.count_nonzero(vertex_lines)))
+        face_amount = int(np.count_nonzero(face_lines))
+        if face_amount == 0:
+            return vertices, np.zeros((0, 3), dtype=np.int64), np.zeros((0, 3), dtype=bool)
+        indices, sizes = Import.parse_faces(Import.gather_lines(buffer, line_starts, face_lines), face_amount)
+
+        # Positive indices start at 1, negative indices count back from the last vertex defined before the face
+        relative = indices < 0
+        if np.any(relative):
+            bases = vertex_offset + np.cumsum(vertex_lines)[face_lines]
+            indices = np.where(relative, indices + (np.repeat(bases, 3) if sizes is None else np.repeat(bases, sizes)),
+                               indices - 1)
+        else:
+            indices -= 1
+        if sizes is None:
+            return vertices, indices.reshape(-1, 3), relative.reshape(-1, 3)
+        return vertices, parsing.triangulate(indices, sizes), parsing.triangulate(relative, sizes)
+
+    @staticmethod
+    def parse_vertices(text, vertex_amount):
+        """Parses the coordinates of the given vertex lines.
+
+        :param text: The vertex lines, each preceded by its line break.
+        :param vertex_amount: The amount of vertex lines.
+        :return: The vertices as float32 array of shape (K, 3).
+        """
+        coordinates = Import.parse_fixed_decimals(text)
+        if coordinates is None or len(coordinates) != vertex_amount * 3:
+            coordinates = np.fromstring(text.translate(VERTEX_KEYWORD_TABLE), dtype=np.float32, sep=" ")
+        if len(coordinates) != vertex_amount * 3:
+            # Lines with a weight or a vertex color only keep their first three values
+            lines = OBJ_VERTEX_PATTERN.findall(text)
+            coordinates = np.fromstring(b" ".join(lines), dtype=np.float32, sep=" ") if lines else coordinates[:0]
+            if len(lines) != vertex_amount or len(coordinates) != vertex_amount * 3:
+                raise ValueError("Invalid vertex line in OBJ file")
+        return coordinates.reshape(-1, 3)
+
+    @staticmethod
+    def parse_fixed_decimals(text):
+        """Parses vertex lines whose numbers all have the same amount of decimal places, as written by most exporters.
+
+        The numbers are parsed as integers without their decimal point, which is a lot faster than parsing floats.
+        Dividing the exact integers by the exact power of ten rounds like parsing the decimals as double.
+
+        :param text: The vertex lines, each preceded by its line break.
+        :return: The coordinates as flat float32 array or None if the numbers do not have fixed decimal places.
+        """
+        first_dot = text.find(b".")
+        if first_dot < 0 or any(letter in text for letter in (b"e", b"E", b"n", b"N")):
+            return None
+        characters = np.frombuffer(text + b"\n" * 24, dtype=np.uint8)
+        blanks = np.flatnonzero(np.isin(characters[first_dot:first_dot + 24], (9, 10, 13, 32)))
+        if len(blanks) == 0:
+            return None
+        places = int(blanks[0]) - 1
+        mantissas = np.fromstring(text.translate(VERTEX_KEYWORD_TABLE, b"."), dtype=np.int64, sep=" ")
+        dots = np.flatnonzero(characters == 46)
+        if len(dots) != len(mantissas) or len(dots) == 0:
+            return None
+        # Every number ends after the same amount of digits following its decimal point
+        ends = characters[dots + places + 1]
+        if not np.all((ends == 32) | (ends == 10) | (ends == 9) | (ends == 13)):
+            return None
+        for offset in range(1, places + 1):
+            digits = characters[dots + offset]
+            if not np.all((digits >= 48) & (digits <= 57)):
+                return None
+        if np.abs(mantissas).max() >= 1 << 53:
+            return None
+        coordinates = (mantissas / 10.0 ** places).astype(np.float32)
+
+        # The integers lose the sign of negative zeros
+        zeros = np.flatnonzero(mantissas == 0)
+        if len(zeros):
+            before = characters[dots[zeros] - 1]
+            negative = (before == 45) | ((before == 48) & (characters[dots[zeros] - 2] == 45))
+            coordinates[zeros[negative]] = -0.0
+        return coordinates
+
+    @staticmethod
+    def parse_faces(text, face_amount):
+        """Parses the vertex indices of the given face lines.
+
+        The index form of the first vertex determines how many indices each face vertex has, lines mixing index forms
+        fall back to removing the texture coordinate and normal indices with a regular expression.
+
+        :param text: The face lines, each preceded by its line break.
+        :param face_amount: The amount of face lines.
+        :return: The flat vertex indices as int64 array and the amount of vertices of every face or None if all faces
+            are triangles.
+        """
+        line_end = text.find(b"\n", 1)
+        tokens = text[1:line_end if line_end > 0 else len(text)].split()
+        if len(tokens) < 2:
+            raise ValueError("Invalid face line in OBJ file")
+        first = tokens[1]
+        slashes = first.count(b"/")
+        stride = slashes + 1 - first.count(b"//")
+        values = np.fromstring(text.translate(FACE_KEYWORD_TABLE), dtype=np.int64, sep=" ")
+        if len(values) % stride or text.count(b"/") != slashes * (len(values) // stride):
+            values = np.fromstring(OBJ_ATTRIBUTE_INDEX_PATTERN.sub(b"", text).translate(FACE_KEYWORD_TABLE),
+                                   dtype=np.int64, sep=" ")
+            stride = 1
+        indices = values[::stride] if stride > 1 else values
+
+        # Faces with at least three vertices only add up to three indices per face if all of them are triangles
+        if len(indices) == face_amount * 3:
+            return indices, None
+        sizes = parsing.count_tokens(text, face_amount) - 1
+        if len(indices) != sizes.sum() or np.any(sizes < 3):
+            raise ValueError("Invalid face line in OBJ file")
+        return indices, sizes
@@ -0,0 +1,511 @@
+"""Imports or analyzes the given PLY file."""
+import mmap
+import parsing
+from interfaces.import_interface import ImportInterface
+from interfaces.mesh_data import DataBlock, MeshData, precision_dtypes
+from options import Option, parse_options, print_options
+import numpy as np
+
+
+# ======================================================================================================================
+#   _____  _  __     __    _____ __  __ _____   ____  _____ _______
+#  |  __ \| | \ \   / /   |_   _|  \/  |  __ \ / __ \|  __ \__   __|
+#  | |__) | |  \ \_/ /      | | | \  / | |__) | |  | | |__) | | |
+#  |  ___/| |   \   /       | | | |\/| |  ___/| |  | |  _  /  | |
+#  | |    | |____| |       _| |_| |  | | |    | |__| | | \ \  | |
+#  |_|    |______|_|      |_____|_|  |_|_|     \____/|_|  \_\ |_|
+#
+# ======================================================================================================================
+
+# NumPy type codes of the PLY property types
+PLY_TYPES = {"char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1", "short": "i2", "int16": "i2", "ushort": "u2",
+             "uint16": "u2", "int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4", "float": "f4",
+             "float32": "f4", "double": "f8", "float64": "f8"}
+
+# Byte order of the PLY formats, None for ascii
+PLY_FORMATS = {"ascii": None, "binary_little_endian": "<", "binary_big_endian": ">"}
+
+# Vertex properties imported as data blocks with a fixed name
+normal_properties = {"nx": "NV1", "ny": "NV2", "nz": "NV3"}
+
+# Names of the list property holding the vertex indices of a face
+face_index_properties = ("vertex_indices", "vertex_index")
+
+# Maximum size of the header in bytes
+maximum_header_size = 1 << 20
+
+# Amount of bytes searched at once for the line breaks of ascii elements
+line_count_chunk_size = 1 << 24
+
+# Amount of records checked at first for a run of list records with equal lengths, doubled while the run continues
+list_run_start = 64
+
+ply_options = [
+    Option("vertex_properties", "Export vertex properties as data blocks", bool, True)
+]
+
+
+class PlyProperty:
+    """A scalar or list property of a PLY element."""
+    __slots__ = ("name", "dtype", "count_dtype")
+
+    def __init__(self, name: str, dtype: np.dtype, count_dtype: np.dtype = None):
+        """Creates the property.
+
+        :param name: The name of the property.
+        :param dtype: The dtype of the value or of the list items.
+        :param count_dtype: The dtype of the list length or None for scalar properties.
+        """
+        self.name = name
+        self.dtype = dtype
+        self.count_dtype = count_dtype
+
+
+class PlyElement:
+    """An element of a PLY file with its records."""
+    __slots__ = ("name", "count", "properties")
+
+    def __init__(self, name: str, count: int):
+        """Creates the element without properties.
+
+        :param name: The name of the element.
+        :param count: The amount of records.
+        """
+        self.name = name
+        self.count = count
+        self.properties = []
+
+    def is_fixed(self) -> bool:
+        """Checks if the records of the element have a fixed size.
+
+        :return: True if the element has no list properties, else False.
+        """
+        return all(prop.count_dtype is None for prop in self.properties)
+
+    def get_dtype(self, lengths: tuple = ()) -> np.dtype:
+        """Creates the structured dtype of the records with the given list lengths.
+
+        :param lengths: The length of every list property in property order.
+        :return: The structured dtype, the length of a list property is stored in the field "<name>_count".
+        """
+        fields = []
+        lengths = iter(lengths)
+        for prop in self.properties:
+            if prop.count_dtype is None:
+                fields.append((prop.name, prop.dtype))
+            else:
+                fields.append((prop.name + "_count", prop.count_dtype))
+                fields.append((prop.name, prop.dtype, (next(lengths),)))
+        return np.dtype(fields)
+
+
+class PlyHeader:
+    """The parsed header of a PLY file."""
+    __slots__ = ("byte_order", "elements", "size")
+
+    def __init__(self, byte_order, elements: list, size: int):
+        """Creates the header.
+
+        :param byte_order: "<" or ">" for binary files, None for ascii files.
+        :param elements: The elements in file order.
+        :param size: The size of the header in bytes including the line break after end_header.
+        """
+        self.byte_order = byte_order
+        self.elements = elements
+        self.size = size
+
+    def get_element(self, name: str):
+        """Returns the element with the given name.
+
+        :param name: The name of the element.
+        :return: The element or None if the file has no such element.
+        """
+        return next((element for element in self.elements if element.name == name), None)
+
+
+class Import(ImportInterface):
+    """Import class that contains the PLY file import.
+
+    The vertex element needs the properties x, y and z, the face element a list property vertex_indices or
+    vertex_index. Other elements are skipped.
+    """
+
+    def supported_formats(self) -> list:
+        """Returns the supported formats.
+
+        :return: The supported formats.
+        """
+        return ["ply"]
+
+    def option_definitions(self) -> list:
+        """Returns the option definitions.
+
+        :return: The option definitions in the order of the option lines.
+        """
+        return ply_options
+
+    def analyze(self, file_path):
+        """Analyzes the file from its header and outputs the mesh information and options.
+
+        :param file_path: The path to the desired file.
+        """
+        header = self.read_header(file_path)
+        vertex_element = header.get_element("vertex")
+        face_element = header.get_element("face")
+        print("#File is binary: " + str(header.byte_order is not None))
+        print("#Vertices amount: " + str(vertex_element.count if vertex_element else 0))
+        print("#Faces amount: " + str(face_element.count if face_element else 0))
+        if vertex_element:
+            print("#Vertex properties: " + ", ".join(prop.name for prop in vertex_element.properties
+                                                     if prop.name not in ("x", "y", "z")))
+        print_options(ply_options)
+
+    def extract(self, file_path, options):
+        """Extracts the data from the file.
+
+        The records of binary files are read-only views of the memory-mapped file.
+
+        :param file_path: The path to the desired file.
+        :param options: Options string reflecting the user decisions for the import process.
+        :return: The mesh data.
+        """
+        values = parse_options(options, ply_options)
+        header = self.read_header(file_path)
+        vertex_element = header.get_element("vertex")
+        face_element = header.get_element("face")
+        if vertex_element is None or {"x", "y", "z"} - {prop.name for prop in vertex_element.properties}:
+            raise ValueError("PLY file has no vertex element with x, y and z")
+        if not vertex_element.is_fixed():
+            raise ValueError("PLY vertex elements with list properties are not supported")
+        if face_element is not None and not any(prop.name in face_index_properties and prop.count_dtype is not None
+                                                for prop in face_element.properties):
+            raise ValueError("PLY face element has no vertex index list")
+
+        records = self.parse_binary(file_path, header) if header.byte_order else self.parse_ascii(file_path, header)
+        vertices = records["vertex"]
+        triangles = np.zeros((0, 3), dtype=np.int64)
+        if face_element is not None:
+            triangles = self.get_triangles(*records["face"])
+            if len(triangles) and (triangles.min() < 0 or triangles.max() >= vertex_element.count):
+                raise ValueError("Invalid face index in PLY file")
+
+        data = MeshData(3, 1, np.stack([vertices[axis] for axis in ("x", "y", "z")], axis=1), triangles)
+        if values["vertex_properties"]:
+            for prop in vertex_element.properties:
+                if prop.name not in ("x", "y", "z"):
+                    data.blocks.append(self.create_block(prop, vertices[prop.name]))
+        return data
+
+    @staticmethod
+    def read_header(file_path):
+        """Reads and parses the header of the file.
+
+        :param file_path: The path to the file.
+        :return: The header.
+        """
+        with open(file_path, "rb") as file:
+            text = file.read(maximum_header_size)
+        end = text.find(b"end_header")
+        if not text.startswith(b"ply") or end < 0:
+            raise ValueError("File has no PLY header")
+        size = text.find(b"\n", end) + 1
+        if size == 0:
+            raise ValueError("File has no PLY data")
+
+        byte_order = None
+        elements = []
+        for line in text[:end].decode("ascii", "replace").splitlines()[1:]:
+            words = line.split()
+            if not words or words[0] in ("comment", "obj_info"):
+                continue
+            if words[0] == "format":
+                if len(words) < 2 or words[1] not in PLY_FORMATS:
+                    raise ValueError("Unknown PLY format " + line)
+                byte_order = PLY_FORMATS[words[1]]
+            elif words[0] == "element" and len(words) == 3:
+                elements.append(PlyElement(words[1], int(words[2])))
+            elif words[0] == "property" and elements:
+                if len(words) == 5 and words[1] == "list" and words[2] in PLY_TYPES and words[3] in PLY_TYPES:
+                    elements[-1].properties.append(PlyProperty(words[4], np.dtype(PLY_TYPES[words[3]]),
+                                                               np.dtype(PLY_TYPES[words[2]])))
+                elif len(words) == 3 and words[1] in PLY_TYPES:
+                    elements[-1].properties.append(PlyProperty(words[2], np.dtype(PLY_TYPES[words[1]])))
+                else:
+                    raise ValueError("Invalid PLY property " + line)
+            else:
+                raise ValueError("Invalid PLY header line " + line)
+
+        if byte_order is not None:
+            for element in elements:
+                for prop in element.properties:
+                    prop.dtype = prop.dtype.newbyteorder(byte_order)
+                    prop.count_dtype = prop.count_dtype.newbyteorder(byte_order) if prop.count_dtype else None
+        return PlyHeader(byte_order, elements, size)
+
+    @staticmethod
+    def parse_binary(file_path, header):
+        """Maps the records of all elements of the binary file.
+
+        :param file_path: The path to the file.
+        :param header: The header.
+        :return: A dictionary mapping the element names to the structured records or to the vertex indices and face
+            sizes of the face element, other elements with list properties are skipped.
+        """
+        buffer = np.memmap(file_path, dtype=np.uint8, mode="r")
+        offset = header.size
+        records = {}
+        for element in header.elements:
+            if element.is_fixed():
+                end = offset + element.count * element.get_dtype().itemsize
+                if end > len(buffer):
+                    raise ValueError("PLY element %s exceeds the file" % element.name)
+                records[element.name] = buffer[offset:end].view(element.get_dtype())
+            else:
+                name = None
+                if element.name == "face":
+                    name = next(prop.name for prop in element.properties
+                                if prop.name in face_index_properties and prop.count_dtype is not None)
+                *lists, end = Import.read_list_records(buffer, offset, element, name)
+                if name is not None:
+                    records[element.name] = lists
+            offset = end
+        return records
+
+    @staticmethod
+    def read_list_records(buffer, offset, element, name=None):
+        """Reads the records of an element with list properties.
+
+        Runs of records with equal list lengths are viewed as structured arrays, a single run covers the element if
+        all lists have the same length, e.g. for triangle meshes. The lengths of the first record of a run determine
+        its dtype, the run ends at the first record with different lengths. After a short run the next list_run_start
+        records are stepped through one by one, so alternating lengths do not create a run per record.
+
+        :param buffer: The memory-mapped file.
+        :param offset: The offset of the first record.
+        :param element: The element.
+        :param name: The name of the list property to collect, None to only skip the records.
+        :return: The flat values of the list property as int64 array, the length of the list in every record and the
+            offset after the element.
+        """
+        lists = [prop for prop in element.properties if prop.count_dtype is not None]
+        value_chunks = [np.zeros(0, dtype=np.int64)]
+        length_chunks = [np.zeros(0, dtype=np.int64)]
+        remaining = element.count
+        window = list_run_start
+        while remaining > 0:
+            lengths = Import.read_list_lengths(buffer, offset, element)
+            dtype = element.get_dtype(lengths)
+            amount = min(remaining, window, (len(buffer) - offset) // dtype.itemsize)
+            if amount == 0:
+                raise ValueError("PLY element %s exceeds the file" % element.name)
+            run = buffer[offset:offset + amount * dtype.itemsize].view(dtype)
+            equal = np.ones(amount, dtype=bool)
+            for prop, length in zip(lists, lengths):
+                equal &= run[prop.name + "_count"] == length
+            amount = amount if equal.all() else int(np.argmin(equal))
+            if name is not None:
+                value_chunks.append(run[name][:amount].reshape(-1).astype(np.int64))
+                length_chunks.append(np.full(amount, dtype[name].shape[0], dtype=np.int64))
+            offset += amount * dtype.itemsize
+            remaining -= amount
+            if amount == len(run):
+                window *= 2
+                continue
+            window = list_run_start
+            if amount < list_run_start:
+                step_amount = min(remaining, list_run_start)
+                values, list_lengths, offset = Import.step_list_records(buffer, offset, element, name, step_amount)
+                value_chunks.append(values)
+                length_chunks.append(list_lengths)
+                remaining -= step_amount
+        return np.concatenate(value_chunks), np.concatenate(length_chunks), offset
+
+    @staticmethod
+    def step_list_records(buffer, offset, element, name, amount):
+        """Reads the given amount of records with list properties one by one.
+
+        :param buffer: The memory-mapped file.
+        :param offset: The offset of the first record.
+        :param element: The element.
+        :param name: The name of the list property to collect, None to only skip the records.
+        :param amount: The amount of records.
+        :return: The flat values of the list property as int64 array, the length of the list in every record and the
+            offset after the records.
+        """
+        data = memoryview(buffer)
+        layout = []
+        for prop in element.properties:
+            if prop.count_dtype is None:
+                layout.append((prop.dtype.itemsize, 0, "little", False, False))
+            else:
+                byte_order = "big" if prop.count_dtype.str[0] == ">" else "little"
+                layout.append((prop.dtype.itemsize, prop.count_dtype.itemsize, byte_order,
+                               prop.count_dtype.kind == "i", prop.name == name))
+        pieces = []
+        lengths = []
+        for _ in range(amount):
+            for size, count_size, byte_order, signed, collect in layout:
+                if not count_size:
+                    offset += size
+                    continue
+                length = int.from_bytes(data[offset:offset + count_size], byte_order, signed=signed)
+                offset += count_size
+                if collect:
+                    pieces.append(data[offset:offset + length * size])
+                    lengths.append(length)
+                offset += length * size
+        if offset > len(buffer):
+            raise ValueError("PLY element %s exceeds the file" % element.name)
+        if name is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), offset
+        dtype = next(prop.dtype for prop in element.properties if prop.name == name)
+        return np.frombuffer(b"".join(pieces), dtype=dtype).astype(np.int64), np.array(lengths, dtype=np.int64), offset
+
+    @staticmethod
+    def read_list_lengths(buffer, offset, element):
+        """Reads the list lengths of the record at the given offset.
+
+        :param buffer: The memory-mapped file.
+        :param offset: The offset of the record.
+        :param element: The element.
+        :return: The length of every list property in property order.
+        """
+        lengths = []
+        for prop in element.properties:
+            if prop.count_dtype is None:
+                offset += prop.dtype.itemsize
+                continue
+            if offset + prop.count_dtype.itemsize > len(buffer):
+                raise ValueError("PLY element %s exceeds the file" % element.name)
+            length = int(buffer[offset:offset + prop.count_dtype.itemsize].view(prop.count_dtype)[0])
+            lengths.append(length)
+            offset += prop.count_dtype.itemsize + length * prop.dtype.itemsize
+        return tuple(lengths)
+
+    @staticmethod
+    def parse_ascii(file_path, header):
+        """Parses the records of all elements of the ascii file chunk by chunk.
+
+        :param file_path: The path to the file.
+        :param header: The header.
+        :return: A dictionary mapping the element names to the structured records or to the vertex indices and face
+            sizes of the face element, other elements with list properties are skipped.
+        """
+        records = {}
+        # The ranges of the elements start at the line break before their first line
+        offset = header.size - 1
+        for element in header.elements:
+            end = Import.find_line_end(file_path, offset, element.count)
+            if element.is_fixed():
+                records[element.name] = Import.parse_ascii_fixed(file_path, offset, end, element)
+            elif element.name == "face":
+                records[element.name] = Import.parse_ascii_faces(file_path, offset, end, element)
+            offset = end
+        return records
+
+    @staticmethod
+    def find_line_end(file_path, start, line_amount):
+        """Finds the line break after the given amount of lines.
+
+        :param file_path: The path to the file.
+        :param start: The line break before the first line.
+        :param line_amount: The amount of lines.
+        :return: The position of the line break ending the last line or the file size.
+        """
+        with open(file_path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position = start
+            remaining = line_amount
+            while remaining > 0:
+                chunk = data[position + 1:position + 1 + line_count_chunk_size]
+                if not chunk:
+                    return len(data)
+                amount = chunk.count(b"\n")
+                if amount >= remaining:
+                    line_ends = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == 10)
+                    return position + 1 + int(line_ends[remaining - 1])
+                remaining -= amount
+                position += len(chunk)
+            return position
+
+    @staticmethod
+    def parse_ascii_fixed(file_path, start, end, element):
+        """Parses the lines of an element without list properties.
+
+        :param file_path: The path to the file.
+        :param start: The line break before the first line.
+        :param end: The line break after the last line.
+        :param element: The element.
+        :return: The structured records.
+        """
+        dtype = element.get_dtype()
+        chunks = [np.zeros(0, dtype=dtype)]
+        for buffer in parsing.read_buffers(file_path, start, end):
+            values = np.fromstring(buffer, dtype=np.float64, sep=" ")
+            if len(values) != buffer.count(b"\n") * len(element.properties):
+                raise ValueError("Invalid line of PLY element " + element.name)
+            values = values.reshape(-1, len(element.properties))
+            chunk = np.empty(len(values), dtype=dtype)
+            for column, prop in enumerate(element.properties):
+                chunk[prop.name] = values[:, column]
+            chunks.append(chunk)
+        return np.concatenate(chunks)
+
+    @staticmethod
+    def parse_ascii_faces(file_path, start, end, element):
+        """Parses the vertex index lists of the face lines.
+
+        :param file_path: The path to the file.
+        :param start: The line break before the first line.
+        :param end: The line break after the last line.
+        :param element: The face element, only scalar properties may precede the vertex index list.
+        :return: The flat vertex indices as int64 array and the amount of vertices of every face.
+        """
+        column = 0
+        for prop in element.properties:
+            if prop.name in face_index_properties and prop.count_dtype is not None:
+                break
+            if prop.count_dtype is not None:
+                raise ValueError("PLY lists before the vertex index list are not supported")
+            column += 1
+
+        index_chunks = [np.zeros(0, dtype=np.int64)]
+        size_chunks = [np.zeros(0, dtype=np.int64)]
+        for buffer in parsing.read_buffers(file_path, start, end):
+            values = np.fromstring(buffer, dtype=np.int64 if column == 0 else np.float64, sep=" ")
+            tokens = parsing.count_tokens(buffer, buffer.count(b"\n"))
+            line_starts = np.cumsum(tokens) - tokens
+            if len(values) != tokens.sum() or np.any(tokens <= column):
+                raise ValueError("Invalid line of PLY element " + element.name)
+            sizes = values[line_starts + column].astype(np.int64)
+            if np.any(tokens < column + 1 + sizes) or np.any(sizes < 0):
+                raise ValueError("Invalid line of PLY element " + element.name)
+            positions = np.repeat(line_starts + column + 1 - (np.cumsum(sizes) - sizes), sizes) + \
+                np.arange(sizes.sum())
+            index_chunks.append(values[positions].astype(np.int64))
+            size_chunks.append(sizes)
+        return np.concatenate(index_chunks), np.concatenate(size_chunks)
+
+    @staticmethod
+    def get_triangles(indices, sizes):
+        """Fan-triangulates the faces.
+
+        :param indices: The flat vertex indices of all faces.
+        :param sizes: The amount of vertices of every face.
+        :return: The triangles as int64 array of shape (T, 3) in face order.
+        """
+        if np.all(sizes == 3):
+            return indices.reshape(-1, 3)
+        if np.any(sizes < 3):
+            raise ValueError("PLY face with fewer than three vertices")
+        return parsing.triangulate(indices, sizes)
+
+    @staticmethod
+    def create_block(prop, values):
+        """Creates the data block of a vertex property with its native precision.
+
+        :param prop: The vertex property.
+        :param values: The values of the property.
+        :return: The data block, normals are named NV1, NV2 and NV3.
+        """
+        dtype = prop.dtype.newbyteorder("<")
+        return DataBlock(normal_properties.get(prop.name, prop.name), precision_dtypes.index(dtype), values)
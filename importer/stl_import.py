@@ -1,9 +1,23 @@
 """Imports or analyzes the given STL file."""
+import glob
+import mmap
 import struct
 import os
+import re
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
+import cache
+import instrumentation
+import mesh_statistics
+import normalize
+import normals
+import parsing
 from interfaces.import_interface import ImportInterface
+from interfaces.mesh_data import DataBlock, MeshData, MeshStream, get_connectivity_dtype
+from options import Option, parse_options, print_options
 import numpy as np
+import weld
 
 
 # ======================================================================================================================
@@ -16,6 +30,65 @@ import numpy as np
 #
 # ======================================================================================================================
 
+STL_HEADER_SIZE = 84
+STL_TRIANGLE_DTYPE = np.dtype([("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")])
+# Vertex lines are matched with their leading line break, which is a lot faster than a multiline pattern
+ASCII_VERTEX_PATTERN = re.compile(rb"\n[ \t]*vertex([^\n]*)")
+
+# Amount of bytes read at once from ascii files
+ascii_chunk_size = 1 << 24
+
+# Estimated peak memory per triangle during extraction, welding and export
+memory_per_triangle = 320
+# Typical size of a facet in ascii files
+ascii_facet_size = 250
+
+# Amount of triangles per chunk of the streaming extraction
+stream_chunk_triangles = 1 << 20
+
+# Splits file names into text and numbers, so frame 10 follows frame 9
+FRAME_NUMBER_PATTERN = re.compile(r"(\d+)")
+# Characters turning a path into a wildcard pattern of frame files
+FRAME_WILDCARDS = "*?["
+
+stl_options = [
+    Option("smooth", "Enable smooth shading", bool, False),
+    Option("facet_normals", "Export facet normals", bool, False),
+    Option("facet_attributes", "Export facet attributes", bool, False),
+    Option("weld_tolerance", "Smooth shading weld tolerance", float, 0.0),
+    Option("crease_angle", "Smooth shading crease angle in degrees (0 for none)", float, 0.0)
+]
+
+
+class StlProbe:
+    """Information about an STL file gathered with a single open of the file."""
+    __slots__ = ("size", "mtime", "binary", "triangle_amount", "vertex_amount", "minimum", "maximum")
+
+    def __init__(self, file_path: str, stat: os.stat_result):
+        """Reads the header of the given file.
+
+        :param file_path: The path to the file.
+        :param stat: The stat result of the file.
+        """
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime_ns
+        with open(file_path, "rb") as file:
+            header = file.read(STL_HEADER_SIZE)
+        # Files shorter than the header can only be ascii files
+        self.triangle_amount = struct.unpack("<I", header[80:])[0] if len(header) == STL_HEADER_SIZE else 0
+        self.binary = len(header) == STL_HEADER_SIZE and STL_HEADER_SIZE + self.triangle_amount * 50 == self.size
+        # The vertices of ascii files are only counted on demand
+        self.vertex_amount = self.triangle_amount * 3 if self.binary else None
+        # The bounds of the vertices are stored when a pass over all vertices computed them
+        self.minimum = None
+        self.maximum = None
+
+
+# Probes of the files opened by this process, keyed by file path in the order of their last use
+stl_probes = OrderedDict()
+# Maximum amount of probes, the least recently used probes are dropped, e.g. in the daemon and batch workers
+probe_cache_size = 64
+
 
 class Import(ImportInterface):
     """Import class that contains the STL file import."""
@@ -27,81 +100,465 @@ class Import(ImportInterface):
         """
         return ["stl"]
 
+    def option_definitions(self) -> list:
+        """Returns the option definitions.
+
+        :return: The option definitions in the order of the option lines.
+        """
+        return stl_options
+
+    def estimate_memory(self, file_path):
+        """Estimates the peak memory required to extract the file from its triangle amount.
+
+        :param file_path: The path to the desired file or frame sequence.
+        :return: The estimated memory in bytes.
+        """
+        frame_paths = self.get_frame_paths(file_path)
+        if frame_paths is not None:
+            return sum(self.estimate_memory(path) for path in frame_paths)
+        probe = self.probe(file_path)
+        if probe.binary:
+            return probe.triangle_amount * memory_per_triangle
+        return probe.size // ascii_facet_size * memory_per_triangle + 4 * ascii_chunk_size
+
+    def always_stream(self, file_path):
+        """Frame sequences are always streamed, so only one frame is held in memory at once.
+
+        :param file_path: The path to the desired file or frame sequence.
+        :return: True for frame sequences.
+        """
+        return self.get_frame_paths(file_path) is not None
+
     def analyze(self, file_path):
         """Analyzes the file with the given file path and outputs mesh information and options.
 
-        :param file_path: The path to the desired file.
+        :param file_path: The path to the desired file or frame sequence.
         """
-        print("#File is binary: " + str(self.is_binary(file_path)))
-        print("#Vertices amount: " + str(self.get_amount_of_vertices(file_path)))
-        print("Enable smooth shading:bool")
+        frame_paths = self.get_frame_paths(file_path)
+        if frame_paths is not None:
+            print("#Frames: " + str(len(frame_paths)))
+            file_path = frame_paths[0]
+        probe = self.probe(file_path)
+        statistics = None
+        # Binary files are only analyzed from their header unless the statistics are enabled, ascii files are parsed
+        # once and the parsed vertices are cached for the following extraction
+        if mesh_statistics.analyze_statistics or not probe.binary:
+            statistics = mesh_statistics.MeshStatistics()
+            with instrumentation.stage("statistics") as counts:
+                for chunk in self.read_vertex_chunks(file_path):
+                    statistics.add_vertices(chunk)
+                counts["vertices"] = probe.vertex_amount
+        print("#File is binary: " + str(probe.binary))
+        print("#Vertices amount: " + str(probe.vertex_amount))
+        if statistics is not None:
+            if probe.vertex_amount:
+                probe.minimum, probe.maximum = statistics.minimum, statistics.maximum
+            statistics.print_information()
+        print_options(stl_options)
 
     def extract(self, file_path, options):
         """Extracts the data from the file.
 
-        :param file_path: The path to the desired file.
+        :param file_path: The path to the desired file or frame sequence.
         :param options: Options string reflecting the user decisions for the import process.
+        :return: The mesh data.
         """
-        vertex_amount = self.get_amount_of_vertices(file_path)
-        data = {"polygon": 3, "frames": 1, "vertices": []}
+        frame_paths = self.get_frame_paths(file_path)
+        if frame_paths is not None:
+            return self.extract_sequence(frame_paths, options).to_mesh_data()
+        values = parse_options(options, stl_options)
+        data = MeshData(3, 1, np.zeros((0, 3), dtype=np.float32), [])
         if self.is_binary(file_path):
-            self.extract_binary(data, file_path)
+            self.extract_binary(data, file_path, values["facet_normals"], values["facet_attributes"])
         else:
             self.extract_ascii(data, file_path)
 
-        self.create_connectivity(data, vertex_amount)
-        if options == "1":
-            self.deduplicate(data)
+        self.create_connectivity(data, data.vertex_amount)
+        # Welding with a tolerance keeps a subset of the positions, which may lie within the bounds of the file
+        probe = self.probe(file_path)
+        if not (values["smooth"] and values["weld_tolerance"] > 0):
+            data.minimum, data.maximum = probe.minimum, probe.maximum
+        if values["smooth"]:
+            self.deduplicate(data, values["weld_tolerance"])
+            self.add_normals(data, values["crease_angle"])
         return data
 
+    def extract_stream(self, file_path, options):
+        """Extracts the data from binary files in chunks without loading the whole mesh.
+
+        The bounds are computed in a first pass over the file, the vertex chunks are read again in a second pass while
+        exporting. The chunks are read instead of memory-mapped, so the resident memory stays bounded by the chunk
+        size. Smooth shading and facet data blocks require the whole mesh and disable streaming.
+
+        :param file_path: The path to the desired file or frame sequence.
+        :param options: Options string reflecting the user decisions for the import process.
+        :return: The mesh stream or None if the file or the options do not support streaming.
+        """
+        frame_paths = self.get_frame_paths(file_path)
+        if frame_paths is not None:
+            return self.extract_sequence(frame_paths, options)
+        values = parse_options(options, stl_options)
+        if not self.is_binary(file_path) or values["smooth"] or values["facet_normals"] or values["facet_attributes"]:
+            return None
+        triangle_amount, minimum, maximum = self.scan_frame(file_path)
+        vertex_amount = triangle_amount * 3
+        return MeshStream(3, 1, vertex_amount, triangle_amount, minimum, maximum,
+                          lambda: self.read_binary_chunks(file_path),
+                          lambda: self.create_connectivity_chunks(vertex_amount))
+
+    def extract_sequence(self, frame_paths, options):
+        """Extracts the frames of a sequence as a mesh stream with the connectivity of the first frame.
+
+        The frames are scanned for their triangle amounts and bounds by several worker processes, which also store the
+        parsed vertices of ascii frames in the persistent cache. The vertices are read frame by frame while exporting.
+
+        :param frame_paths: The paths to the frame files in frame order.
+        :param options: Options string reflecting the user decisions for the import process.
+        :return: The mesh stream with one vertex array per frame.
+        """
+        values = parse_options(options, stl_options)
+        if values["smooth"] or values["facet_normals"] or values["facet_attributes"]:
+            print("#Smooth shading and facet data blocks are not supported for frame sequences")
+        workers = min(parsing.parse_workers, len(frame_paths))
+        if workers > 1:
+            # The workers parse one frame each instead of splitting the frames
+            with ProcessPoolExecutor(max_workers=workers, initializer=parsing.set_parse_workers,
+                                     initargs=(1,)) as executor:
+                scans = list(executor.map(self.scan_frame, frame_paths))
+        else:
+            scans = [self.scan_frame(path) for path in frame_paths]
+
+        triangle_amount = scans[0][0]
+        for path, (amount, _, _) in zip(frame_paths, scans):
+            if amount != triangle_amount:
+                raise ValueError("Frame %s has %d triangles instead of %d" % (path, amount, triangle_amount))
+        minimum = np.amin([scan[1] for scan in scans], axis=0)
+        maximum = np.amax([scan[2] for scan in scans], axis=0)
+
+        def vertex_chunks():
+            for path in frame_paths:
+                if self.is_binary(path):
+                    yield from self.read_binary_chunks(path)
+                    continue
+                vertices = self.load_ascii_vertices(path)
+                for start in range(0, len(vertices), stream_chunk_triangles * 3):
+                    # The cached vertices are read-only, the chunks are normalized in place
+                    yield np.array(vertices[start:start + stream_chunk_triangles * 3])
+
+        return MeshStream(3, len(frame_paths), triangle_amount * 3, triangle_amount, minimum, maximum, vertex_chunks,
+                          lambda: self.create_connectivity_chunks(triangle_amount * 3))
+
+    @staticmethod
+    def get_frame_paths(file_path):
+        """Returns the frame files of a sequence given as directory or as path with wildcards.
+
+        :param file_path: The path to the desired file, directory or wildcard pattern.
+        :return: The paths to the STL files in natural order or None if the path is a single file.
+        """
+        if os.path.isdir(file_path):
+            paths = [os.path.join(file_path, name) for name in os.listdir(file_path) if name.lower().endswith(".stl")]
+        elif any(character in file_path for character in FRAME_WILDCARDS) and not os.path.exists(file_path):
+            paths = glob.glob(file_path)
+        else:
+            return None
+        if not paths:
+            raise ValueError("No STL frames found at %s" % file_path)
+        return sorted(paths, key=lambda path: [int(part) if part.isdigit() else part
+                                               for part in FRAME_NUMBER_PATTERN.split(os.path.basename(path))])
+
+    @staticmethod
+    def scan_frame(file_path):
+        """Determines the triangle amount and the bounds of a file, usually inside a worker process.
+
+        :param file_path: The path to the file.
+        :return: The triangle amount, the minimum and the maximum x, y and z values.
+        """
+        minimum = np.full(3, np.inf, dtype=np.float32)
+        maximum = np.full(3, -np.inf, dtype=np.float32)
+        if Import.is_binary(file_path):
+            triangle_amount = Import.probe(file_path).triangle_amount
+            chunks = Import.read_binary_chunks(file_path)
+        else:
+            vertices = Import.load_ascii_vertices(file_path)
+            triangle_amount = len(vertices) // 3
+            chunks = [vertices]
+        for chunk in chunks:
+            if len(chunk):
+                chunk_minimum, chunk_maximum = normalize.get_bounds(chunk)
+                np.minimum(minimum, chunk_minimum, out=minimum)
+                np.maximum(maximum, chunk_maximum, out=maximum)
+        return triangle_amount, minimum, maximum
+
+    @staticmethod
+    def read_binary_chunks(file_path):
+        """Reads the vertices of the binary file in chunks.
+
+        The chunks are read instead of memory-mapped, so the resident memory stays bounded by the chunk size.
+
+        :param file_path: The path to the file.
+        :return: Generator of writeable float32 arrays of shape (K, 3).
+        """
+        triangle_amount = Import.probe(file_path).triangle_amount
+        with open(file_path, "rb") as file:
+            file.seek(STL_HEADER_SIZE)
+            for start in range(0, triangle_amount, stream_chunk_triangles):
+                count = min(stream_chunk_triangles, triangle_amount - start)
+                yield np.fromfile(file, dtype=STL_TRIANGLE_DTYPE, count=count)["vertices"].reshape(-1, 3)
+
+    @staticmethod
+    def read_vertex_chunks(file_path):
+        """Reads the vertices of the file in chunks with a single pass over the file.
+
+        Ascii files are loaded from or stored in the persistent cache if it is enabled, else they are parsed chunk by
+        chunk and the amount of vertices is stored in the probe.
+
+        :param file_path: The path to the file.
+        :return: Generator of float32 arrays of shape (K, 3), the chunks may end within a triangle.
+        """
+        probe = Import.probe(file_path)
+        if probe.binary:
+            yield from Import.read_binary_chunks(file_path)
+        elif cache.cache_directory:
+            vertices = Import.load_ascii_vertices(file_path)
+            for start in range(0, len(vertices), stream_chunk_triangles * 3):
+                yield vertices[start:start + stream_chunk_triangles * 3]
+        else:
+            vertex_amount = 0
+            for chunk in Import.parse_ascii_chunks(file_path):
+                vertex_amount += len(chunk)
+                yield chunk
+            probe.vertex_amount = vertex_amount
+
+    @staticmethod
+    def create_connectivity_chunks(vertex_amount):
+        """Creates the connectivity of the triangle soup in chunks.
+
+        :param vertex_amount: The amount of vertices.
+        :return: Generator of flat unsigned int arrays.
+        """
+        connectivity_dtype = get_connectivity_dtype(vertex_amount)
+        for start in range(0, vertex_amount, stream_chunk_triangles * 3):
+            yield np.arange(start, min(start + stream_chunk_triangles * 3, vertex_amount), dtype=connectivity_dtype)
+
     def get_amount_of_vertices(self, file_path):
         """Fetches the amount of vertices in the file.
 
         :param file_path: The path to the file.
         :return: The amount of vertices.
         """
-        if self.is_binary(file_path):
-            with open(file_path, "rb") as file:
-                file.seek(80)
-                amount_bin = file.read(4)
-                return struct.unpack("i", amount_bin)[0] * 3
-        else:
-            with open(file_path, "r") as file:
-                return file.read().count("vertex")
+        probe = self.probe(file_path)
+        if probe.vertex_amount is None:
+            probe.vertex_amount = sum(buffer.count(b"vertex") for buffer in self.read_ascii_buffers(file_path))
+        return probe.vertex_amount
+
+    @staticmethod
+    def probe(file_path):
+        """Returns the probe of the given file, which is only created again if the file changed or was dropped.
+
+        :param file_path: The path to the file.
+        :return: The probe of the file.
+        """
+        stat = os.stat(file_path)
+        probe = stl_probes.get(file_path)
+        if probe is None or probe.size != stat.st_size or probe.mtime != stat.st_mtime_ns:
+            probe = stl_probes[file_path] = StlProbe(file_path, stat)
+        stl_probes.move_to_end(file_path)
+        while len(stl_probes) > probe_cache_size:
+            stl_probes.popitem(last=False)
+        return probe
 
     @staticmethod
-    def extract_binary(data, file_path):
+    def map_binary(file_path):
+        """Maps the triangle records of the binary file as a structured array without reading them.
+
+        :param file_path: The path to the file.
+        :return: The read-only triangle records with the fields normal, vertices and attribute.
+        """
+        amount = Import.probe(file_path).triangle_amount
+        if amount == 0:
+            return np.zeros(0, dtype=STL_TRIANGLE_DTYPE)
+        return np.memmap(file_path, dtype=STL_TRIANGLE_DTYPE, mode="r", offset=STL_HEADER_SIZE, shape=(amount,))
+
+    @staticmethod
+    def extract_binary(data, file_path, facet_normals=False, facet_attributes=False):
         """Extracts the geometry information from the file in binary format.
 
-        :param data: The dictionary which will hold the data.
+        :param data: The mesh data which will hold the data.
         :param file_path: The path to the file.
+        :param facet_normals: Adds the facet normals as data blocks NF1, NF2 and NF3.
+        :param facet_attributes: Adds the facet attribute words as data block AF.
         """
-        vertices = []
-        with open(file_path, "rb") as file:
-            file.seek(80)  # Header
-            amount = struct.unpack("i", file.read(4))[0]
-            for i in range(amount):
-                file.seek(12, os.SEEK_CUR)
-                for j in range(3):
-                    vertices.extend(struct.unpack("f" * 3, file.read(12))[:3])
-                file.seek(2, os.SEEK_CUR)
-        data["vertices"] = vertices
+        triangles = Import.map_binary(file_path)
+        data.vertices = triangles["vertices"].reshape(-1, 3)
+        if facet_normals:
+            normals = triangles["normal"]
+            data.blocks.extend(DataBlock("NF%d" % (i + 1), 10, normals[:, i]) for i in range(3))
+        if facet_attributes:
+            data.blocks.append(DataBlock("AF", 2, triangles["attribute"]))
 
     @staticmethod
     def extract_ascii(data, file_path):
         """Extracts the geometry information from the file in ascii format.
 
-        :param data: The dictionary which will hold the data.
+        :param data: The mesh data which will hold the data.
+        :param file_path: The path to the file.
+        """
+        data.vertices = Import.load_ascii_vertices(file_path)
+
+    @staticmethod
+    def load_ascii_vertices(file_path):
+        """Loads the vertices of the ascii file from the persistent cache or parses and caches them.
+
+        :param file_path: The path to the file.
+        :return: The vertices as float32 array of shape (N, 3), read-only if loaded from the cache.
+        """
+        vertices = cache.load_array(file_path, "stl-vertices")
+        if vertices is None:
+            vertices = Import.parse_ascii(file_path)
+            cache.store_array(file_path, "stl-vertices", vertices)
+        Import.probe(file_path).vertex_amount = len(vertices)
+        return vertices
+
+    @staticmethod
+    def parse_ascii(file_path):
+        """Parses the vertices of the ascii file.
+
+        The file is parsed in chunks into a growing float32 buffer, so the memory stays proportional to the vertices.
+        The bounds of every chunk are reduced while it is still cached and stored in the probe for the normalization.
+
+        :param file_path: The path to the file.
+        :return: The vertices as float32 array of shape (N, 3).
+        """
+        if parsing.parse_workers > 1 and Import.probe(file_path).size > parsing.parallel_parse_size:
+            return Import.parse_ascii_parallel(file_path, parsing.parse_workers)
+
+        # About 64 bytes of text per vertex in typical files
+        vertices = np.empty((os.path.getsize(file_path) // 64 + 3, 3), dtype=np.float32)
+        vertex_amount = 0
+        minimum = np.full(3, np.inf, dtype=np.float32)
+        maximum = np.full(3, -np.inf, dtype=np.float32)
+        for chunk in Import.parse_ascii_chunks(file_path):
+            end = vertex_amount + len(chunk)
+            if end > len(vertices):
+                vertices.resize((max(end, len(vertices) * 3 // 2), 3), refcheck=False)
+            vertices[vertex_amount:end] = chunk
+            vertex_amount = end
+            if len(chunk):
+                chunk_minimum, chunk_maximum = normalize.get_bounds(chunk)
+                np.minimum(minimum, chunk_minimum, out=minimum)
+                np.maximum(maximum, chunk_maximum, out=maximum)
+        vertices.resize((vertex_amount, 3), refcheck=False)
+        if vertex_amount:
+            probe = Import.probe(file_path)
+            probe.minimum, probe.maximum = minimum, maximum
+        return vertices
+
+    @staticmethod
+    def parse_ascii_parallel(file_path, workers):
+        """Parses the vertices of the ascii file in byte ranges split at facet ends by several worker processes.
+
+        :param file_path: The path to the file.
+        :param workers: The amount of worker processes.
+        :return: The vertices as float32 array of shape (N, 3) in file order.
+        """
+        ranges = Import.split_ascii_ranges(file_path, workers)
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as executor:
+            futures = [executor.submit(Import.parse_ascii_range, file_path, start, end) for start, end in ranges]
+            # The results are collected in the order of the ranges, which keeps the connectivity valid
+            chunks = [future.result() for future in futures]
+        return np.concatenate([np.zeros((0, 3), dtype=np.float32), *chunks])
+
+    @staticmethod
+    def split_ascii_ranges(file_path, amount):
+        """Splits the ascii file into byte ranges of similar size ending at the line break after an endfacet.
+
+        :param file_path: The path to the file.
+        :param amount: The desired amount of ranges.
+        :return: List of (start, end) tuples, every range after the first starts with a line break.
+        """
+        with open(file_path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            size = len(data)
+            bounds = [0]
+            for i in range(1, amount):
+                position = data.find(b"endfacet", max(size * i // amount, bounds[-1]))
+                position = data.find(b"\n", position) if position >= 0 else -1
+                if position < 0:
+                    break
+                if position > bounds[-1]:
+                    bounds.append(position)
+        bounds.append(size)
+        return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if start < end]
+
+    @staticmethod
+    def parse_ascii_range(file_path, start, end):
+        """Parses the vertices of a byte range of the ascii file, usually inside a worker process.
+
         :param file_path: The path to the file.
+        :param start: The first byte of the range, which has to be the start of the file or a line break.
+        :param end: The end of the range, which has to be the end of the file or a line break.
+        :return: The vertices as float32 array of shape (K, 3).
         """
-        with open(file_path, "r") as file:
-            lines = file.readlines()[1:]
-            for line in lines:
-                if "vertex" in line:
-                    line_split = line.split()
-                    line_split = line_split[-3:]
-                    list_of_vertex = [float(element) for element in line_split]
-                    data["vertices"].extend(list_of_vertex)
+        chunks = [np.zeros((0, 3), dtype=np.float32)]
+        with open(file_path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position = start
+            while position < end:
+                cut = end
+                if position + ascii_chunk_size < end:
+                    cut = data.rfind(b"\n", position + 1, position + ascii_chunk_size)
+                    if cut < 0:
+                        cut = data.find(b"\n", position + ascii_chunk_size, end)
+                        cut = end if cut < 0 else cut
+                chunks.append(Import.parse_ascii_vertices(data[position:cut]))
+                position = cut
+        return np.concatenate(chunks)
+
+    @staticmethod
+    def parse_ascii_chunks(file_path):
+        """Parses the vertices of the ascii file chunk by chunk.
+
+        :param file_path: The path to the file.
+        :return: Generator of float32 arrays of shape (K, 3) in file order.
+        """
+        for buffer in Import.read_ascii_buffers(file_path):
+            yield Import.parse_ascii_vertices(buffer)
+
+    @staticmethod
+    def parse_ascii_vertices(buffer):
+        """Parses all vertex lines of the given ascii buffer.
+
+        :param buffer: Bytes containing complete lines, each preceded by its line break.
+        :return: The vertices as float32 array of shape (K, 3).
+        """
+        coordinates = ASCII_VERTEX_PATTERN.findall(buffer)
+        if not coordinates:
+            return np.zeros((0, 3), dtype=np.float32)
+        vertices = np.fromstring(b" ".join(coordinates), dtype=np.float32, sep=" ")
+        if len(vertices) != len(coordinates) * 3:
+            raise ValueError("Invalid vertex line in ascii STL file")
+        return vertices.reshape(-1, 3)
+
+    @staticmethod
+    def read_ascii_buffers(file_path):
+        """Reads the file in chunks of complete lines, every chunk after the first starts with a line break.
+
+        :param file_path: The path to the file.
+        :return: Generator of bytes objects containing complete lines.
+        """
+        with open(file_path, "rb") as file:
+            rest = b""
+            while True:
+                chunk = file.read(ascii_chunk_size)
+                if not chunk:
+                    if rest:
+                        yield rest
+                    return
+                buffer = rest + chunk
+                cut = buffer.rfind(b"\n")
+                if cut <= 0:
+                    rest = buffer
+                    continue
+                rest = buffer[cut:]
+                yield buffer[:cut]
 
     @staticmethod
     def is_binary(file_path):
@@ -110,46 +567,35 @@ class Import(ImportInterface):
         :param file_path: The path to the file.
         :return: True if the file is binary, else False.
         """
-        file_size = os.path.getsize(file_path)
-        # Minimum size for binary stl files
-        if file_size < 84:
-            return False
-        with open(file_path, "rb") as file:
-            file.seek(80)
-            amount = struct.unpack("i", file.read(4))[0]
-            return 84 + (amount * 50) == file_size
+        return Import.probe(file_path).binary
 
     @staticmethod
     def create_connectivity(data, vertex_amount):
-        """Creates the connectivity data for the given data dictionary.
+        """Creates the connectivity data for the given mesh data.
 
-        :param data: The data dictionary for connectivity data.
+        :param data: The mesh data for connectivity data.
         :param vertex_amount: The amount of vertices.
         """
-        data["connectivity"] = list(range(vertex_amount))
-
-    @staticmethod
-    def deduplicate(data):
-        """De-duplicates the given data dictionary.
-
-        :param data: The data dictionary to de-duplicate.
-        """
-        vertices = np.reshape(data["vertices"], (-1, 3))
-        vertex_amount = len(vertices)
-        vertex_filter = np.ones(vertex_amount, dtype=bool)
-        connectivity = np.array(data["connectivity"])
-        for i in range(vertex_amount):
-            if not vertex_filter[i]:
-                continue
-            indices = np.where((vertices == vertices[i]).all(axis=1))[0][1:]
-            for index in indices:
-                vertex_filter[index] = False
-                connectivity[index] = i
-
-        duplicate_amount = 0
-        for i in range(vertex_amount):
-            if not vertex_filter[i]:
-                connectivity[connectivity > i - duplicate_amount] -= 1
-                duplicate_amount += 1
-        data["vertices"] = vertices[vertex_filter].flatten().tolist()
-        data["connectivity"] = connectivity.tolist()
+        data.connectivity = np.arange(vertex_amount, dtype=get_connectivity_dtype(vertex_amount))
+
+    @staticmethod
+    def deduplicate(data, tolerance=0.0):
+        """De-duplicates the given mesh data.
+
+        :param data: The mesh data to de-duplicate.
+        :param tolerance: Vertices within the same grid cell of this size are merged, 0 only merges exact duplicates.
+        """
+        with instrumentation.stage("dedup") as counts:
+            weld.weld_mesh(data, tolerance)
+            counts["vertices"] = data.vertex_amount
+
+    @staticmethod
+    def add_normals(data, crease_angle=0.0):
+        """Adds the smooth shading vertex normals as data blocks NV1, NV2 and NV3 to the welded mesh data.
+
+        :param data: The welded mesh data.
+        :param crease_angle: Faces meeting at a larger angle in degrees are not smoothed, 0 smooths all faces.
+        """
+        with instrumentation.stage("normals") as counts:
+            normals.add_vertex_normals(data, crease_angle)
+            counts["vertices"] = data.vertex_amount
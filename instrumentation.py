@@ -0,0 +1,130 @@
+"""Opt-in timing and memory instrumentation of the converter stages."""
+import cProfile
+import json
+import os
+import resource
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Outputs one information line per stage after each run
+print_stages = os.environ.get("FILE_CONVERTER_INSTRUMENTATION", "") not in ("", "0")
+
+# Appends one JSON line per run to this file, empty disables it
+stages_file = os.environ.get("FILE_CONVERTER_INSTRUMENTATION_FILE", "")
+
+# Traces the peak memory of every stage with tracemalloc, which slows down allocation-heavy stages
+trace_memory = os.environ.get("FILE_CONVERTER_TRACE_MEMORY", "") not in ("", "0")
+
+# Dumps the cProfile statistics of every run into this directory, empty disables it
+profile_directory = os.environ.get("FILE_CONVERTER_PROFILE_DIR", "")
+
+# Stages of the current run and the stages which are not finished yet, None outside of a run
+run_stages = None
+open_stages = []
+
+
+def is_enabled() -> bool:
+    """Checks if any instrumentation output is enabled.
+
+    :return: True if runs are instrumented, else False.
+    """
+    return print_stages or bool(stages_file) or trace_memory or bool(profile_directory)
+
+
+@contextmanager
+def run(action: str, file_path: str):
+    """Instruments a single analysis or conversion and outputs its stages at the end.
+
+    :param action: The name of the action, e.g. analyze or extract.
+    :param file_path: The path to the input file.
+    :return: Context manager, nested runs are instrumented as stages of the outer run.
+    """
+    global run_stages
+    if not is_enabled() or run_stages is not None:
+        with stage(action):
+            yield
+        return
+
+    run_stages = []
+    profiler = cProfile.Profile() if profile_directory else None
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        if profiler is not None:
+            profiler.enable()
+        with stage(action):
+            yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(profile_directory, exist_ok=True)
+            profiler.dump_stats(os.path.join(profile_directory, "%s-%s-%d-%d.prof" % (
+                os.path.basename(file_path), action, os.getpid(), time.time_ns())))
+        if started_tracing:
+            tracemalloc.stop()
+        stages, run_stages = run_stages, None
+        output_run(action, file_path, stages)
+
+
+@contextmanager
+def stage(name: str):
+    """Measures the wall time, CPU time, peak memory and element counts of a stage.
+
+    The yielded dictionary takes the element counts of the stage, e.g. counts["vertices"] = 100.
+
+    :param name: The name of the stage.
+    :return: Context manager yielding the counts dictionary.
+    """
+    counts = {}
+    if run_stages is None:
+        yield counts
+        return
+
+    record = {"stage": name, "depth": len(open_stages)}
+    run_stages.append(record)
+    if tracemalloc.is_tracing():
+        fold_peak()
+        record["traced"] = tracemalloc.get_traced_memory()[0]
+        record["peak"] = record["traced"]
+    open_stages.append(record)
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    try:
+        yield counts
+    finally:
+        record["wall_seconds"] = round(time.perf_counter() - wall, 6)
+        record["cpu_seconds"] = round(time.process_time() - cpu, 6)
+        if tracemalloc.is_tracing():
+            fold_peak()
+            record["peak_mb"] = round((record.pop("peak") - record.pop("traced")) / 1048576, 3)
+        # Linux reports the maximum resident set size in KB
+        record["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 3)
+        record.update(counts)
+        open_stages.pop()
+
+
+def fold_peak() -> None:
+    """Adds the traced peak since the last call to all unfinished stages and starts a new peak measurement."""
+    peak = tracemalloc.get_traced_memory()[1]
+    for record in open_stages:
+        if "peak" in record:
+            record["peak"] = max(record["peak"], peak)
+    tracemalloc.reset_peak()
+
+
+def output_run(action: str, file_path: str, stages: list) -> None:
+    """Outputs the stages of a run as information lines and / or as JSON line.
+
+    :param action: The name of the action.
+    :param file_path: The path to the input file.
+    :param stages: The stage records in the order the stages were started.
+    """
+    if print_stages:
+        for record in stages:
+            details = ["%s=%s" % (key, value) for key, value in record.items() if key not in ("stage", "depth")]
+            print("# %s%s: %s" % ("  " * record["depth"], record["stage"], ", ".join(details)))
+    if stages_file:
+        with open(stages_file, "a") as file:
+            file.write(json.dumps({"action": action, "input": file_path, "pid": os.getpid(), "stages": stages}) + "\n")
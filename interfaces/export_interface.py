@@ -1,5 +1,6 @@
 """Interface for all file-converter export scripts."""
 from abc import ABC, abstractmethod
+from interfaces.mesh_data import MeshData, MeshStream
 
 
 class ExportInterface(ABC):
@@ -10,11 +11,34 @@ class ExportInterface(ABC):
         """The supported file extensions as a list of strings."""
         pass
 
+    def option_definitions(self) -> list:
+        """The option definitions printed after the import options by analyze."""
+        return []
+
+    def configure(self, options: str) -> None:
+        """Applies the export options to the following exports.
+
+        :param options: The option lines following the import options.
+        """
+        pass
+
+    def version(self) -> str:
+        """The version of the written format, output cached by an older version is not reused."""
+        return "1"
+
     @abstractmethod
-    def export(self, data: list, path: str) -> None:
+    def export(self, data: MeshData, path: str) -> None:
         """Exports the given data to the desired path.
 
-        :param data: The data dictionary.
+        :param data: The mesh data.
         :param path: The path to the export directory.
         """
         pass
+
+    def export_stream(self, data: MeshStream, path: str) -> None:
+        """Exports the given mesh stream to the desired path, exporters without streaming support collect it first.
+
+        :param data: The mesh stream.
+        :param path: The path to the export directory.
+        """
+        self.export(data.to_mesh_data(), path)
@@ -1,5 +1,8 @@
 """Interface for all file-converter import scripts."""
+import os
 from abc import ABC, abstractmethod
+from typing import Optional
+from interfaces.mesh_data import MeshData, MeshStream
 
 
 class ImportInterface(ABC):
@@ -10,6 +13,27 @@ class ImportInterface(ABC):
         """The supported file extensions as a list of strings."""
         pass
 
+    def option_definitions(self) -> list:
+        """The option definitions in the order of the option lines printed by analyze."""
+        return []
+
+    def estimate_memory(self, file_path: str) -> int:
+        """Estimates the peak memory required to extract the file.
+
+        :param file_path: The path to the desired file.
+        :return: The estimated memory in bytes.
+        """
+        return os.path.getsize(file_path) * 4
+
+    def always_stream(self, file_path: str) -> bool:
+        """Whether the file is converted with extract_stream regardless of its estimated memory, e.g. frame sequences
+        whose memory grows with the amount of frames.
+
+        :param file_path: The path to the desired file.
+        :return: True if the conversion always streams the file.
+        """
+        return False
+
     @abstractmethod
     def analyze(self, file_path: str) -> None:
         """Analyzes the file with the given file path and outputs information and options if available.
@@ -19,10 +43,22 @@ class ImportInterface(ABC):
         pass
 
     @abstractmethod
-    def extract(self, file_path: str, options: str) -> dict:
+    def extract(self, file_path: str, options: str) -> MeshData:
         """Extracts the data from the file taking into account the options string.
 
+        Returning the data dictionary documented in the README is still supported.
+
         :param file_path: The path to the desired file.
         :param options: A string containing the user selected options
+        :return: The mesh data.
         """
         pass
+
+    def extract_stream(self, file_path: str, options: str) -> Optional[MeshStream]:
+        """Extracts the data from the file in chunks for conversions of meshes larger than the memory.
+
+        :param file_path: The path to the desired file.
+        :param options: A string containing the user selected options
+        :return: The mesh stream or None if the file or the options do not support streaming.
+        """
+        return None
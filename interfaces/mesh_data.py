@@ -0,0 +1,155 @@
+"""Array-backed mesh container passed between the import scripts, the normalization and the export scripts."""
+import numpy as np
+
+# NumPy dtypes of the precision IDs used by the data blocks, precision 12 is stored as UINT8
+precision_dtypes = [
+    np.dtype("?"),
+    np.dtype("<u1"),
+    np.dtype("<u2"),
+    np.dtype("<u4"),
+    np.dtype("<u8"),
+    np.dtype("<i1"),
+    np.dtype("<i2"),
+    np.dtype("<i4"),
+    np.dtype("<i8"),
+    np.dtype("<f2"),
+    np.dtype("<f4"),
+    np.dtype("<f8"),
+    np.dtype("<u1")
+]
+
+
+def get_connectivity_dtype(vertex_amount: int) -> np.dtype:
+    """Returns the smallest unsigned dtype used in memory for the connectivity of the given amount of vertices.
+
+    :param vertex_amount: The amount of vertices.
+    :return: np.uint32 or np.uint64 for meshes with more than 2^32 vertices.
+    """
+    return np.dtype(np.uint32) if vertex_amount <= 4294967296 else np.dtype(np.uint64)
+
+
+class DataBlock:
+    """A named data block with values of the dtype given by the precision ID."""
+    __slots__ = ("name", "precision", "values")
+
+    def __init__(self, name: str, precision: int, values):
+        """Creates the data block.
+
+        :param name: The name of the data block.
+        :param precision: The precision ID of the values.
+        :param values: The values as an array-like.
+        """
+        self.name = name
+        self.precision = precision
+        self.values = np.asarray(values, dtype=precision_dtypes[precision]).reshape(-1)
+
+
+class MeshData:
+    """The mesh data of a single conversion."""
+    __slots__ = ("polygon", "frames", "vertices", "connectivity", "vertex_precision", "blocks", "minimum", "maximum")
+
+    def __init__(self, polygon: int, frames: int, vertices, connectivity, vertex_precision: str = "FP32",
+                 blocks: list = None, minimum=None, maximum=None):
+        """Creates the mesh data.
+
+        :param polygon: Amount of vertices per face.
+        :param frames: Amount of frames.
+        :param vertices: The vertices as an array-like, converted to float32 of shape (frames * N, 3), frame by frame.
+        :param connectivity: The vertex IDs as an array-like, converted to a flat unsigned int array.
+        :param vertex_precision: Precision name of the exported vertex positions.
+        :param blocks: List of DataBlock instances.
+        :param minimum: The minimum x, y and z values of all vertices if already known, else None.
+        :param maximum: The maximum x, y and z values of all vertices if already known, else None.
+        """
+        self.polygon = polygon
+        self.frames = frames
+        self.vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+        self.connectivity = np.asarray(connectivity).reshape(-1).astype(
+            get_connectivity_dtype(len(self.vertices)), copy=False)
+        self.vertex_precision = vertex_precision
+        self.blocks = blocks if blocks is not None else []
+        self.minimum = minimum
+        self.maximum = maximum
+
+    @property
+    def vertex_amount(self) -> int:
+        """The amount of vertices per frame."""
+        return len(self.vertices) // max(self.frames, 1)
+
+    @property
+    def face_amount(self) -> int:
+        """The amount of faces."""
+        return len(self.connectivity) // self.polygon
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MeshData":
+        """Creates the mesh data from the data dictionary documented in the README.
+
+        :param data: The data dictionary.
+        :return: The mesh data.
+        """
+        blocks = [DataBlock(block["name"], block["precision"], block["values"]) for block in data.get("blocks", [])]
+        return cls(data["polygon"], data["frames"], data["vertices"], data["connectivity"],
+                   data.get("vertex-precision", "FP32"), blocks)
+
+    def to_dict(self) -> dict:
+        """Creates the data dictionary documented in the README from the mesh data.
+
+        :return: The data dictionary.
+        """
+        data = {"polygon": self.polygon, "frames": self.frames, "vertices": self.vertices.reshape(-1).tolist(),
+                "connectivity": self.connectivity.tolist(), "vertex-precision": self.vertex_precision}
+        if self.blocks:
+            data["blocks"] = [{"name": block.name, "precision": block.precision, "values": block.values.tolist()}
+                              for block in self.blocks]
+        return data
+
+
+def as_mesh_data(data) -> MeshData:
+    """Returns the given data as mesh data, data dictionaries of older plugins are converted.
+
+    :param data: The mesh data or the data dictionary.
+    :return: The mesh data.
+    """
+    return data if isinstance(data, MeshData) else MeshData.from_dict(data)
+
+
+class MeshStream:
+    """Mesh data produced in chunks, for conversions of meshes larger than the memory."""
+    __slots__ = ("polygon", "frames", "vertex_amount", "face_amount", "vertex_precision", "minimum", "maximum",
+                 "vertex_chunks", "connectivity_chunks")
+
+    def __init__(self, polygon: int, frames: int, vertex_amount: int, face_amount: int, minimum, maximum,
+                 vertex_chunks, connectivity_chunks, vertex_precision: str = "FP32"):
+        """Creates the mesh stream.
+
+        :param polygon: Amount of vertices per face.
+        :param frames: Amount of frames.
+        :param vertex_amount: The amount of vertices per frame.
+        :param face_amount: The amount of faces.
+        :param minimum: The minimum x, y and z values of all vertices of all frames.
+        :param maximum: The maximum x, y and z values of all vertices of all frames.
+        :param vertex_chunks: Function returning a new generator of writeable float32 arrays of shape (K, 3), which
+            yields the vertices of all frames frame by frame.
+        :param connectivity_chunks: Function returning a new generator of flat unsigned int arrays.
+        :param vertex_precision: Precision name of the exported vertex positions.
+        """
+        self.polygon = polygon
+        self.frames = frames
+        self.vertex_amount = vertex_amount
+        self.face_amount = face_amount
+        self.minimum = minimum
+        self.maximum = maximum
+        self.vertex_chunks = vertex_chunks
+        self.connectivity_chunks = connectivity_chunks
+        self.vertex_precision = vertex_precision
+
+    def to_mesh_data(self) -> MeshData:
+        """Collects all chunks into mesh data.
+
+        :return: The mesh data.
+        """
+        vertices = np.concatenate([np.zeros((0, 3), dtype=np.float32), *self.vertex_chunks()])
+        connectivity = np.concatenate([np.zeros(0, dtype=np.uint32), *self.connectivity_chunks()])
+        return MeshData(self.polygon, self.frames, vertices, connectivity, self.vertex_precision,
+                        minimum=self.minimum, maximum=self.maximum)
@@ -0,0 +1,126 @@
+"""Level of detail generation for the mesh data"""
+
+import normalize
+import numpy as np
+import weld
+from interfaces.mesh_data import DataBlock, MeshData
+
+# Maximum amount of grid sizes tried while searching the grid size of the triangle target
+lod_search_steps = 24
+
+# The search stops once the triangle amount is within this share of the target
+lod_target_tolerance = 0.05
+
+
+def create_lod(mesh: MeshData, ratio: float) -> MeshData:
+    """Creates a simplified copy of the mesh data with about the given share of its faces by vertex clustering.
+
+    All vertices within a cell of a uniform grid are merged into their mean position and faces collapsing to an edge or
+    a point are removed. The cell size is searched so the remaining faces match the target.
+
+    :param mesh: The mesh data to simplify, it is not modified.
+    :param ratio: The desired amount of faces relative to the amount of faces of the mesh.
+    :return: The simplified mesh data.
+    """
+    faces = mesh.connectivity.reshape(-1, mesh.polygon)
+    cell_size = find_cell_size(mesh.vertices, faces, int(mesh.face_amount * ratio))
+    if cell_size == 0:
+        return MeshData(mesh.polygon, mesh.frames, mesh.vertices.copy(), mesh.connectivity.copy(),
+                        mesh.vertex_precision, [DataBlock(block.name, block.precision, block.values.copy())
+                                                for block in mesh.blocks], mesh.minimum, mesh.maximum)
+    return cluster_mesh(mesh, faces, cell_size)
+
+
+def find_cell_size(vertices, faces, target: int) -> float:
+    """Searches the grid cell size leaving about the target amount of faces.
+
+    The amount of remaining faces only depends on the cells of the face corners, so the search does not cluster the
+    vertices.
+
+    :param vertices: The vertices of shape (N, 3).
+    :param faces: The vertex IDs of shape (F, polygon).
+    :param target: The desired amount of faces.
+    :return: The cell size or 0 if no clustering is needed.
+    """
+    if target >= len(faces) or len(vertices) == 0:
+        return 0.0
+    minimum, maximum = normalize.get_bounds(vertices)
+    extent = float(np.amax(maximum - minimum))
+    if extent == 0:
+        return 0.0
+
+    # Bisection of the logarithmic cell size between a cell size keeping all faces and one cell for the whole mesh
+    low, high = np.log(extent) - 24, np.log(extent) + 1
+    for _ in range(lod_search_steps):
+        middle = (low + high) / 2
+        remaining = count_remaining_faces(vertices, faces, np.exp(middle))
+        if abs(remaining - target) <= target * lod_target_tolerance:
+            return float(np.exp(middle))
+        if remaining > target:
+            low = middle
+        else:
+            high = middle
+    return float(np.exp((low + high) / 2))
+
+
+def count_remaining_faces(vertices, faces, cell_size: float) -> int:
+    """Counts the faces whose corners lie in different grid cells.
+
+    :param vertices: The vertices of shape (N, 3).
+    :param faces: The vertex IDs of shape (F, polygon).
+    :param cell_size: The cell size.
+    :return: The amount of faces remaining after the clustering.
+    """
+    # Comparing the hashes of the cells is enough for the estimation
+    return int(np.count_nonzero(get_face_mask(weld.hash_rows(weld.quantize(vertices, cell_size)), faces)))
+
+
+def get_face_mask(cells, faces) -> np.ndarray:
+    """Marks the faces whose corners lie in pairwise different cells.
+
+    :param cells: The cell or cluster of every vertex as (N,) array.
+    :param faces: The vertex IDs of shape (F, polygon).
+    :return: Boolean array, True for the remaining faces.
+    """
+    corners = cells[faces]
+    mask = np.ones(len(faces), dtype=bool)
+    for i in range(faces.shape[1]):
+        for j in range(i + 1, faces.shape[1]):
+            mask &= corners[:, i] != corners[:, j]
+    return mask
+
+
+def cluster_mesh(mesh: MeshData, faces, cell_size: float) -> MeshData:
+    """Merges the vertices within the grid cells of the given size and removes the collapsed faces.
+
+    Per-vertex data blocks take the values of the first vertex of each cell, per-face data blocks keep the values of
+    the remaining faces.
+
+    :param mesh: The mesh data to simplify, it is not modified.
+    :param faces: The vertex IDs of shape (F, polygon).
+    :param cell_size: The cell size.
+    :return: The simplified mesh data.
+    """
+    kept, remap = weld.weld_vertices(mesh.vertices, cell_size)
+    counts = np.bincount(remap, minlength=len(kept))
+    vertices = np.stack([np.bincount(remap, weights=mesh.vertices[:, axis], minlength=len(kept)) / counts
+                         for axis in range(3)], axis=1)
+
+    face_mask = get_face_mask(remap, faces)
+    connectivity = remap[faces[face_mask]].reshape(-1)
+
+    # Clusters only used by removed faces are dropped
+    used = np.zeros(len(kept), dtype=bool)
+    used[connectivity] = True
+    compact = np.cumsum(used) - 1
+
+    blocks = []
+    for block in mesh.blocks:
+        if len(block.values) == mesh.vertex_amount:
+            values = block.values[kept[used]]
+        elif len(block.values) == mesh.face_amount:
+            values = block.values[face_mask]
+        else:
+            values = block.values
+        blocks.append(DataBlock(block.name, block.precision, values))
+    return MeshData(mesh.polygon, mesh.frames, vertices[used], compact[connectivity], mesh.vertex_precision, blocks)
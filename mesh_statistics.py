@@ -0,0 +1,117 @@
+"""Streaming mesh statistics for the analysis of triangle soups"""
+import os
+
+import normalize
+import numpy as np
+import weld
+
+# Computes the mesh statistics of binary files during the analysis, which reads the whole file instead of the header,
+# ascii files are parsed by the analysis anyway and always get the statistics
+analyze_statistics = os.environ.get("FILE_CONVERTER_ANALYZE_STATISTICS", "0") not in ("", "0")
+
+# Maximum amount of distinct vertex hashes kept to estimate the duplicate vertex ratio
+sketch_size = 1 << 16
+
+
+class MeshStatistics:
+    """Statistics of a triangle soup gathered chunk by chunk in constant memory.
+
+    Vertices are identified by their exact coordinates. The duplicate vertex ratio is estimated from the vertices whose
+    hash is among the sketch_size smallest distinct hashes, which samples all occurrences of a vertex together. Edges
+    are hashed independently of their direction and combined with XOR, so every edge shared by an even amount of
+    triangles cancels out and a watertight mesh leaves zero.
+    """
+    __slots__ = ("vertex_amount", "minimum", "maximum", "degenerate_amount", "edge_sketch", "threshold",
+                 "sample_hashes", "sample_counts", "rest")
+
+    def __init__(self):
+        """Creates empty statistics."""
+        self.vertex_amount = 0
+        self.minimum = np.full(3, np.inf, dtype=np.float32)
+        self.maximum = np.full(3, -np.inf, dtype=np.float32)
+        self.degenerate_amount = 0
+        self.edge_sketch = np.uint64(0)
+        self.threshold = np.uint64(0xFFFFFFFFFFFFFFFF)
+        self.sample_hashes = np.zeros(0, dtype=np.uint64)
+        self.sample_counts = np.zeros(0, dtype=np.int64)
+        self.rest = np.zeros((0, 3), dtype=np.float32)
+
+    def add_vertices(self, vertices) -> None:
+        """Adds the next vertices of the triangle soup, chunks do not have to end at a triangle end.
+
+        :param vertices: The vertices as float32 array of shape (K, 3).
+        """
+        if len(self.rest):
+            vertices = np.concatenate([self.rest, vertices])
+        end = len(vertices) - len(vertices) % 3
+        self.rest = np.array(vertices[end:], dtype=np.float32)
+        vertices = vertices[:end]
+        if end == 0:
+            return
+
+        self.vertex_amount += end
+        minimum, maximum = normalize.get_bounds(vertices)
+        np.minimum(self.minimum, minimum, out=self.minimum)
+        np.maximum(self.maximum, maximum, out=self.maximum)
+
+        corners = np.asarray(vertices, dtype=np.float64).reshape(-1, 3, 3)
+        areas = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        self.degenerate_amount += int(np.count_nonzero(~areas.any(axis=1)))
+
+        hashes = mix_bits(weld.hash_rows(vertices))
+        self.add_samples(hashes[hashes <= self.threshold])
+        triangles = hashes.reshape(-1, 3)
+        for first, second in ((0, 1), (1, 2), (2, 0)):
+            low = np.minimum(triangles[:, first], triangles[:, second])
+            high = np.maximum(triangles[:, first], triangles[:, second])
+            self.edge_sketch ^= np.bitwise_xor.reduce(mix_bits(low ^ mix_bits(high)))
+
+    def add_samples(self, hashes) -> None:
+        """Counts the sampled vertex hashes and keeps the sketch_size smallest distinct hashes.
+
+        :param hashes: The vertex hashes not above the current threshold.
+        """
+        weights = np.concatenate([self.sample_counts, np.ones(len(hashes), dtype=np.int64)])
+        hashes, inverse = np.unique(np.concatenate([self.sample_hashes, hashes]), return_inverse=True)
+        counts = np.bincount(inverse.reshape(-1), weights=weights, minlength=len(hashes)).astype(np.int64)
+        if len(hashes) > sketch_size:
+            hashes = hashes[:sketch_size]
+            counts = counts[:sketch_size]
+            self.threshold = hashes[-1]
+        self.sample_hashes = hashes
+        self.sample_counts = counts
+
+    def get_duplicate_ratio(self) -> float:
+        """Estimates the share of vertices which are equal to another vertex occurring before them.
+
+        :return: The duplicate vertex ratio, exact for meshes with up to sketch_size distinct vertices.
+        """
+        sampled = int(self.sample_counts.sum())
+        return 1 - len(self.sample_hashes) / sampled if sampled else 0.0
+
+    def is_watertight(self) -> bool:
+        """Checks if every edge is shared by an even amount of triangles.
+
+        :return: True if the mesh is closed, wrong only for hash collisions.
+        """
+        return self.vertex_amount > 0 and self.edge_sketch == 0
+
+    def print_information(self) -> None:
+        """Outputs the statistics as information lines."""
+        if self.vertex_amount:
+            print("#Bounding box minimum: " + ", ".join("%g" % value for value in self.minimum))
+            print("#Bounding box maximum: " + ", ".join("%g" % value for value in self.maximum))
+        print("#Degenerate triangles: " + str(self.degenerate_amount))
+        print("#Duplicate vertex ratio: %.4f" % self.get_duplicate_ratio())
+        print("#Watertight: " + str(self.is_watertight()))
+
+
+def mix_bits(values: np.ndarray) -> np.ndarray:
+    """Scrambles the bits of 64 bit hashes with the SplitMix64 finalizer, so structured inputs spread evenly.
+
+    :param values: The hashes as uint64 array.
+    :return: The scrambled hashes as uint64 array.
+    """
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
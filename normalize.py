@@ -1,42 +1,113 @@
-"""Normalization functions for the data dictionary"""
+"""Normalization functions for the mesh data"""
 
 import numpy as np
+from interfaces.mesh_data import MeshData, MeshStream
 
+# Amount of vertices per row of the bounds reduction
+bounds_lanes = 16
+# Amount of vertices transformed at once, so the multiply-add of a chunk reads it from the CPU cache
+transform_chunk_size = 1 << 14
 
-def normalize_data(data: dict):
-    """Normalizes the vertices and translation values of the given data dictionary.
 
-    :param data: The data dictionary to normalize
+def normalize_data(data: MeshData, minimum=None, maximum=None):
+    """Normalizes the vertices and translation values of the given mesh data in place.
+
+    :param data: The mesh data to normalize
+    :param minimum: The minimum x, y and z values if already known, else the bounds of the mesh data are used.
+    :param maximum: The maximum x, y and z values if already known.
+    :return: The offset subtracted from each vertex and the size each vertex is divided by.
     """
-    data_np = np.array(data["vertices"])
-    data_np = np.reshape(data_np, (-1, 3))
-
-    # Prepare data
-    min_x = np.amin(data_np[:, 0:1], axis=0)
-    max_x = np.amax(data_np[:, 0:1], axis=0)
-    min_y = np.amin(data_np[:, 1:2], axis=0)
-    max_y = np.amax(data_np[:, 1:2], axis=0)
-    min_z = np.amin(data_np[:, 2:3], axis=0)
-    max_z = np.amax(data_np[:, 2:3], axis=0)
-    scale_x = max_x - min_x
-    scale_y = max_y - min_y
-    scale_z = max_z - min_z
-
-    # Position object at y = 0
-    data_np[:, 1] -= min_y
-
-    # Center object at x = z = 0
-    data_np[:, 0] -= (min_x + max_x) / 2
-    data_np[:, 2] -= (min_z + max_z) / 2
+    data_np = data.vertices
+    # Bounds precomputed by the importer skip the reduction pass
+    if minimum is None or maximum is None:
+        minimum, maximum = (data.minimum, data.maximum) if data.minimum is not None else get_bounds(data_np)
+    offset, max_size = get_transform(minimum, maximum)
+    # Read-only vertices, e.g. memory-mapped files, are transformed into a new array instead of being copied first
+    out = data_np if data_np.flags.writeable else np.empty(data_np.shape, dtype=np.float32)
+    data.vertices = transform_vertices(data_np, offset, max_size, out)
+    # The transform is monotonic, so the transformed bounds are the bounds of the normalized vertices
+    data.minimum = transform_vertices(np.array(minimum, dtype=np.float32), offset, max_size)
+    data.maximum = transform_vertices(np.array(maximum, dtype=np.float32), offset, max_size)
+
+    # Normalize translate values
+    for block in data.blocks:
+        if block.name in ["TL1", "TL2", "TL3"]:
+            block.values = (block.values / max_size).astype(block.values.dtype)
+    return offset, max_size
+
+
+def normalize_stream(data: MeshStream):
+    """Normalizes the vertex chunks of the given mesh stream with the bounds computed by the importer.
+
+    :param data: The mesh stream to normalize
+    :return: The offset subtracted from each vertex and the size each vertex is divided by.
+    """
+    offset, max_size = get_transform(data.minimum, data.maximum)
+    # The exporters receive the bounds of the normalized vertices
+    data.minimum = transform_vertices(np.array(data.minimum, dtype=np.float32), offset, max_size)
+    data.maximum = transform_vertices(np.array(data.maximum, dtype=np.float32), offset, max_size)
+    vertex_chunks = data.vertex_chunks
+    data.vertex_chunks = lambda: (transform_vertices(chunk, offset, max_size) for chunk in vertex_chunks())
+    return offset, max_size
+
+
+def get_bounds(vertices):
+    """Calculates the minimum and maximum x, y and z values of the given vertices.
+
+    Reducing an (N, 3) array along the first axis is slow because of its short rows, so the reduction runs over rows
+    of bounds_lanes vertices and the lanes are combined afterwards.
+
+    :param vertices: The vertices of shape (N, 3).
+    :return: The minimum and the maximum x, y and z values, zeros for no vertices.
+    """
+    vertices = np.asarray(vertices).reshape(-1, 3)
+    if len(vertices) == 0:
+        return np.zeros(3, dtype=vertices.dtype), np.zeros(3, dtype=vertices.dtype)
+    lanes = min(bounds_lanes, len(vertices))
+    wide = vertices[:len(vertices) - len(vertices) % lanes].reshape(-1, lanes * 3)
+    rest = vertices[len(wide) * lanes:]
+    minimum = np.minimum.reduce(wide, axis=0).reshape(lanes, 3)
+    maximum = np.maximum.reduce(wide, axis=0).reshape(lanes, 3)
+    return np.concatenate([minimum, rest]).min(axis=0), np.concatenate([maximum, rest]).max(axis=0)
+
+
+def get_transform(minimum, maximum):
+    """Calculates the translation and scale which normalize vertices within the given bounds.
+
+    :param minimum: The minimum x, y and z values.
+    :param maximum: The maximum x, y and z values.
+    :return: The offset subtracted from each vertex and the size each vertex is divided by.
+    """
+    minimum = np.asarray(minimum, dtype=np.float32)
+    maximum = np.asarray(maximum, dtype=np.float32)
+
+    # Position object at y = 0 and center object at x = z = 0
+    offset = (minimum + maximum) / 2
+    offset[1] = minimum[1]
 
     # Normalize scale
-    max_size = max(scale_x, scale_y, scale_z)
-    data_np /= max_size
+    max_size = np.amax(maximum - minimum)
+    return offset, max_size
 
-    # Normalize translate values
-    if "blocks" in data.keys():
-        for block in data["blocks"]:
-            if block["name"] in ["TL1", "TL2", "TL3"]:
-                block["values"] = [float(x / max_size) for x in block["values"]]
 
-    data["vertices"] = data_np.flatten().tolist()
+def transform_vertices(vertices, offset, max_size, out=None):
+    """Applies the normalization transform to the given vertices as one multiply-add pass.
+
+    The transform (vertex - offset) / max_size is applied as vertex * scale + shift with scale = 1 / max_size and
+    shift = -offset * scale. Both operations run on chunks of transform_chunk_size vertices, so every vertex is only
+    read from memory once.
+
+    :param vertices: The vertices as float32 array of shape (N, 3), writeable if out is None.
+    :param offset: The offset subtracted from each vertex.
+    :param max_size: The size each vertex is divided by.
+    :param out: The float32 array of the same shape receiving the transformed vertices, None transforms in place.
+    :return: The transformed vertices.
+    """
+    out = vertices if out is None else out
+    scale = np.float32(1) / np.float32(max_size)
+    shift = (-np.asarray(offset, dtype=np.float32) * scale).astype(np.float32)
+    for start in range(0, len(vertices), transform_chunk_size):
+        chunk = out[start:start + transform_chunk_size]
+        np.multiply(vertices[start:start + transform_chunk_size], scale, out=chunk)
+        np.add(chunk, shift, out=chunk)
+    return out
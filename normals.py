@@ -0,0 +1,109 @@
+"""Smooth shading normal functions for the mesh data"""
+
+import numpy as np
+import weld
+from interfaces.mesh_data import DataBlock, MeshData
+
+# Maximum amount of corner pairs compared at once by the crease angle
+crease_chunk_pairs = 1 << 22
+
+
+def add_vertex_normals(mesh: MeshData, crease_angle: float = 0.0) -> None:
+    """Adds the area-weighted vertex normals of the mesh data as per-vertex data blocks NV1, NV2 and NV3.
+
+    With a crease angle, a face only contributes to the normal of a corner if it deviates from the face of the corner
+    by at most this angle. Vertices with corners of different normals are split, per-vertex data blocks are copied to
+    the split vertices.
+
+    :param mesh: The welded mesh data.
+    :param crease_angle: The crease angle in degrees, 0 smooths across all edges.
+    """
+    faces = mesh.connectivity.reshape(-1, mesh.polygon)
+    face_normals = get_face_normals(mesh.vertices, faces)
+    corner_faces = np.repeat(np.arange(len(faces)), mesh.polygon)
+    if crease_angle > 0:
+        normals = split_creases(mesh, face_normals, corner_faces, np.cos(np.radians(crease_angle)))
+    else:
+        normals = np.stack([np.bincount(mesh.connectivity, weights=face_normals[corner_faces, axis],
+                                        minlength=mesh.vertex_amount) for axis in range(3)], axis=1)
+
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = (normals / np.where(lengths > 0, lengths, 1)).astype(np.float32)
+    mesh.blocks.extend(DataBlock("NV%d" % (axis + 1), 10, normals[:, axis]) for axis in range(3))
+
+
+def get_face_normals(vertices, faces) -> np.ndarray:
+    """Calculates the face normals weighted with twice the area of the faces.
+
+    :param vertices: The vertices of shape (N, 3).
+    :param faces: The vertex IDs of shape (F, polygon).
+    :return: The weighted face normals as float64 array of shape (F, 3).
+    """
+    corners = np.asarray(vertices, dtype=np.float64)
+    origin = corners[faces[:, 0]]
+    return np.cross(corners[faces[:, 1]] - origin, corners[faces[:, 2]] - origin)
+
+
+def split_creases(mesh: MeshData, face_normals, corner_faces, minimum_cosine: float) -> np.ndarray:
+    """Calculates the normal of every corner from the faces around its vertex within the crease angle and splits the
+    vertices whose corners have different normals.
+
+    The corners are grouped by their vertex, so the pairs of corners sharing a vertex can be compared in chunks.
+
+    :param mesh: The mesh data, its vertices, connectivity and per-vertex data blocks are replaced.
+    :param face_normals: The weighted face normals of shape (F, 3).
+    :param corner_faces: The face of every corner.
+    :param minimum_cosine: The cosine of the crease angle.
+    :return: The unnormalized normals of the new vertices of shape (N, 3).
+    """
+    # Without faces there is nothing to split, the unused vertices keep a zero normal
+    if len(mesh.connectivity) == 0:
+        return np.zeros((mesh.vertex_amount, 3), dtype=np.float64)
+    units = face_normals / np.maximum(np.linalg.norm(face_normals, axis=1, keepdims=True), 1e-300)
+    order = np.argsort(mesh.connectivity, kind="stable")
+    sorted_faces = corner_faces[order]
+    group_start = weld.get_group_start(mesh.connectivity[order])
+    corner_amount = len(order)
+    first = np.maximum.accumulate(np.where(group_start, np.arange(corner_amount), 0))
+    sizes = np.diff(np.append(np.flatnonzero(group_start), corner_amount))[np.cumsum(group_start) - 1]
+
+    # Every corner is compared with all corners of its vertex, the face normals are gathered in the corner order once
+    # so the comparisons only access neighbouring memory
+    corner_units = units[sorted_faces]
+    corner_normals = face_normals[sorted_faces]
+    pair_ends = np.cumsum(sizes)
+    normals = np.empty((corner_amount, 3), dtype=np.float64)
+    start = 0
+    while start < corner_amount:
+        end = max(int(np.searchsorted(pair_ends, pair_ends[start] - sizes[start] + crease_chunk_pairs)), start + 1)
+        counts = sizes[start:end]
+        corners = np.repeat(np.arange(end - start), counts)
+        offsets = np.arange(len(corners)) - np.repeat(np.cumsum(counts) - counts, counts)
+        others = np.repeat(first[start:end], counts) + offsets
+        own = corners + start
+        cosines = np.einsum("ij,ij->i", np.take(corner_units, own, axis=0), np.take(corner_units, others, axis=0))
+        weights = (cosines >= minimum_cosine)[:, None] * np.take(corner_normals, others, axis=0)
+        for axis in range(3):
+            normals[start:end, axis] = np.bincount(corners, weights=weights[:, axis], minlength=end - start)
+        start = end
+
+    # Corners of a vertex with equal normals share a vertex, equal sums have identical bits. The corners are already
+    # grouped by vertex, sorting them by the hash of their normals within the groups is cheap. Hash collisions can only
+    # separate equal normals, which duplicates a vertex without changing the shading.
+    sorted_vertices = mesh.connectivity[order]
+    keys = (np.cumsum(group_start).astype(np.uint64) << np.uint64(32)) | (weld.hash_rows(normals) >> np.uint64(32))
+    split_order = np.argsort(keys, kind="stable")
+    keys = np.column_stack([sorted_vertices.astype(np.float64), normals])[split_order]
+    new_start = weld.get_group_start(keys)
+    new_ids = np.cumsum(new_start) - 1
+    sources = sorted_vertices[split_order][new_start]
+
+    vertex_amount = mesh.vertex_amount
+    for block in mesh.blocks:
+        if len(block.values) == vertex_amount:
+            block.values = block.values[sources]
+    connectivity = np.empty(corner_amount, dtype=np.int64)
+    connectivity[order[split_order]] = new_ids
+    mesh.vertices = mesh.vertices[sources]
+    mesh.connectivity = connectivity.astype(mesh.connectivity.dtype)
+    return normals[split_order][new_start]
@@ -0,0 +1,192 @@
+"""Vertex cache and memory locality optimization of the mesh data"""
+
+import numpy as np
+from interfaces.mesh_data import MeshData
+
+# Amount of vertices of the simulated FIFO post-transform cache, also the cache size assumed by Tipsify
+vertex_cache_size = 32
+# Meshes with more faces are ordered with the vectorized fan order, as Tipsify loops over the faces in Python
+tipsify_face_limit = 1 << 18
+# The ACMR of meshes with more faces is simulated on evenly spaced windows of acmr_window_faces faces
+acmr_sample_faces = 1 << 18
+acmr_window_faces = 1 << 12
+
+
+def optimize_vertex_cache(mesh: MeshData):
+    """Reorders the faces for the vertex cache and the vertices by their first use.
+
+    Meshes with up to tipsify_face_limit faces are ordered with Tipsify, larger meshes with the vectorized fan order.
+    Per-vertex and per-face data blocks are reordered consistently.
+
+    :param mesh: The mesh data to optimize.
+    :return: The ACMR before and after the optimization.
+    """
+    vertex_amount = mesh.vertex_amount
+    face_amount = mesh.face_amount
+    before = get_acmr(mesh.connectivity, mesh.polygon)
+    if face_amount == 0:
+        return before, before
+
+    faces = mesh.connectivity.reshape(-1, mesh.polygon)
+    if face_amount <= tipsify_face_limit:
+        face_order = get_tipsify_order(faces, vertex_amount)
+    else:
+        face_order = get_fan_order(faces, mesh.vertices)
+    faces = faces[face_order]
+
+    # Vertices are numbered by their first use, unused vertices are kept at the end
+    first_use = np.full(vertex_amount, faces.size, dtype=np.int64)
+    np.minimum.at(first_use, faces.reshape(-1), np.arange(faces.size))
+    vertex_order = np.argsort(first_use, kind="stable")
+    remap = np.empty(vertex_amount, dtype=mesh.connectivity.dtype)
+    remap[vertex_order] = np.arange(vertex_amount, dtype=mesh.connectivity.dtype)
+
+    for block in mesh.blocks:
+        if len(block.values) == vertex_amount:
+            block.values = block.values[vertex_order]
+        elif len(block.values) == face_amount:
+            block.values = block.values[face_order]
+    mesh.vertices = mesh.vertices[vertex_order]
+    mesh.connectivity = remap[faces.reshape(-1)]
+    return before, get_acmr(mesh.connectivity, mesh.polygon)
+
+
+def get_tipsify_order(faces, vertex_amount: int, cache_size: int = vertex_cache_size) -> np.ndarray:
+    """Orders the faces with Tipsify by Sander, Nehab and Barczak (Fast Triangle Reordering for Vertex Locality and
+    Reduced Overdraw, 2007).
+
+    All remaining faces around the current vertex are emitted at once. The next vertex is the vertex of these faces
+    which stays in the cache while its remaining faces are emitted and entered the cache first, else the latest
+    vertex with remaining faces, else the next vertex with remaining faces in ID order. The cache is modeled with
+    time stamps, a vertex is cached if fewer than cache_size vertices entered the cache after it.
+
+    :param faces: The vertex IDs of shape (F, polygon).
+    :param vertex_amount: The amount of vertices.
+    :param cache_size: The amount of vertices of the modeled cache.
+    :return: The face IDs in the new order as int64 array.
+    """
+    corners = faces.reshape(-1).astype(np.int64)
+    live = np.bincount(corners, minlength=vertex_amount)
+    # Vertex to face adjacency in compressed sparse row form
+    offsets = np.concatenate([[0], np.cumsum(live)]).tolist()
+    adjacency = (np.argsort(corners, kind="stable") // faces.shape[1]).tolist()
+    live = live.tolist()
+    face_lists = faces.tolist()
+    stamps = [0] * vertex_amount
+    emitted = [False] * len(faces)
+    order = []
+    dead_ends = []
+    stamp = cache_size + 1
+    cursor = 0
+    vertex = 0
+    while vertex >= 0:
+        candidates = []
+        for face in adjacency[offsets[vertex]:offsets[vertex + 1]]:
+            if emitted[face]:
+                continue
+            emitted[face] = True
+            order.append(face)
+            for corner in face_lists[face]:
+                dead_ends.append(corner)
+                candidates.append(corner)
+                live[corner] -= 1
+                if stamp - stamps[corner] > cache_size:
+                    stamps[corner] = stamp
+                    stamp += 1
+
+        vertex = -1
+        best = -1
+        for candidate in candidates:
+            if live[candidate] > 0:
+                # Vertices leaving the cache before their remaining faces are emitted have the lowest priority
+                age = stamp - stamps[candidate]
+                priority = age if age + 2 * live[candidate] <= cache_size else 0
+                if priority > best:
+                    best = priority
+                    vertex = candidate
+        while vertex < 0 and dead_ends:
+            candidate = dead_ends.pop()
+            if live[candidate] > 0:
+                vertex = candidate
+        if vertex < 0:
+            while cursor < vertex_amount and live[cursor] == 0:
+                cursor += 1
+            vertex = cursor if cursor < vertex_amount else -1
+    return np.array(order, dtype=np.int64)
+
+
+def get_fan_order(faces, vertices) -> np.ndarray:
+    """Orders the faces as fans around the vertices in Morton order without a loop over the faces.
+
+    Like Tipsify, every vertex emits all its remaining faces at once, but the vertices are visited along a Morton
+    curve instead of choosing the next vertex from the cache. Every face is emitted by its corner which comes first
+    on the curve, so the order is a single sort.
+
+    :param faces: The vertex IDs of shape (F, polygon).
+    :param vertices: The vertices of shape (N, 3).
+    :return: The face IDs in the new order as int64 array.
+    """
+    ranks = np.empty(len(vertices), dtype=np.int64)
+    ranks[np.argsort(get_morton_codes(vertices), kind="stable")] = np.arange(len(vertices))
+    return np.argsort(np.amin(ranks[faces], axis=1), kind="stable")
+
+
+def get_morton_codes(points, isotropic: bool = False) -> np.ndarray:
+    """Calculates the Morton codes of the given points by interleaving their quantized coordinates.
+
+    :param points: The points as array of shape (N, 3).
+    :param isotropic: Quantizes all axes with the largest extent instead of their own extent, so flat regions along
+        an axis do not dominate the curve.
+    :return: The 63 bit Morton codes as uint64 array.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    minimum = np.amin(points, axis=0)
+    extent = np.amax(points, axis=0) - minimum
+    if isotropic:
+        extent = np.full(3, np.amax(extent))
+    grid = ((points - minimum) / np.where(extent > 0, extent, 1) * 2097151).astype(np.uint64)
+    codes = np.zeros(len(points), dtype=np.uint64)
+    for axis in range(3):
+        codes |= spread_bits(grid[:, axis]) << np.uint64(axis)
+    return codes
+
+
+def spread_bits(values: np.ndarray) -> np.ndarray:
+    """Inserts two zero bits after each of the lower 21 bits of the given values.
+
+    :param values: The values as uint64 array.
+    :return: The spread values as uint64 array.
+    """
+    values = values & np.uint64(0x1FFFFF)
+    for shift, mask in ((32, 0x1F00000000FFFF), (16, 0x1F0000FF0000FF), (8, 0x100F00F00F00F00F),
+                        (4, 0x10C30C30C30C30C3), (2, 0x1249249249249249)):
+        values = (values | (values << np.uint64(shift))) & np.uint64(mask)
+    return values
+
+
+def get_acmr(connectivity, polygon: int) -> float:
+    """Calculates the average cache miss ratio, the vertex transformations per face with a FIFO vertex cache.
+
+    A vertex is cached while fewer than vertex_cache_size other vertices were inserted after it. Meshes with more than
+    acmr_sample_faces faces are simulated on evenly spaced windows spanning all faces, so the simulation time stays
+    bounded. Each window starts with the cache left by the previous window, which changes its misses by at most
+    vertex_cache_size.
+
+    :param connectivity: The flat vertex IDs.
+    :param polygon: Amount of vertices per face.
+    :return: The ACMR, 0 for meshes without faces.
+    """
+    faces = np.asarray(connectivity).reshape(-1, polygon)
+    if len(faces) > acmr_sample_faces:
+        starts = np.linspace(0, len(faces) - acmr_window_faces, acmr_sample_faces // acmr_window_faces)
+        faces = faces[(starts.astype(np.int64)[:, None] + np.arange(acmr_window_faces)).reshape(-1)]
+    indices = faces.reshape(-1).tolist()
+    if not indices:
+        return 0.0
+    inserted = [-vertex_cache_size - 1] * (max(indices) + 1)
+    misses = 0
+    for index in indices:
+        if misses - inserted[index] > vertex_cache_size:
+            inserted[index] = misses
+            misses += 1
+    return misses / (len(indices) // polygon)
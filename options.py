@@ -0,0 +1,66 @@
+"""Definition and parsing of the options string exchanged with the webserver."""
+
+
+class Option:
+    """A single option line of the analyze output."""
+    __slots__ = ("key", "label", "value_type", "default")
+
+    def __init__(self, key: str, label: str, value_type: type, default):
+        """Creates the option.
+
+        :param key: The key used to access the parsed value.
+        :param label: The label shown to the user.
+        :param value_type: The requested value type (bool, int or float).
+        :param default: The value used if the option is missing or invalid.
+        """
+        self.key = key
+        self.label = label
+        self.value_type = value_type
+        self.default = default
+
+    def line(self) -> str:
+        """Returns the option line as expected by the webserver.
+
+        :return: The option line.
+        """
+        return "%s:%s" % (self.label, self.value_type.__name__)
+
+    def parse(self, value: str):
+        """Parses the given option value.
+
+        :param value: The value as given in the options string.
+        :return: The parsed value or the default value if the value is invalid.
+        """
+        value = value.strip()
+        if not value:
+            return self.default
+        if self.value_type is bool:
+            return value.lower() in ("1", "true")
+        try:
+            return self.value_type(value)
+        except ValueError:
+            return self.default
+
+
+def print_options(definitions: list) -> None:
+    """Outputs the option lines of the given option definitions to console.
+
+    :param definitions: The list of option definitions.
+    """
+    for option in definitions:
+        print(option.line())
+
+
+def parse_options(options: str, definitions: list) -> dict:
+    """Parses the options string with the given option definitions.
+
+    Each line of the options string is the value of the option definition at the same position. Missing values are
+    replaced with the default value of the option.
+
+    :param options: The options string.
+    :param definitions: The list of option definitions.
+    :return: A dictionary mapping the option keys to the parsed values.
+    """
+    values = options.splitlines() if options else []
+    return {option.key: option.parse(values[i]) if i < len(values) else option.default
+            for i, option in enumerate(definitions)}
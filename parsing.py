@@ -0,0 +1,80 @@
+"""Settings and helpers of the parsing of text files shared by the import scripts"""
+import mmap
+import os
+import re
+import numpy as np
+
+# Text files larger than this amount of bytes are parsed by several worker processes
+parallel_parse_size = 1 << 26
+parse_workers = int(os.environ.get("FILE_CONVERTER_PARSE_WORKERS", "0")) or os.cpu_count()
+
+# Amount of bytes read at once
+text_chunk_size = 1 << 24
+# Blanks indenting a line, which are removed before the lines are classified
+INDENTATION_PATTERN = re.compile(rb"\n[ \t]+")
+
+
+def set_parse_workers(workers):
+    """Sets the amount of worker processes parsing large text files, e.g. inside worker processes.
+
+    :param workers: The amount of worker processes.
+    """
+    global parse_workers
+    parse_workers = workers
+
+
+def read_buffers(file_path, start, end):
+    """Reads a byte range of the file in chunks of complete lines which all start with a line break.
+
+    Blanks at the start of the lines are removed, so the keyword of every line follows its line break.
+
+    :param file_path: The path to the file.
+    :param start: The first byte of the range, which has to be the start of the file or a line break.
+    :param end: The end of the range, which has to be the end of the file or a line break.
+    :return: Generator of bytes objects containing complete lines.
+    """
+    if start >= end:
+        return
+    with open(file_path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        position = start
+        while position < end:
+            cut = end
+            if position + text_chunk_size < end:
+                cut = data.rfind(b"\n", position + 1, position + text_chunk_size)
+                if cut < 0:
+                    cut = data.find(b"\n", position + text_chunk_size, end)
+                    cut = end if cut < 0 else cut
+            # The first line of the file has no leading line break
+            buffer = data[position:cut] if position > 0 else b"\n" + data[position:cut]
+            if b"\n " in buffer or b"\n\t" in buffer:
+                buffer = INDENTATION_PATTERN.sub(b"\n", buffer)
+            yield buffer
+            position = cut
+
+
+def count_tokens(text, line_amount):
+    """Counts the whitespace separated tokens of every line.
+
+    :param text: The lines, each preceded by its line break.
+    :param line_amount: The amount of lines.
+    :return: The amount of tokens of every line.
+    """
+    characters = np.frombuffer(text, dtype=np.uint8)
+    blank = (characters == 32) | (characters == 9) | (characters == 10) | (characters == 13)
+    starts = ~blank
+    starts[1:] &= blank[:-1]
+    lines = np.cumsum(characters == 10) - 1
+    return np.bincount(lines[starts], minlength=line_amount)
+
+
+def triangulate(indices, sizes):
+    """Splits the polygons into triangle fans around their first vertex.
+
+    :param indices: The flat vertex indices of all polygons.
+    :param sizes: The amount of vertices of every polygon.
+    :return: The triangles of shape (T, 3).
+    """
+    fan_sizes = sizes - 2
+    starts = np.repeat(np.cumsum(sizes) - sizes, fan_sizes)
+    corners = np.arange(len(starts)) - np.repeat(np.cumsum(fan_sizes) - fan_sizes, fan_sizes) + 1
+    return np.stack([indices[starts], indices[starts + corners], indices[starts + corners + 1]], axis=1)
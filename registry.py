@@ -0,0 +1,130 @@
+"""Lazy registry of the import and export plugins, indexed by their supported formats."""
+import hashlib
+import importlib
+import json
+import os
+import tempfile
+from glob import glob
+
+import cache
+
+package_directory = os.path.dirname(os.path.abspath(__file__))
+
+# Package name, file suffix and class name of the plugin kinds
+plugin_kinds = {
+    True: ("importer", "_import.py", "Import"),
+    False: ("exporter", "_export.py", "Export")
+}
+
+# Index of the current process and the plugin instances created so far
+plugin_index = None
+plugin_instances = {}
+
+
+def get_plugin_files() -> dict:
+    """Fetches the plugin files of both packages with their modification times.
+
+    :return: A dictionary mapping the module names to the modification times.
+    """
+    files = {}
+    for package, suffix, _ in plugin_kinds.values():
+        for path in sorted(glob(os.path.join(package_directory, package, "*" + suffix))):
+            files["%s.%s" % (package, os.path.basename(path)[:-3])] = os.stat(path).st_mtime_ns
+    return files
+
+
+def get_index_path():
+    """Returns the path of the index file of this installation inside the cache directory.
+
+    The index names the modules which are imported, so it is only stored in the configured cache directory and not in
+    a shared temporary directory.
+
+    :return: The path to the index file or None if the cache is disabled.
+    """
+    if not cache.cache_directory:
+        return None
+    key = hashlib.sha1(package_directory.encode("utf-8")).hexdigest()
+    return os.path.join(cache.cache_directory, "plugin-index-%s.json" % key)
+
+
+def build_index(files: dict) -> dict:
+    """Imports all plugins and indexes their supported formats.
+
+    :param files: The plugin modules with their modification times.
+    :return: The index.
+    """
+    index = {"files": files, "importer": {}, "exporter": {}}
+    for module_name in files:
+        package = module_name.split(".")[0]
+        class_name = plugin_kinds[package == "importer"][2]
+        instance = getattr(importlib.import_module(module_name), class_name)()
+        plugin_instances[module_name] = instance
+        for file_format in instance.supported_formats():
+            index[package].setdefault(file_format, module_name)
+    return index
+
+
+def get_index() -> dict:
+    """Loads the index from disk or rebuilds it if a plugin file was added, removed or modified.
+
+    Without a cache directory the index is built once per process.
+
+    :return: The index.
+    """
+    global plugin_index
+    if plugin_index is not None:
+        return plugin_index
+    files = get_plugin_files()
+    index_path = get_index_path()
+    if index_path is None:
+        plugin_index = build_index(files)
+        return plugin_index
+    try:
+        with open(index_path, "r") as file:
+            plugin_index = json.load(file)
+        if plugin_index.get("files") == files:
+            return plugin_index
+    except (OSError, ValueError):
+        pass
+
+    plugin_index = build_index(files)
+    try:
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(index_path), suffix=".tmp", delete=False) as file:
+            json.dump(plugin_index, file)
+        os.replace(file.name, index_path)
+    except OSError:
+        pass
+    return plugin_index
+
+
+def get_formats(importer: bool = True) -> list:
+    """Returns the supported formats without importing any plugin if the index is up to date.
+
+    :param importer: Import formats desired, default true.
+    :return: The supported formats.
+    """
+    return list(get_index()[plugin_kinds[importer][0]])
+
+
+def get_plugin(file_format: str, importer: bool = True):
+    """Returns the instance of the plugin owning the given format, only this plugin is imported.
+
+    :param file_format: The desired file format.
+    :param importer: Importer desired, default true.
+    :return: The import / export instance or None if the format is not supported.
+    """
+    module_name = get_index()[plugin_kinds[importer][0]].get(file_format)
+    if module_name is None:
+        return None
+    if module_name not in plugin_instances:
+        class_name = plugin_kinds[importer][2]
+        plugin_instances[module_name] = getattr(importlib.import_module(module_name), class_name)()
+    return plugin_instances[module_name]
+
+
+def load_plugins() -> None:
+    """Imports and instantiates all plugins, e.g. before forking worker processes."""
+    for importer in plugin_kinds:
+        for file_format in get_formats(importer):
+            get_plugin(file_format, importer)
@@ -0,0 +1,71 @@
+"""Splitting of the mesh data into meshes with 16 bit vertex IDs"""
+
+import numpy as np
+import optimize
+from interfaces.mesh_data import DataBlock, MeshData
+
+# Maximum amount of vertices of a split mesh, so the exported connectivity fits into UINT16
+split_vertex_limit = 65535
+
+
+def split_mesh(mesh: MeshData, vertex_limit: int = split_vertex_limit) -> list:
+    """Splits the mesh data into spatially coherent meshes with at most the given amount of vertices each.
+
+    The faces are sorted along a Morton curve through their centers and cut into consecutive runs using at most
+    vertex_limit distinct vertices. Every split mesh numbers its vertices by their first use, vertices of faces in
+    several runs are duplicated and unused vertices are dropped. Per-vertex and per-face data blocks are split
+    accordingly, other data blocks are copied to every split mesh.
+
+    :param mesh: The mesh data to split, it is not modified.
+    :param vertex_limit: The maximum amount of vertices per split mesh.
+    :return: The split meshes in Morton order, a list containing only the given mesh if it does not exceed the limit.
+    """
+    if mesh.vertex_amount <= vertex_limit or mesh.face_amount == 0:
+        return [mesh]
+    if vertex_limit < mesh.polygon:
+        raise ValueError("The vertex limit is smaller than a face")
+
+    faces = mesh.connectivity.reshape(-1, mesh.polygon)
+    centers = mesh.vertices[faces[:, 0]].astype(np.float64)
+    for corner in range(1, mesh.polygon):
+        centers += mesh.vertices[faces[:, corner]]
+    face_order = np.argsort(optimize.get_morton_codes(centers, True), kind="stable")
+    faces = faces[face_order]
+    # The first use of the vertices within the current run, reset after every run
+    first_use = np.full(mesh.vertex_amount, faces.size, dtype=np.int64)
+    local_ids = np.zeros(mesh.vertex_amount, dtype=np.int64)
+
+    meshes = []
+    start = 0
+    window = vertex_limit
+    while start < len(faces):
+        corners = faces[start:start + window].reshape(-1)
+        positions = np.arange(len(corners))
+        np.minimum.at(first_use, corners, positions)
+        new = first_use[corners] == positions
+        first_use[corners] = faces.size
+        used = np.cumsum(new)[mesh.polygon - 1::mesh.polygon]
+        amount = int(np.searchsorted(used, vertex_limit, side="right"))
+        # The run may continue after the window, as later faces can reuse the vertices
+        if amount == len(used) and start + amount < len(faces):
+            window *= 2
+            continue
+
+        corners = corners[:amount * mesh.polygon]
+        vertex_ids = corners[new[:len(corners)]]
+        local_ids[vertex_ids] = np.arange(len(vertex_ids))
+        face_ids = face_order[start:start + amount]
+        blocks = []
+        for block in mesh.blocks:
+            if len(block.values) == mesh.vertex_amount:
+                values = block.values[vertex_ids]
+            elif len(block.values) == mesh.face_amount:
+                values = block.values[face_ids]
+            else:
+                values = block.values.copy()
+            blocks.append(DataBlock(block.name, block.precision, values))
+        meshes.append(MeshData(mesh.polygon, mesh.frames, mesh.vertices[vertex_ids], local_ids[corners],
+                               mesh.vertex_precision, blocks))
+        start += amount
+        window = max(vertex_limit, 2 * amount)
+    return meshes
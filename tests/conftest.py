@@ -0,0 +1,5 @@
+"""Makes the modules of the repository root importable like in the converter."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
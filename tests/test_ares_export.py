@@ -0,0 +1,141 @@
+"""Tests of the ARES export."""
+import io
+import struct
+
+import numpy as np
+import pytest
+from exporter import ares_export
+from exporter.ares_export import BinaryType, Export, format_string_single
+from importer.ares_import import Import as AresImport
+from interfaces.mesh_data import DataBlock, MeshData
+
+
+def write_binary_struct(stream, binary_type: BinaryType, values):
+    """The former writer packing all values with a single struct format."""
+    values = list(values)
+    code = format_string_single[binary_type]
+    stream.write(struct.pack("%s%d%s" % (code[0], len(values), code[1]), *values))
+
+
+def create_values(binary_type: BinaryType, amount: int) -> list:
+    """Creates random values covering the range of the binary type."""
+    rng = np.random.default_rng(amount)
+    dtype = ares_export.numpy_dtype[binary_type]
+    if dtype.kind == "b":
+        return rng.integers(0, 2, amount).astype(bool).tolist()
+    if dtype.kind == "f":
+        return rng.normal(0, 1000, amount).astype(dtype).tolist()
+    info = np.iinfo(dtype)
+    return rng.integers(info.min, info.max, amount, dtype=dtype, endpoint=True).tolist()
+
+
+def create_mesh() -> MeshData:
+    """Creates a mesh with a per-vertex and a per-face data block."""
+    rng = np.random.default_rng(0)
+    vertices = rng.random((300, 3)).astype(np.float32)
+    faces = rng.integers(0, 300, (500, 3))
+    return MeshData(3, 1, vertices, faces, blocks=[DataBlock("color", 1, rng.integers(0, 256, 300)),
+                                                   DataBlock("area", 10, rng.random(500))])
+
+
+@pytest.mark.parametrize("binary_type", list(BinaryType))
+def test_write_binary_matches_struct_writer(binary_type, monkeypatch):
+    # Small chunks cover the chunked conversion
+    monkeypatch.setattr(ares_export, "write_chunk_size", 64)
+    for amount in (0, 1, 1000):
+        values = create_values(binary_type, amount)
+        expected = io.BytesIO()
+        write_binary_struct(expected, binary_type, values)
+        dtype = ares_export.numpy_dtype[binary_type]
+        # Arrays of a wider dtype are converted by the writer
+        wider = np.float64 if dtype.kind == "f" else np.uint64 if dtype.kind == "u" else np.int64
+        for converted in (values, np.array(values, dtype=dtype), np.array(values, dtype=wider)):
+            written = io.BytesIO()
+            ares_export.write_binary(written, binary_type, converted)
+            assert written.getvalue() == expected.getvalue()
+
+
+def test_export_matches_struct_writer(tmp_path, monkeypatch):
+    mesh = create_mesh()
+    Export().export(mesh, str(tmp_path / "new"))
+    monkeypatch.setattr(ares_export, "write_binary", write_binary_struct)
+    Export().export(mesh, str(tmp_path / "old"))
+    assert (tmp_path / "new.ares").read_bytes() == (tmp_path / "old.ares").read_bytes()
+
+
+def test_export_round_trips_through_import(tmp_path):
+    mesh = create_mesh()
+    Export().export(mesh, str(tmp_path / "mesh"))
+    data = AresImport().extract(str(tmp_path / "mesh.ares"), "")
+    assert np.array_equal(data.vertices, mesh.vertices)
+    assert np.array_equal(data.connectivity, mesh.connectivity)
+    assert [(block.name, block.precision) for block in data.blocks] == [("color", 1), ("area", 10)]
+    for block, expected in zip(data.blocks, mesh.blocks):
+        assert np.array_equal(block.values, expected.values)
+
+
+def export_compact(mesh: MeshData, path: str, options: str) -> MeshData:
+    """Exports the mesh in the compact format with the given export options and imports it again."""
+    exporter = Export()
+    exporter.configure("1\n" + options)
+    exporter.export(mesh, path)
+    return AresImport().extract(path + ".ares", "")
+
+
+@pytest.mark.parametrize("compress", [True, False])
+@pytest.mark.parametrize("vertex_bits", [10, 14, 16])
+def test_compact_quantized_round_trip(tmp_path, compress, vertex_bits, capsys):
+    mesh = create_mesh()
+    data = export_compact(mesh, str(tmp_path / "mesh"), "%d\n0.01\n%d" % (vertex_bits, compress))
+    minimum, maximum = mesh.vertices.min(axis=0), mesh.vertices.max(axis=0)
+    # Rounding to the nearest quantization step
+    np.testing.assert_allclose(data.vertices, mesh.vertices, rtol=0,
+                               atol=float(np.amax(maximum - minimum)) / ((1 << vertex_bits) - 1) * 0.51)
+    assert np.array_equal(data.connectivity, mesh.connectivity.reshape(-1))
+    for block, expected in zip(data.blocks, mesh.blocks):
+        assert block.name == expected.name
+        assert np.array_equal(block.values, expected.values)
+    assert "#Compression ratio" in capsys.readouterr().out
+
+
+def test_compact_fp16_round_trip(tmp_path):
+    mesh = create_mesh()
+    data = export_compact(mesh, str(tmp_path / "mesh"), "0\n0.01")
+    assert np.array_equal(data.vertices, mesh.vertices.astype(np.float16).astype(np.float32))
+
+
+def test_compact_falls_back_to_fp32(tmp_path, capsys):
+    mesh = create_mesh()
+    data = export_compact(mesh, str(tmp_path / "mesh"), "10\n0.0000001")
+    assert np.array_equal(data.vertices, mesh.vertices)
+    assert "are stored as FP32" in capsys.readouterr().out
+
+
+def test_compact_connectivity_with_large_jumps(tmp_path):
+    # Descending IDs and jumps needing 3 varint bytes cover the zigzag encoding
+    connectivity = np.array([0, 70000, 1, 69999, 2, 0, 5, 5, 70000], dtype=np.uint32)
+    mesh = MeshData(3, 1, np.random.default_rng(1).random((70001, 3)).astype(np.float32), connectivity)
+    data = export_compact(mesh, str(tmp_path / "mesh"), "16\n0.01\n1")
+    assert np.array_equal(data.connectivity, connectivity)
+
+
+def test_varints_of_zigzag_deltas():
+    values = np.array([0, 1, 0, 300, 44, 1 << 40], dtype=np.int64)
+    deltas = ares_export.zigzag_deltas(values, 0)
+    assert deltas.tolist() == [0, 2, 1, 600, 511, ((1 << 40) - 44) * 2]
+    # Groups of 7 bits, least significant group first, the high bit marks following bytes
+    assert ares_export.encode_varints(np.array([0, 127, 128, 300], dtype=np.uint64)).tobytes() == \
+        bytes([0, 127, 0x80, 1, 0xAC, 2])
+
+
+def test_compact_and_plain_block_headers_match():
+    mesh = create_mesh()
+    exporter = Export()
+    exporter.get_mesh_information(mesh)
+    for block in mesh.blocks:
+        plain = io.BytesIO()
+        exporter.write_data_block(plain, block)
+        header = io.BytesIO()
+        binary_type = exporter.write_block_header(header, block)
+        values = block.values.astype(ares_export.numpy_dtype[binary_type]).tobytes()
+        assert plain.getvalue() == header.getvalue() + values
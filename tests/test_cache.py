@@ -0,0 +1,75 @@
+"""Tests of the persistent cache."""
+import os
+
+import cache
+import converter
+import numpy as np
+import pytest
+from benchmarks import synthetic
+
+
+@pytest.fixture
+def output_cache(tmp_path, monkeypatch):
+    """Enables the output cache in a temporary directory."""
+    monkeypatch.setattr(cache, "cache_directory", str(tmp_path / "cache"))
+    monkeypatch.setattr(cache, "output_cache_size", 64)
+
+
+def write_stl(file_path, triangle_amount: int, seed: int) -> str:
+    """Writes a synthetic binary STL file and returns its path."""
+    synthetic.write_binary_stl(str(file_path), synthetic.create_triangles(triangle_amount, 0.5, seed))
+    return str(file_path)
+
+
+def read_file(file_path: str) -> bytes:
+    """Returns the content of the file."""
+    with open(file_path, "rb") as file:
+        return file.read()
+
+
+def test_output_cache_hit_returns_same_output(tmp_path, output_cache):
+    small = write_stl(tmp_path / "s.stl", 10, 1)
+    converter.convert_file(small, "stl", str(tmp_path / "first"), "")
+    written = converter.convert_file(small, "stl", str(tmp_path / "second"), "")
+    assert written == [str(tmp_path / "second.ares")]
+    assert read_file(written[0]) == read_file(str(tmp_path / "first.ares"))
+
+
+def test_reconversion_onto_linked_output_keeps_cache_entry(tmp_path, output_cache):
+    small = write_stl(tmp_path / "s.stl", 10, 1)
+    big = write_stl(tmp_path / "b.stl", 100, 2)
+    output = str(tmp_path / "out")
+    converter.convert_file(small, "stl", output, "")
+    expected = read_file(output + ".ares")
+    # The cache hit links the output to the cache entry
+    converter.convert_file(small, "stl", output, "")
+    converter.convert_file(big, "stl", output, "")
+    assert read_file(output + ".ares") != expected
+
+    converter.convert_file(small, "stl", str(tmp_path / "other"), "")
+    assert read_file(str(tmp_path / "other.ares")) == expected
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_array_cache_is_disabled_without_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "cache_directory", "")
+    source = write_stl(tmp_path / "s.stl", 10, 1)
+    cache.store_array(source, "vertices", np.zeros((3, 3), dtype=np.float32))
+    assert cache.load_array(source, "vertices") is None
+
+
+def test_array_cache_evicts_least_recently_used_arrays(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "cache_directory", str(tmp_path / "cache"))
+    monkeypatch.setattr(cache, "array_cache_size", 1)
+    sources = [write_stl(tmp_path / ("%d.stl" % index), 10, index) for index in range(3)]
+    array = np.arange(100000, dtype=np.float32).reshape(-1, 4)
+    for age, source in enumerate(sources[:2]):
+        cache.store_array(source, "vertices", array)
+        os.utime(cache.get_array_path(source, "vertices"), (age, age))
+    # Loading marks the oldest array as used, so the second one is evicted
+    assert cache.load_array(sources[0], "vertices") is not None
+    cache.store_array(sources[2], "vertices", array)
+
+    assert np.array_equal(cache.load_array(sources[0], "vertices"), array)
+    assert cache.load_array(sources[1], "vertices") is None
+    assert np.array_equal(cache.load_array(sources[2], "vertices"), array)
@@ -0,0 +1,68 @@
+"""Tests of the normalization."""
+import normalize
+import numpy as np
+import pytest
+from benchmarks import synthetic
+from importer import stl_import
+from interfaces.mesh_data import MeshData
+
+
+def create_vertices(amount: int, seed: int) -> np.ndarray:
+    """Returns random float32 vertices of shape (amount, 3) with different extents per axis."""
+    rng = np.random.default_rng(seed)
+    return (rng.random((amount, 3)) * [4, 2, 1] + [10, -5, 3]).astype(np.float32)
+
+
+@pytest.mark.parametrize("amount", [3, 1000, normalize.transform_chunk_size * 2 + 7])
+def test_transform_matches_subtract_and_divide(amount):
+    vertices = create_vertices(amount, amount)
+    offset, max_size = normalize.get_transform(*normalize.get_bounds(vertices))
+    expected = (vertices - offset) / max_size
+    np.testing.assert_allclose(normalize.transform_vertices(vertices.copy(), offset, max_size), expected,
+                               rtol=0, atol=1e-6)
+
+
+def test_normalize_data_centers_and_scales():
+    data = MeshData(3, 1, create_vertices(999, 1), np.arange(999, dtype=np.uint32))
+    normalize.normalize_data(data)
+    minimum, maximum = normalize.get_bounds(data.vertices)
+    np.testing.assert_allclose(minimum[1], 0, atol=1e-6)
+    np.testing.assert_allclose((minimum + maximum)[[0, 2]], 0, atol=1e-6)
+    np.testing.assert_allclose(np.amax(maximum - minimum), 1, atol=1e-6)
+    np.testing.assert_allclose(data.minimum, minimum, atol=1e-6)
+    np.testing.assert_allclose(data.maximum, maximum, atol=1e-6)
+
+
+def test_read_only_vertices_are_not_modified():
+    vertices = create_vertices(100, 2)
+    vertices.flags.writeable = False
+    data = MeshData(3, 1, vertices, np.arange(100, dtype=np.uint32))
+    original = vertices.copy()
+    normalize.normalize_data(data)
+    assert data.vertices is not vertices
+    np.testing.assert_array_equal(vertices, original)
+
+
+def test_known_bounds_skip_the_reduction(monkeypatch):
+    vertices = create_vertices(100, 3)
+    data = MeshData(3, 1, vertices, np.arange(100, dtype=np.uint32))
+    data.minimum, data.maximum = normalize.get_bounds(vertices)
+    monkeypatch.setattr(normalize, "get_bounds", lambda _: pytest.fail("The bounds were reduced again"))
+    normalize.normalize_data(data)
+
+
+@pytest.mark.parametrize("ascii_format", [False, True])
+def test_stl_import_passes_known_bounds(tmp_path, monkeypatch, ascii_format):
+    monkeypatch.setattr(stl_import.parsing, "parse_workers", 1)
+    triangles = synthetic.create_triangles(200, 0.5, 4)
+    file_path = str(tmp_path / "mesh.stl")
+    (synthetic.write_ascii_stl if ascii_format else synthetic.write_binary_stl)(file_path, triangles)
+    importer = stl_import.Import()
+    if not ascii_format:
+        # Binary files only know their bounds after the statistics pass of analyze
+        monkeypatch.setattr(stl_import.mesh_statistics, "analyze_statistics", True)
+        importer.analyze(file_path)
+    data = importer.extract(file_path, "")
+    expected = normalize.get_bounds(data.vertices)
+    np.testing.assert_array_equal(data.minimum, expected[0])
+    np.testing.assert_array_equal(data.maximum, expected[1])
@@ -0,0 +1,47 @@
+"""Tests of the smooth shading vertex normals."""
+import normals
+import numpy as np
+import pytest
+import weld
+from interfaces.mesh_data import MeshData
+
+
+def get_normals(mesh: MeshData) -> np.ndarray:
+    """Returns the normals of the NV1, NV2 and NV3 data blocks of shape (N, 3)."""
+    return np.stack([block.values for block in mesh.blocks if block.name.startswith("NV")], axis=1)
+
+
+@pytest.mark.parametrize("crease_angle", [0.0, 30.0])
+def test_mesh_without_faces(crease_angle):
+    mesh = MeshData(3, 1, np.ones((2, 3), dtype=np.float32), np.zeros(0, dtype=np.uint32))
+    normals.add_vertex_normals(mesh, crease_angle)
+    assert mesh.vertex_amount == 2
+    assert np.array_equal(get_normals(mesh), np.zeros((2, 3)))
+
+
+@pytest.mark.parametrize("crease_angle", [0.0, 30.0])
+def test_degenerate_faces_get_zero_normals(crease_angle):
+    # Both faces have no area, one repeats a vertex and one has collinear vertices
+    vertices = np.array([[0, 0, 0], [1, 0, 0], [2, 0, 0]], dtype=np.float32)
+    mesh = MeshData(3, 1, vertices, np.array([0, 1, 1, 0, 1, 2], dtype=np.uint32))
+    normals.add_vertex_normals(mesh, crease_angle)
+    assert np.all(np.isfinite(get_normals(mesh)))
+    assert np.array_equal(get_normals(mesh), np.zeros((mesh.vertex_amount, 3)))
+
+
+def test_crease_splits_the_vertices_of_a_sharp_edge():
+    # Two faces folded by 90 degrees along the edge from vertex 0 to vertex 1
+    vertices = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=np.float32)
+    mesh = MeshData(3, 1, vertices, np.array([0, 1, 2, 1, 0, 3], dtype=np.uint32))
+    normals.add_vertex_normals(mesh, 30.0)
+    assert mesh.vertex_amount == 6
+    faces = mesh.connectivity.reshape(-1, 3)
+    vertex_normals = get_normals(mesh)
+    assert np.allclose(vertex_normals[faces[0]], [0, 0, 1])
+    assert np.allclose(vertex_normals[faces[1]], [0, 1, 0])
+
+
+def test_group_start_of_no_keys():
+    assert weld.get_group_start(np.zeros((0, 3))).tolist() == []
+    kept, remap = weld.weld_vertices(np.zeros((0, 3), dtype=np.float32))
+    assert len(kept) == 0 and len(remap) == 0
@@ -0,0 +1,79 @@
+"""Tests of the Wavefront OBJ import."""
+import numpy as np
+import parsing
+import pytest
+from importer.obj_import import Import
+
+CUBE_CORNERS = np.array([[x, y, z] for x in (0, 1) for y in (0, 1) for z in (0, 1)], dtype=np.float32)
+
+
+def write_obj(tmp_path, text: str) -> str:
+    """Writes the OBJ text to a file and returns its path."""
+    path = tmp_path / "mesh.obj"
+    path.write_bytes(text.encode("ascii"))
+    return str(path)
+
+
+def test_triangles_and_fixed_decimals(tmp_path):
+    path = write_obj(tmp_path, "# cube corners\n" + "".join("v %.4f %.4f %.4f\n" % tuple(corner)
+                                                           for corner in CUBE_CORNERS) + "f 1 2 3\nf 8 7 6\n")
+    data = Import().extract(path, "")
+    assert np.array_equal(data.vertices, CUBE_CORNERS)
+    assert np.array_equal(data.connectivity.reshape(-1, 3), [[0, 1, 2], [7, 6, 5]])
+
+
+def test_indented_lines_keep_vertex_indices(tmp_path):
+    path = write_obj(tmp_path, "o indented\n  v 0 0 0\n\tv 1 0 0\nv 0 1 0\n \t v 0 0 1\n"
+                               "  f 1 2 3\n\tf 1 3 4\n")
+    data = Import().extract(path, "")
+    assert np.array_equal(data.vertices, CUBE_CORNERS[[0, 4, 2, 1]])
+    assert np.array_equal(data.connectivity.reshape(-1, 3), [[0, 1, 2], [0, 2, 3]])
+
+
+def test_index_forms_negative_indices_and_polygons(tmp_path):
+    path = write_obj(tmp_path, "v 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\nvt 0 0\nvn 0 0 1\n"
+                               "f 1/1/1 2/1/1 3/1/1 4/1/1\nv 0.5 0.5 1.0 0.5\nf -1//1 -5//1 -4//1\nf 5/1 3/1 4/1\n")
+    data = Import().extract(path, "")
+    assert len(data.vertices) == 5
+    assert np.array_equal(data.vertices[4], [0.5, 0.5, 1.0])
+    assert np.array_equal(data.connectivity.reshape(-1, 3), [[0, 1, 2], [0, 2, 3], [4, 0, 1], [4, 2, 3]])
+
+
+def test_parallel_ranges_match_single_range(tmp_path):
+    rng = np.random.default_rng(0)
+    vertices = rng.random((300, 3)).astype(np.float32)
+    lines = ["v %r %r %r" % tuple(map(float, vertex)) for vertex in vertices]
+    for index in range(400):
+        # At least 150 vertices precede every face
+        corners = rng.integers(1, 301, 3) if index % 2 else -rng.integers(1, 151, 3)
+        lines.insert(int(rng.integers(len(lines) // 2, len(lines))), "f %d %d %d" % tuple(corners))
+    path = write_obj(tmp_path, "\n".join(lines) + "\n")
+
+    expected_vertices, expected_triangles, _ = Import.parse_range(path, 0, len("\n".join(lines)) + 1)
+    vertices, triangles = Import.parse_parallel(path, 4)
+    assert np.array_equal(vertices, expected_vertices)
+    assert np.array_equal(triangles, expected_triangles)
+
+
+def test_invalid_face_index_raises(tmp_path):
+    path = write_obj(tmp_path, "v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 4\n")
+    with pytest.raises(ValueError):
+        Import().extract(path, "")
+
+
+def test_large_files_are_parsed_in_parallel(tmp_path, monkeypatch):
+    path = write_obj(tmp_path, "".join("v %d %d %d\n" % tuple(corner) for corner in CUBE_CORNERS) + "f 1 2 3\n" * 50)
+    expected = Import().extract(path, "")
+    monkeypatch.setattr(parsing, "parse_workers", 3)
+    monkeypatch.setattr(parsing, "parallel_parse_size", 0)
+    data = Import().extract(path, "")
+    assert np.array_equal(data.vertices, expected.vertices)
+    assert np.array_equal(data.connectivity, expected.connectivity)
+
+
+def test_smooth_shading_adds_vertex_normals(tmp_path):
+    path = write_obj(tmp_path, "v 0 0 0\nv 1 0 0\nv 0 1 0\nv 1 1 0\nf 1 2 3\nf 2 4 3\n")
+    data = Import().extract(path, "1")
+    blocks = {block.name: block.values for block in data.blocks}
+    assert sorted(blocks) == ["NV1", "NV2", "NV3"]
+    assert np.allclose(blocks["NV3"], 1)
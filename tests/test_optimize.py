@@ -0,0 +1,70 @@
+"""Tests of the vertex cache optimization."""
+import numpy as np
+import optimize
+import pytest
+from interfaces.mesh_data import DataBlock, MeshData
+
+
+def create_grid(size: int, seed: int = 0) -> MeshData:
+    """Creates a grid of size x size vertices with shuffled faces, a per-face and a per-vertex data block."""
+    xs, ys = np.meshgrid(np.arange(size), np.arange(size))
+    vertices = np.stack([xs.ravel(), ys.ravel(), np.zeros(size * size)], axis=1)
+    corner = (ys[:-1, :-1] * size + xs[:-1, :-1]).ravel()
+    faces = np.concatenate([np.stack([corner, corner + 1, corner + size], axis=1),
+                            np.stack([corner + 1, corner + size + 1, corner + size], axis=1)])
+    faces = faces[np.random.default_rng(seed).permutation(len(faces))]
+    return MeshData(3, 1, vertices, faces, blocks=[DataBlock("face", 7, np.arange(len(faces))),
+                                                   DataBlock("vertex", 10, vertices[:, 0])])
+
+
+def test_acmr_counts_all_faces():
+    # Every face of a triangle strip after the first one adds a single vertex
+    amount = optimize.acmr_sample_faces
+    strip = np.stack([np.arange(amount), np.arange(1, amount + 1), np.arange(2, amount + 2)], axis=1)
+    # The repeated first face is only a miss again after the whole strip
+    strip[-1] = strip[0]
+    assert optimize.get_acmr(strip.reshape(-1), 3) == (amount - 1 + 2 + 3) / amount
+
+
+def test_acmr_of_large_meshes_is_sampled(monkeypatch):
+    monkeypatch.setattr(optimize, "acmr_sample_faces", 4096)
+    monkeypatch.setattr(optimize, "acmr_window_faces", 512)
+    amount = 100000
+    strip = np.stack([np.arange(amount), np.arange(1, amount + 1), np.arange(2, amount + 2)], axis=1)
+    # 8 windows of 512 faces, the first face of every window misses all three vertices
+    assert optimize.get_acmr(strip.reshape(-1), 3) == pytest.approx((4096 + 2 * 8) / 4096)
+
+
+def test_tipsify_order_emits_every_face_once():
+    mesh = create_grid(20)
+    order = optimize.get_tipsify_order(mesh.connectivity.reshape(-1, 3), mesh.vertex_amount)
+    assert np.array_equal(np.sort(order), np.arange(mesh.face_amount))
+
+
+def test_optimization_reduces_acmr_and_keeps_faces():
+    mesh = create_grid(60)
+    vertices = mesh.vertices.copy()
+    faces = mesh.connectivity.reshape(-1, 3).copy()
+    before, after = optimize.optimize_vertex_cache(mesh)
+
+    assert before > 2.5
+    assert after < 0.7
+    assert after == optimize.get_acmr(mesh.connectivity, 3)
+    # The faces keep their winding and the data blocks follow their faces and vertices
+    face_ids = mesh.blocks[0].values
+    assert np.array_equal(mesh.vertices[mesh.connectivity.reshape(-1, 3)], vertices[faces[face_ids]])
+    assert np.array_equal(mesh.blocks[1].values, mesh.vertices[:, 0])
+
+
+def test_large_meshes_use_the_fan_order(monkeypatch):
+    monkeypatch.setattr(optimize, "tipsify_face_limit", 0)
+    mesh = create_grid(60)
+    vertices = mesh.vertices.copy()
+    faces = mesh.connectivity.reshape(-1, 3).copy()
+    before, after = optimize.optimize_vertex_cache(mesh)
+
+    assert before > 2.5
+    assert after < 0.8
+    face_ids = mesh.blocks[0].values
+    assert np.array_equal(np.sort(face_ids), np.arange(len(faces)))
+    assert np.array_equal(mesh.vertices[mesh.connectivity.reshape(-1, 3)], vertices[faces[face_ids]])
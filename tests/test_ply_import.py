@@ -0,0 +1,93 @@
+"""Tests of the PLY importer."""
+import numpy as np
+import pytest
+from importer.ply_import import Import
+
+# Square pyramid with a quad base, the vertices have a normal and a color
+VERTICES = np.array([[0, 0, 0], [1, 0, 0], [1, 0, 1], [0, 0, 1], [0.5, 1, 0.5]], dtype=np.float32)
+NORMALS = np.array([[0, -1, 0], [0, -1, 0], [0, -1, 0], [0, -1, 0], [0, 1, 0]], dtype=np.float32)
+COLORS = np.array([10, 20, 30, 40, 250], dtype=np.uint8)
+FACES = [[0, 1, 2, 3], [0, 4, 1], [1, 4, 2], [2, 4, 3], [3, 4, 0]]
+TRIANGLES = [[0, 1, 2], [0, 2, 3], [0, 4, 1], [1, 4, 2], [2, 4, 3], [3, 4, 0]]
+
+
+def write_ply(file_path, file_format: str, faces: list, count_type: str = "uchar") -> str:
+    """Writes the pyramid with the given faces as PLY file and returns its path."""
+    header = ["ply", "format %s 1.0" % file_format, "comment test mesh", "element vertex %d" % len(VERTICES),
+              "property float x", "property float y", "property float z", "property float nx", "property float ny",
+              "property float nz", "property uchar red", "element face %d" % len(faces),
+              "property list %s int vertex_indices" % count_type, "element edge 1", "property int vertex1",
+              "property int vertex2", "end_header"]
+    content = ("\n".join(header) + "\n").encode("ascii")
+    if file_format == "ascii":
+        lines = ["%g %g %g %g %g %g %d" % (*vertex, *normal, color)
+                 for vertex, normal, color in zip(VERTICES, NORMALS, COLORS)]
+        lines += [" ".join(str(value) for value in [len(face), *face]) for face in faces]
+        content += ("\n".join(lines + ["0 1"]) + "\n").encode("ascii")
+    else:
+        order = "<" if file_format == "binary_little_endian" else ">"
+        count_dtype = np.dtype(order + {"uchar": "u1", "int": "i4"}[count_type])
+        records = np.zeros(len(VERTICES), dtype=[("position", order + "f4", 3), ("normal", order + "f4", 3),
+                                                 ("red", "u1")])
+        records["position"], records["normal"], records["red"] = VERTICES, NORMALS, COLORS
+        content += records.tobytes()
+        for face in faces:
+            content += np.array(len(face), dtype=count_dtype).tobytes() + np.array(face, dtype=order + "i4").tobytes()
+        content += np.array([0, 1], dtype=order + "i4").tobytes()
+    with open(file_path, "wb") as file:
+        file.write(content)
+    return str(file_path)
+
+
+@pytest.mark.parametrize("file_format", ["ascii", "binary_little_endian", "binary_big_endian"])
+def test_mixed_faces_are_triangulated(tmp_path, file_format):
+    data = Import().extract(write_ply(tmp_path / "mesh.ply", file_format, FACES), "")
+    assert np.array_equal(data.vertices, VERTICES)
+    assert data.connectivity.reshape(-1, 3).tolist() == TRIANGLES
+
+
+@pytest.mark.parametrize("file_format", ["ascii", "binary_little_endian", "binary_big_endian"])
+def test_vertex_properties_become_data_blocks(tmp_path, file_format):
+    data = Import().extract(write_ply(tmp_path / "mesh.ply", file_format, FACES), "")
+    blocks = {block.name: block for block in data.blocks}
+    assert list(blocks) == ["NV1", "NV2", "NV3", "red"]
+    for axis in range(3):
+        assert np.array_equal(blocks["NV%d" % (axis + 1)].values, NORMALS[:, axis])
+    assert blocks["red"].values.dtype == np.uint8
+    assert np.array_equal(blocks["red"].values, COLORS)
+
+
+def test_vertex_properties_can_be_disabled(tmp_path):
+    data = Import().extract(write_ply(tmp_path / "mesh.ply", "binary_little_endian", FACES), "0")
+    assert data.blocks == []
+
+
+@pytest.mark.parametrize("file_format", ["binary_little_endian", "binary_big_endian"])
+@pytest.mark.parametrize("count_type", ["uchar", "int"])
+def test_alternating_face_sizes(tmp_path, file_format, count_type):
+    # Quads and triangles alternate, so the records are stepped through one by one
+    faces = [FACES[i % 2] for i in range(301)]
+    triangles = [TRIANGLES[i % 2 * 2:i % 2 * 2 + 2 - i % 2] for i in range(301)]
+    data = Import().extract(write_ply(tmp_path / "mesh.ply", file_format, faces, count_type), "")
+    assert data.connectivity.reshape(-1, 3).tolist() == [triangle for face in triangles for triangle in face]
+
+
+@pytest.mark.parametrize("file_format", ["ascii", "binary_little_endian", "binary_big_endian"])
+def test_runs_of_equal_face_sizes(tmp_path, file_format):
+    # Runs longer than list_run_start are viewed at once, the quads after the triangles start a new run
+    faces = [FACES[1]] * 150 + [FACES[0]] * 100 + [FACES[2]]
+    data = Import().extract(write_ply(tmp_path / "mesh.ply", file_format, faces), "")
+    assert data.connectivity.reshape(-1, 3).tolist() == [TRIANGLES[2]] * 150 + TRIANGLES[:2] * 100 + [TRIANGLES[3]]
+
+
+def test_invalid_face_index_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        Import().extract(write_ply(tmp_path / "mesh.ply", "ascii", [[0, 1, 5]]), "")
+
+
+def test_analyze_reads_the_header(tmp_path, capsys):
+    Import().analyze(write_ply(tmp_path / "mesh.ply", "binary_big_endian", FACES))
+    output = capsys.readouterr().out.splitlines()
+    assert "#Vertices amount: 5" in output
+    assert "#Faces amount: 5" in output
+    assert "#Vertex properties: nx, ny, nz, red" in output
@@ -0,0 +1,34 @@
+"""Tests of the plugin registry."""
+import os
+
+import cache
+import pytest
+import registry
+
+
+@pytest.fixture
+def fresh_registry(monkeypatch):
+    """Starts without a loaded index or plugin instances."""
+    monkeypatch.setattr(registry, "plugin_index", None)
+    monkeypatch.setattr(registry, "plugin_instances", {})
+
+
+def test_index_is_not_written_without_cache_directory(tmp_path, monkeypatch, fresh_registry):
+    monkeypatch.setattr(cache, "cache_directory", "")
+    monkeypatch.setattr(registry.tempfile, "tempdir", str(tmp_path))
+    assert registry.get_index_path() is None
+    assert "stl" in registry.get_formats()
+    assert os.listdir(tmp_path) == []
+
+
+def test_index_is_stored_in_cache_directory(tmp_path, monkeypatch, fresh_registry):
+    monkeypatch.setattr(cache, "cache_directory", str(tmp_path))
+    assert "ares" in registry.get_formats(False)
+    assert os.path.dirname(registry.get_index_path()) == str(tmp_path)
+    assert os.path.exists(registry.get_index_path())
+
+    # A second process only imports the plugin of the requested format
+    monkeypatch.setattr(registry, "plugin_index", None)
+    monkeypatch.setattr(registry, "plugin_instances", {})
+    assert registry.get_plugin("stl") is not None
+    assert list(registry.plugin_instances) == ["importer.stl_import"]
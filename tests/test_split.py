@@ -0,0 +1,78 @@
+"""Tests of the splitting into meshes with 16 bit vertex IDs."""
+import functools
+
+import converter
+import numpy as np
+import pytest
+import split
+from benchmarks import synthetic
+from interfaces.mesh_data import DataBlock, MeshData
+
+
+def create_grid(size: int) -> MeshData:
+    """Returns a triangulated grid of size x size quads with one per-vertex, one per-face and one other data block."""
+    x, z = np.meshgrid(np.arange(size + 1), np.arange(size + 1), indexing="ij")
+    vertices = np.stack([x.ravel(), np.zeros(x.size), z.ravel()], axis=1).astype(np.float32)
+    ids = np.arange(x.size).reshape(size + 1, size + 1)
+    corners = [ids[:-1, :-1], ids[1:, :-1], ids[1:, 1:], ids[:-1, 1:]]
+    faces = np.stack([np.stack([corners[0], corners[1], corners[2]], -1).reshape(-1, 3),
+                      np.stack([corners[0], corners[2], corners[3]], -1).reshape(-1, 3)], axis=1).reshape(-1, 3)
+    blocks = [DataBlock("VX", 10, vertices[:, 0].copy()), DataBlock("FI", 2, np.arange(len(faces), dtype=np.uint32)),
+              DataBlock("SC", 10, np.array([1.5], dtype=np.float32))]
+    return MeshData(3, 1, vertices, faces.reshape(-1).astype(np.uint32), "FP32", blocks)
+
+
+def get_triangles(mesh: MeshData) -> np.ndarray:
+    """Returns the corner positions of the faces of shape (F, 9)."""
+    return mesh.vertices[mesh.connectivity].reshape(-1, 9)
+
+
+def test_small_mesh_is_returned_unchanged():
+    mesh = create_grid(4)
+    assert split.split_mesh(mesh, 1000) == [mesh]
+
+
+@pytest.mark.parametrize("vertex_limit", [3, 40, 500])
+def test_split_meshes_keep_the_triangles_within_the_limit(vertex_limit):
+    mesh = create_grid(30)
+    parts = split.split_mesh(mesh, vertex_limit)
+    assert len(parts) > 1
+    for part in parts:
+        assert part.vertex_amount <= vertex_limit
+        # Every vertex is used and numbered by its first use
+        first_use = np.unique(part.connectivity, return_index=True)[1]
+        assert np.array_equal(np.argsort(first_use), np.arange(part.vertex_amount))
+    # The split meshes contain every face once, with its corners in the original order
+    face_ids = np.concatenate([part.blocks[1].values for part in parts])
+    assert np.array_equal(np.sort(face_ids), np.arange(mesh.face_amount))
+    triangles = np.concatenate([get_triangles(part) for part in parts])
+    assert np.array_equal(triangles, get_triangles(mesh)[face_ids])
+
+
+def test_data_blocks_are_split_by_their_size():
+    mesh = create_grid(30)
+    for part in split.split_mesh(mesh, 100):
+        vertex_block, face_block, other_block = part.blocks
+        assert np.array_equal(vertex_block.values, part.vertices[:, 0])
+        assert len(face_block.values) == part.face_amount
+        assert np.array_equal(other_block.values, [1.5])
+
+
+def test_vertex_limit_below_a_face_is_rejected():
+    with pytest.raises(ValueError):
+        split.split_mesh(create_grid(2), 2)
+
+
+def test_converter_counts_only_split_meshes(tmp_path, monkeypatch, capsys):
+    file_path = str(tmp_path / "mesh.stl")
+    synthetic.write_binary_stl(file_path, synthetic.create_triangles(200, 0.5, 1))
+    # Smooth shading, then the pipeline options with a LOD 1 ratio of 0.5 and splitting
+    options = "1\n0\n0\n0\n0\n0\n0.5\n0\n1"
+    converter.convert_file(file_path, "stl", str(tmp_path / "whole"), options)
+    assert "Split meshes" not in capsys.readouterr().out
+
+    monkeypatch.setattr(converter.split, "split_mesh", functools.partial(split.split_mesh, vertex_limit=200))
+    written = converter.convert_file(file_path, "stl", str(tmp_path / "out"), options)
+    split_files = [path for path in written if "_lod1" not in path]
+    assert len(split_files) > 1
+    assert "#Split meshes: %d" % len(split_files) in capsys.readouterr().out.splitlines()
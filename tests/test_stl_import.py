@@ -0,0 +1,101 @@
+"""Tests of the STL importer."""
+import os
+
+import converter
+import numpy as np
+import pytest
+from benchmarks import synthetic
+from importer import stl_import
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    """Starts with an empty probe cache of 2 probes."""
+    monkeypatch.setattr(stl_import, "stl_probes", stl_import.OrderedDict())
+    monkeypatch.setattr(stl_import, "probe_cache_size", 2)
+    return stl_import.stl_probes
+
+
+def write_stl(file_path, triangle_amount: int) -> str:
+    """Writes a synthetic binary STL file and returns its path."""
+    synthetic.write_binary_stl(str(file_path), synthetic.create_triangles(triangle_amount, 0.5))
+    return str(file_path)
+
+
+def test_probe_cache_drops_least_recently_used(tmp_path, probes):
+    paths = [write_stl(tmp_path / ("%d.stl" % i), i + 1) for i in range(3)]
+    first = stl_import.Import.probe(paths[0])
+    stl_import.Import.probe(paths[1])
+    assert stl_import.Import.probe(paths[0]) is first
+    stl_import.Import.probe(paths[2])
+    assert list(probes) == [paths[0], paths[2]]
+    assert stl_import.Import.probe(paths[0]) is first
+
+
+def test_probe_is_created_again_for_changed_file(tmp_path, probes):
+    file_path = write_stl(tmp_path / "mesh.stl", 4)
+    assert stl_import.Import.probe(file_path).triangle_amount == 4
+    write_stl(file_path, 7)
+    assert stl_import.Import.probe(file_path).triangle_amount == 7
+
+
+def test_ascii_and_binary_files_extract_the_same_vertices(tmp_path, monkeypatch, probes):
+    monkeypatch.setattr(stl_import.parsing, "parse_workers", 1)
+    triangles = synthetic.create_triangles(300, 0.5, 2)
+    binary_path = str(tmp_path / "binary.stl")
+    ascii_path = str(tmp_path / "ascii.stl")
+    synthetic.write_binary_stl(binary_path, triangles)
+    synthetic.write_ascii_stl(ascii_path, triangles)
+    importer = stl_import.Import()
+    binary = importer.extract(binary_path, "")
+    ascii_data = importer.extract(ascii_path, "")
+    assert np.array_equal(binary.vertices, triangles["vertices"].reshape(-1, 3))
+    np.testing.assert_allclose(ascii_data.vertices, binary.vertices, rtol=1e-6)
+    assert np.array_equal(ascii_data.connectivity, binary.connectivity)
+
+
+def test_binary_analysis_reads_only_the_header_by_default(tmp_path, monkeypatch, probes, capsys):
+    file_path = write_stl(tmp_path / "mesh.stl", 10)
+    monkeypatch.setattr(stl_import.Import, "read_vertex_chunks",
+                        staticmethod(lambda path: pytest.fail("The triangles were read")))
+    stl_import.Import().analyze(file_path)
+    output = capsys.readouterr().out.splitlines()
+    assert "#Vertices amount: 30" in output
+    assert not any(line.startswith("#Bounding box") for line in output)
+
+
+def test_statistics_are_opt_in_for_binary_files(tmp_path, monkeypatch, probes, capsys):
+    monkeypatch.setattr(stl_import.mesh_statistics, "analyze_statistics", True)
+    stl_import.Import().analyze(write_stl(tmp_path / "mesh.stl", 10))
+    assert any(line.startswith("#Bounding box") for line in capsys.readouterr().out.splitlines())
+
+
+def test_ascii_analysis_adds_statistics(tmp_path, monkeypatch, probes, capsys):
+    monkeypatch.setattr(stl_import.parsing, "parse_workers", 1)
+    file_path = str(tmp_path / "mesh.stl")
+    synthetic.write_ascii_stl(file_path, synthetic.create_triangles(10, 0.5))
+    stl_import.Import().analyze(file_path)
+    output = capsys.readouterr().out.splitlines()
+    assert "#Vertices amount: 30" in output
+    assert any(line.startswith("#Bounding box") for line in output)
+
+
+def test_frame_paths_of_wildcards_and_directories(tmp_path):
+    paths = [write_stl(tmp_path / ("frame_%d.stl" % i), 4) for i in (10, 9)]
+    assert stl_import.Import.get_frame_paths(str(tmp_path / "frame_*.stl")) == paths[::-1]
+    assert stl_import.Import.get_frame_paths(str(tmp_path)) == paths[::-1]
+    assert stl_import.Import.get_frame_paths(paths[0]) is None
+    with pytest.raises(ValueError):
+        stl_import.Import.get_frame_paths(str(tmp_path / "missing_?.stl"))
+
+
+def test_small_frame_sequences_are_streamed(tmp_path, monkeypatch, probes):
+    monkeypatch.setattr(stl_import.parsing, "parse_workers", 1)
+    for i in range(2):
+        write_stl(tmp_path / ("frame_%d.stl" % i), 4)
+    importer = stl_import.Import()
+    assert importer.always_stream(str(tmp_path / "frame_*.stl"))
+    assert not importer.always_stream(str(tmp_path / "frame_0.stl"))
+    monkeypatch.setattr(stl_import.Import, "extract", lambda *_: pytest.fail("The frames were loaded at once"))
+    written = converter.convert_file(str(tmp_path / "frame_*.stl"), "stl", str(tmp_path / "out"), "")
+    assert all(os.path.exists(path) for path in written)
@@ -0,0 +1,38 @@
+"""Tests of the vertex welding."""
+import numpy as np
+import weld
+from interfaces.mesh_data import DataBlock, MeshData
+
+
+def test_exact_duplicates_keep_first_occurrence_order():
+    vertices = np.array([[1, 0, 0], [0, 0, 0], [1, 0, 0], [0, 0, -0.0], [2, 0, 0], [0, 0, 0]], dtype=np.float32)
+    kept, remap = weld.weld_vertices(vertices)
+    assert kept.tolist() == [0, 1, 4]
+    assert remap.tolist() == [0, 1, 0, 1, 2, 1]
+
+
+def test_hash_collisions_fall_back_to_lexicographic_sort(monkeypatch):
+    monkeypatch.setattr(weld, "hash_rows", lambda keys: np.zeros(len(keys), dtype=np.uint64))
+    vertices = np.array([[3, 0, 0], [1, 0, 0], [3, 0, 0], [2, 0, 0], [1, 0, 0]], dtype=np.float32)
+    kept, remap = weld.weld_vertices(vertices)
+    assert kept.tolist() == [0, 1, 3]
+    assert remap.tolist() == [0, 1, 0, 2, 1]
+
+
+def test_tolerance_merges_vertices_of_the_same_cell_only():
+    # The cells of size 1 are centered on the grid points, so their borders lie at 0.5
+    vertices = np.array([[0.1, 0, 0], [0.4, 0, 0], [0.49, 0, 0], [0.51, 0, 0], [1.4, 0, 0]])
+    kept, remap = weld.weld_vertices(vertices, 1.0)
+    assert kept.tolist() == [0, 3]
+    assert remap.tolist() == [0, 0, 0, 1, 1]
+
+
+def test_weld_mesh_remaps_connectivity_and_vertex_blocks():
+    vertices = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0]], dtype=np.float32)
+    mesh = MeshData(3, 1, vertices, np.arange(6), blocks=[DataBlock("index", 7, np.arange(6)),
+                                                            DataBlock("face", 7, [10, 11])])
+    weld.weld_mesh(mesh)
+    assert np.array_equal(mesh.vertices, vertices[[0, 1, 2, 5]])
+    assert mesh.connectivity.tolist() == [0, 1, 2, 1, 2, 3]
+    assert mesh.blocks[0].values.tolist() == [0, 1, 2, 5]
+    assert mesh.blocks[1].values.tolist() == [10, 11]
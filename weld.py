@@ -0,0 +1,100 @@
+"""Vertex welding functions for the mesh data"""
+
+import numpy as np
+from interfaces.mesh_data import MeshData
+
+
+def weld_vertices(vertices, tolerance: float = 0.0):
+    """Merges equal vertices while keeping the order of their first occurrence.
+
+    The vertex rows are sorted by a 64 bit hash so equal rows become neighbours, which makes the welding O(n log n)
+    instead of comparing every vertex with all others. Hash collisions fall back to a lexicographic sort.
+
+    A positive tolerance snaps the vertices to a grid with cells of this size centered on the grid points and merges
+    the vertices of each cell. Vertices closer than the tolerance are not merged if they fall into adjacent cells, and
+    vertices of the same cell can be up to the cell diagonal apart. Merging across the cell borders instead would
+    chain arbitrarily distant vertices together.
+
+    :param vertices: The vertices as an array-like of shape (N, 3) or a flat list of floats.
+    :param tolerance: Vertices within the same grid cell of this size are merged, 0 only merges exact duplicates.
+    :return: The indices of the kept vertices and the index of the kept vertex for every input vertex.
+    """
+    vertices = np.reshape(vertices, (-1, 3))
+    vertex_amount = len(vertices)
+    if vertex_amount == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    keys = quantize(vertices, tolerance) if tolerance > 0 else vertices
+    hashes = hash_rows(keys)
+    order = np.argsort(hashes, kind="stable")
+    group_start = get_group_start(keys[order])
+    if np.any(group_start[1:] & ~get_group_start(hashes[order])[1:]):
+        order = np.lexsort(keys.T[::-1])
+        group_start = get_group_start(keys[order])
+
+    # The sort is stable, so the first entry of each group is its first occurrence
+    first = order[group_start]
+    groups = np.empty(vertex_amount, dtype=np.int64)
+    groups[order] = np.cumsum(group_start) - 1
+
+    # Renumber the groups by their first occurrence
+    first_order = np.argsort(first, kind="stable")
+    rank = np.empty(len(first), dtype=np.int64)
+    rank[first_order] = np.arange(len(first))
+    return first[first_order], rank[groups]
+
+
+def quantize(vertices, cell_size: float) -> np.ndarray:
+    """Returns the grid cell of every vertex for cells of the given size centered on the grid points.
+
+    :param vertices: The vertices of shape (N, 3).
+    :param cell_size: The cell size.
+    :return: The cell coordinates as int64 array of shape (N, 3).
+    """
+    return np.floor(vertices / cell_size + 0.5).astype(np.int64)
+
+
+def hash_rows(keys) -> np.ndarray:
+    """Hashes the rows of the given (N, 3) array to 64 bit values.
+
+    :param keys: The float or int keys of shape (N, 3).
+    :return: The hash of every row as uint64 array.
+    """
+    if keys.dtype.kind == "f":
+        # Adding zero turns -0.0 into 0.0, which compares equal
+        keys = keys + keys.dtype.type(0)
+    bits = np.ascontiguousarray(keys).view("u%d" % keys.dtype.itemsize).astype(np.uint64)
+    return bits[:, 0] * np.uint64(0x9E3779B97F4A7C15) ^ bits[:, 1] * np.uint64(0xC2B2AE3D27D4EB4F) ^ \
+        bits[:, 2] * np.uint64(0x165667B19E3779F9)
+
+
+def get_group_start(keys_sorted) -> np.ndarray:
+    """Marks the rows of the sorted keys that differ from their predecessor.
+
+    :param keys_sorted: The sorted keys of shape (N, 3) or (N,).
+    :return: Boolean array, True where a new group of equal keys starts, empty for no keys.
+    """
+    group_start = np.empty(len(keys_sorted), dtype=bool)
+    group_start[:1] = True
+    differs = keys_sorted[1:] != keys_sorted[:-1]
+    if differs.ndim > 1:
+        differs = differs.any(axis=1)
+    group_start[1:] = differs
+    return group_start
+
+
+def weld_mesh(mesh: MeshData, tolerance: float = 0.0):
+    """Welds the vertices of the given mesh data and remaps its connectivity and per-vertex data blocks.
+
+    :param mesh: The mesh data to weld.
+    :param tolerance: Vertices within the same grid cell of this size are merged, 0 only merges exact duplicates.
+    :return: The index of the compacted vertex for every former vertex.
+    """
+    vertex_amount = mesh.vertex_amount
+    kept, remap = weld_vertices(mesh.vertices, tolerance)
+    for block in mesh.blocks:
+        if len(block.values) == vertex_amount:
+            block.values = block.values[kept]
+    mesh.vertices = mesh.vertices[kept]
+    mesh.connectivity = remap.astype(mesh.connectivity.dtype)[mesh.connectivity]
+    return remap